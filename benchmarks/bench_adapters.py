@@ -0,0 +1,82 @@
+import pandas as pd
+
+from benchmarks.fixtures import make_trader, synthetic_candles, macd_file_string
+from benchmarks.harness import benchmark
+
+
+class _RecordedKlinesClient(object):
+    """
+    Stands in for binance.client.Client, returning klines built from synthetic candles
+    """
+
+    def __init__(self, size):
+        self.klines = [
+            [int(candle["T"].timestamp() * 1000), str(candle["O"]), str(candle["H"]), str(candle["L"]),
+             str(candle["C"]), str(candle["V"]), int(candle["T"].timestamp() * 1000) + 59999, str(candle["BV"]),
+             100, "0", "0", "0"]
+            for candle in synthetic_candles(size)
+        ]
+
+    def get_historical_klines(self, symbol, interval, start_str, limit=500):
+        return self.klines
+
+
+@benchmark(sizes=(500, 5000, 20000), repeat=3)
+def binance_historical_data(size):
+    from src.binance import Binance
+    binance = Binance.__new__(Binance)
+    binance.client = _RecordedKlinesClient(size)
+    return lambda: binance.get_historical_data("BTC-USDT", size // 2, "oneMin")
+
+
+@benchmark(sizes=(1000, 10000, 100000), repeat=5)
+def get_closing_prices(size):
+    trader = make_trader(synthetic_candles(size))
+    return lambda: trader.get_closing_prices("BTC-LTC", size, "oneMin")
+
+
+@benchmark(sizes=(None,), repeat=5)
+def read_macd_csv(size):
+    return lambda: pd.read_csv(macd_file_string, sep=";", index_col=0)
+
+
+@benchmark(sizes=(100, 1000, 5000), repeat=5)
+def market_snapshot_prefilter(size):
+    from src.market_snapshot import MarketSnapshot
+    coin_pairs = ["BTC-{:05d}".format(n) for n in range(size)]
+    trader = make_trader(synthetic_candles(100))
+    trader.operator.coin_pairs = coin_pairs
+    summaries = trader.operator.get_market_summaries()["result"]
+
+    def run():
+        trader.snapshot = MarketSnapshot.from_summaries(summaries)
+        return trader.Screener.stage_one(trader.snapshot, coin_pairs)
+    return run
+
+
+@benchmark(sizes=(100, 1000, 10000), repeat=5)
+def order_book_diff_and_fill(size):
+    import numpy as np
+    from src.order_book import OrderBook
+    rng = np.random.default_rng(0)
+    book = OrderBook("BTC-LTC")
+    book.replace(np.column_stack([100 - np.arange(size) * 0.01, rng.random(size)]),
+                 np.column_stack([100.01 + np.arange(size) * 0.01, rng.random(size)]))
+    diff = np.column_stack([100.01 + rng.integers(0, size, 50) * 0.01, rng.random(50)])
+
+    def run():
+        book.apply_diff(asks=diff)
+        return book.fill_price("buy", size / 4)
+    return run
+
+
+@benchmark(sizes=(42, 500, 1440), repeat=5)
+def shared_candles_read(size):
+    import atexit
+    from src.shared_candles import SharedCandleCache
+    name = "bench_candles_{}".format(size)
+    writer = SharedCandleCache(name, create=True, slots=4, capacity=1440)
+    atexit.register(writer.close)
+    writer.write("BTC-LTC", "oneMin", synthetic_candles(1440))
+    reader = SharedCandleCache(name)
+    return lambda: reader.read("BTC-LTC", "oneMin", size)
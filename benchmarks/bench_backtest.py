@@ -0,0 +1,22 @@
+import pandas as pd
+
+from benchmarks.fixtures import settings, synthetic_candles
+from benchmarks.harness import benchmark
+
+# One day, one month and one year of 1-minute candles
+SIZES = (1440, 43200, 525600)
+
+
+@benchmark(sizes=SIZES, repeat=3)
+def backtest_run(size):
+    from src.backtest import Backtest
+    candles = pd.DataFrame(synthetic_candles(size))
+    backtest = Backtest(settings)
+    return lambda: backtest.run(candles)
+
+
+@benchmark(sizes=SIZES, repeat=3)
+def rolling_rsi(size):
+    from src.backtest import rolling_rsi
+    closes = pd.DataFrame(synthetic_candles(size))["C"].to_numpy()
+    return lambda: rolling_rsi(closes)
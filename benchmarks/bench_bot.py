@@ -0,0 +1,32 @@
+import asyncio
+
+from benchmarks.fixtures import make_trader, synthetic_candles
+from benchmarks.harness import benchmark
+
+
+class _MemoryAPI(object):
+    """
+    Bot API double keeping the sent messages in memory
+    """
+
+    def __init__(self):
+        self.sent = []
+
+    async def send_message(self, chat_id, text, reply_markup=None):
+        self.sent.append((chat_id, text))
+
+
+@benchmark(sizes=(1, 10, 100), repeat=3)
+def bot_concurrent_chats(size):
+    from utils.bot import Botche, Outbox
+    trader = make_trader(synthetic_candles(1000))
+
+    async def conversation():
+        bot = Botche(trader, _MemoryAPI())
+        # Flood limits off: this times the bot, not Telegram's rate
+        bot.outbox = Outbox(bot.api, chat_rate=1e6, global_rate=1e6)
+        for chat_id in range(size):
+            for text in ("/start", "BTC-LTC", "Últimos \n5 min"):
+                bot.dispatch({"chat": {"id": chat_id}, "text": text})
+        await bot.drain()
+    return lambda: asyncio.run(conversation())
@@ -0,0 +1,69 @@
+import pandas as pd
+
+from benchmarks.fixtures import synthetic_candles
+from benchmarks.harness import benchmark
+
+# Candles per chart
+SIZES = (1000, 10000, 100000)
+
+
+def _frame(size):
+    df = pd.DataFrame(synthetic_candles(size)).rename(columns={
+        "T": "Datetime", "O": "Open", "H": "High", "L": "Low", "C": "Close", "V": "Volume"
+    })
+    df["EMA_Short"] = df.Close.ewm(span=9, adjust=False).mean()
+    df["EMA_Long"] = df.Close.ewm(span=26, adjust=False).mean()
+    df["MACD"] = df.Close.ewm(span=26, adjust=False).mean() - df.Close.ewm(span=12, adjust=False).mean()
+    df["MACD_9"] = df.MACD.ewm(span=9, adjust=False).mean()
+    return df
+
+
+@benchmark(sizes=SIZES, repeat=3)
+def chart_build_figure(size):
+    from src.charts import build_figure
+    df = _frame(size)
+    return lambda: build_figure(df)
+
+
+@benchmark(sizes=SIZES, repeat=3)
+def chart_render_json_cold(size):
+    from src.charts import ChartRenderer
+    df = _frame(size)
+    return lambda: ChartRenderer().render("BTC-LTC", "oneMin", df, fmt="json")
+
+
+@benchmark(sizes=SIZES, repeat=3)
+def chart_render_json_cached(size):
+    from src.charts import ChartRenderer
+    df = _frame(size)
+    renderer = ChartRenderer()
+    first = renderer.render("BTC-LTC", "oneMin", df, fmt="json")
+    # A still open last candle moves under the same timestamp, and must not be served the stale chart
+    moved = df.copy()
+    moved.loc[moved.index[-1], "Close"] += 1.0
+    assert renderer.render("BTC-LTC", "oneMin", moved, fmt="json") != first
+    return lambda: renderer.render("BTC-LTC", "oneMin", df, fmt="json")
+
+
+@benchmark(sizes=SIZES, repeat=3)
+def chart_tail_json(size):
+    from src.charts import ChartRenderer
+    df = _frame(size)
+    since = df.Datetime.iloc[-10]
+    return lambda: ChartRenderer().tail("BTC-LTC", "oneMin", df, since)
+
+
+@benchmark(sizes=SIZES, repeat=3)
+def chart_downsample_lttb(size):
+    from src.charts import lttb
+    df = _frame(size)
+    dates, values = df.Datetime.to_numpy(), df.MACD.to_numpy()
+    return lambda: lttb(dates, values)
+
+
+@benchmark(sizes=SIZES, repeat=3)
+def chart_levels_figure_json(size):
+    from src.charts import build_levels_figure, to_json
+    df = _frame(size)
+    hammers = df.iloc[::7][["Datetime"]]
+    return lambda: to_json(build_levels_figure(df, hammers, 0.236, 0.764))
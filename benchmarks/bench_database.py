@@ -0,0 +1,39 @@
+import os
+import tempfile
+
+from benchmarks.harness import benchmark
+from src.database import Database
+
+
+def _fresh_database(directory):
+    os.makedirs(os.path.join(directory, "database"), exist_ok=True)
+    os.chdir(directory)
+    Database.instance = None
+    return Database()
+
+
+@benchmark(sizes=(10, 100, 500), repeat=3)
+def store_trades(size):
+    """
+    Initial buy, buy and sell of `size` trades, every call rewriting trades.json
+    """
+    order = {"Opened": "2021-01-01T00:00:00", "Closed": "2021-01-01T00:01:00", "Price": 0.001,
+             "PricePerUnit": 0.0001, "CommissionPaid": 0.0000025, "Quantity": 10, "QuantityRemaining": 0}
+    stats = {"rsi": 25, "24HrVolume": 100}
+
+    def target():
+        cwd = os.getcwd()
+        with tempfile.TemporaryDirectory() as directory:
+            database = _fresh_database(directory)
+            try:
+                for n in range(size):
+                    coin_pair = "BTC-C{}".format(n)
+                    database.store_initial_buy(coin_pair, "uuid-{}".format(n))
+                    database.store_buy(dict(order, OrderUuid="uuid-{}".format(n), Exchange=coin_pair), stats)
+                for n in range(size):
+                    coin_pair = "BTC-C{}".format(n)
+                    database.store_sell(dict(order, OrderUuid="sell-{}".format(n), Exchange=coin_pair), stats)
+            finally:
+                os.chdir(cwd)
+                Database.instance = None
+    return target
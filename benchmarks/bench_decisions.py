@@ -0,0 +1,163 @@
+from functools import lru_cache
+
+import pandas as pd
+
+from benchmarks.fixtures import petr4, petr4_rows
+from benchmarks.harness import benchmark
+from src import bayes
+
+SIZES = (250, 500, 1000)
+
+# Fixed weights so that the decision loops are timed on their own, without the weighting pipeline
+decision_weight = pd.DataFrame({
+    "classifier": bayes.classifiers,
+    "new_weight": [0.25, 0.25, 0.25, 0.25]
+})
+
+final_features = list(bayes.classifiers)
+
+
+@lru_cache(maxsize=None)
+def committee():
+    df = petr4()
+    models = {}
+    scalers = {}
+    for label in bayes.classifiers:
+        apply = bayes._apply_complementNB if label == "divergency_decisor" else bayes._apply_gaussianNB
+        models[label], scalers[label] = apply(df, bayes.features[label], label, silent=True)
+    df = bayes._final_encode(df.copy(), final_features, "final_decision")
+    final_model, final_scaler = bayes._apply_multinomialNB(df, final_features, "final_decision", silent=True)
+    return models, scalers, final_model, final_scaler
+
+
+def _rows(size):
+    return bayes._final_encode(petr4_rows(size), final_features, "final_decision")
+
+
+@benchmark(sizes=SIZES, repeat=1)
+def apply_model(size):
+    models, scalers, _, _ = committee()
+    df = _rows(size)
+    label = "Willians_decisor"
+
+    def target():
+        decisions = pd.DataFrame(columns=["Data", "classifier", "real_decision", "model_decision", "value_fechamento"])
+        return bayes._apply_model(df, models[label], scalers[label], bayes.features[label], label, decisions)
+    return target
+
+
+@benchmark(sizes=SIZES, repeat=1)
+def get_model_decisions(size):
+    models, scalers, _, _ = committee()
+    df = _rows(size)
+    return lambda: bayes._get_model_decisions(df, bayes.classifiers, scalers, models, bayes.features, decision_weight)
+
+
+@benchmark(sizes=SIZES, repeat=1)
+def get_final_decisions(size):
+    models, scalers, final_model, final_scaler = committee()
+    df = _rows(size)
+    return lambda: bayes._get_final_decisions(df, 0, 0.9, 3, final_scaler, final_model, bayes.classifiers, scalers,
+                                              models, bayes.features, final_features, decision_weight)
+
+
+@benchmark(sizes=SIZES, repeat=3)
+def apply_decisions_withperc(size):
+    df = _rows(size)
+    decisions = pd.DataFrame({
+        "Data": df["Data"],
+        "real_decision": [1 + i % 2 for i in range(len(df))],
+        "value_fechamento": df["Fechamento"],
+        "perc_aplicado": 0.5
+    })
+    return lambda: bayes._apply_decisions_withperc(decisions, 10000.0)
+
+
+@benchmark(sizes=(500, 1000, 4000), repeat=3)
+def preprocess(size):
+    df = _rows(size)
+    label = "signalMACD_decisor"
+    return lambda: bayes._preprocess(df, bayes.features[label], label)
+
+
+@benchmark(sizes=(500, 1000, 4000), repeat=3)
+def split_and_scale(size):
+    df = _rows(size)
+    label = "signalMACD_decisor"
+    return lambda: bayes._split_and_scale(df, bayes.features[label], label)
+
+
+@benchmark(sizes=(1000, 10000, 100000), repeat=3)
+def recorder_append(size):
+    from src.recorder import Recorder
+
+    def target():
+        results = Recorder(bayes.result_columns)
+        for i in range(size):
+            results.append(Data=pd.Timestamp(2018, 1, 1), initial_maney=1.0, final_maney=float(i), quant_hold=0.0,
+                           value_fechamento=10.0, perc_usado=0.5, action='compra')
+        return results.to_frame()
+    return target
+
+
+@benchmark(sizes=(None,), repeat=3)
+def drop_col_feat_imp(size):
+    from sklearn.naive_bayes import GaussianNB
+    from src import feature_importance
+    df = petr4()
+    features = feature_importance.petr4_features(df)
+    return lambda: feature_importance.drop_col_feat_imp(GaussianNB(), df, features, "signalMACD_decisor")
+
+
+@benchmark(sizes=(None,), repeat=5)
+def registry_load(size):
+    import tempfile
+    from src.model_registry import CommitteeRecord, ModelRegistry
+    models, scalers, final_model, final_scaler = committee()
+    registry = ModelRegistry(tempfile.mkdtemp())
+    registry.save("petr4", CommitteeRecord.from_committee({
+        "models": models, "scalers": scalers, "features": {label: bayes.features[label] for label in models},
+        "decision_weight": decision_weight, "final_model": final_model, "final_scaler": final_scaler,
+        "final_features": final_features
+    }))
+    return lambda: registry.load("petr4")
+
+
+@benchmark(sizes=SIZES, repeat=3)
+def committee_decide(size):
+    import tempfile
+    from src.committee import Committee
+    from src.model_registry import CommitteeRecord, ModelRegistry
+    models, scalers, final_model, final_scaler = committee()
+    registry = ModelRegistry(tempfile.mkdtemp())
+    registry.save("petr4", CommitteeRecord.from_committee({
+        "models": models, "scalers": scalers, "features": {label: bayes.features[label] for label in models},
+        "decision_weight": decision_weight, "final_model": final_model, "final_scaler": final_scaler,
+        "final_features": final_features
+    }))
+    fused = Committee(registry.load("petr4"), 0, 0.9, 3)
+    df = _rows(size)
+    return lambda: fused.decide(df)
+
+
+@benchmark(sizes=(1000, 4000), repeat=3)
+def walk_forward(size):
+    from src.walk_forward import walk_forward
+    df = _rows(size)
+    return lambda: walk_forward(df, step="30D", window="730D", n_jobs=1)
+
+
+@benchmark(sizes=(10000, 100000, 1000000), repeat=3)
+def label_encoding(size):
+    import numpy as np
+    from src import labels
+    random = np.random.RandomState(42)
+    flags = pd.DataFrame(random.binomial(1, 0.05, (size, 8)), columns=[
+        column for classifier in bayes.classifiers for column in bayes.labels[classifier]
+    ])
+
+    def target():
+        df = labels.encode(flags.copy(), {label: bayes.labels[label] for label in bayes.classifiers})
+        df = labels.final_encode(df, list(bayes.classifiers), "final_decision")
+        return labels.macd_window_columns(df, bayes.vols)
+    return target
@@ -0,0 +1,72 @@
+from benchmarks.fixtures import make_trader, synthetic_candles, petr4_candles
+from benchmarks.harness import benchmark
+
+SIZES = (250, 1000, 4000)
+
+
+def _prepared(size):
+    trader = make_trader(synthetic_candles(size))
+    df = trader.get_historical_prices("BTC-LTC")[0]
+    return trader, df
+
+
+@benchmark(sizes=SIZES, repeat=3)
+def get_historical_prices(size):
+    trader = make_trader(synthetic_candles(size))
+    return lambda: trader.get_historical_prices("BTC-LTC")
+
+
+@benchmark(sizes=(None,), repeat=3)
+def get_historical_prices_petr4(size):
+    trader = make_trader(petr4_candles(size))
+    return lambda: trader.get_historical_prices("PETR4.SA")
+
+
+@benchmark(sizes=SIZES, repeat=3)
+def get_EMA(size):
+    trader, df = _prepared(size)
+    return lambda: trader.get_EMA(df.copy(), "EMA9", "EMA26")
+
+
+@benchmark(sizes=SIZES, repeat=3)
+def get_supports(size):
+    trader, df = _prepared(size)
+    return lambda: trader.get_supports(df.copy())
+
+
+@benchmark(sizes=SIZES, repeat=3)
+def get_resistences(size):
+    trader, df = _prepared(size)
+    return lambda: trader.get_resistences(df.copy())
+
+
+@benchmark(sizes=SIZES, repeat=3)
+def get_hammers(size):
+    trader, df = _prepared(size)
+    return lambda: trader.get_hammers(df.copy())
+
+
+@benchmark(sizes=SIZES, repeat=3)
+def get_tendencia_alta_baixa_divergencia(size):
+    trader, df = _prepared(size)
+    return lambda: trader.get_tendencia_alta_baixa_divergencia(df.copy())
+
+
+@benchmark(sizes=SIZES, repeat=3)
+def get_signals(size):
+    trader, df = _prepared(size)
+    return lambda: trader.get_signals(df.copy())
+
+
+@benchmark(sizes=(42, 1000), repeat=20)
+def calculate_rsi(size):
+    trader = make_trader(synthetic_candles(size))
+    return lambda: trader.calculate_rsi("BTC-LTC", period=14, unit="oneMin")
+
+
+@benchmark(sizes=(1000, 100000, 1000000), repeat=3)
+def macd_table(size):
+    import pandas as pd
+    from src.macd_table import macd_table
+    candles = pd.DataFrame(synthetic_candles(size))
+    return lambda: macd_table(candles["T"], candles["C"])
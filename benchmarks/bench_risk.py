@@ -0,0 +1,30 @@
+import numpy as np
+
+from benchmarks.harness import benchmark
+
+# Markets sized per cycle
+SIZES = (10, 100, 500)
+
+
+def _market(size, candles=2000, seed=0):
+    rng = np.random.default_rng(seed)
+    closes = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, (candles, size)), axis=0))
+    signals = rng.random((candles, size)) < 0.05
+    return closes, signals
+
+
+@benchmark(sizes=SIZES, repeat=5)
+def risk_allocate_cycle(size):
+    from src.risk import RiskEngine, rolling_volatility
+    closes, signals = _market(size, candles=15)
+    volatility = rolling_volatility(closes)[-1]
+    engine = RiskEngine(1.0, max_positions=20)
+    return lambda: engine.allocate(signals[-1], volatility)
+
+
+@benchmark(sizes=SIZES, repeat=3)
+def risk_evaluate(size):
+    from src.risk import RiskEngine
+    closes, signals = _market(size)
+    engine = RiskEngine(1.0, max_positions=20)
+    return lambda: engine.evaluate(closes, signals, commission=0.0025)
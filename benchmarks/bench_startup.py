@@ -0,0 +1,13 @@
+import subprocess
+import sys
+
+from benchmarks.harness import benchmark
+
+# Entry points, timed as a cold interpreter importing them
+SIZES = ("src.trader", "main", "utils.utils", "utils.bot", "src.backtest", "src.universe")
+
+
+@benchmark(sizes=SIZES, repeat=3)
+def cold_import(size):
+    command = [sys.executable, "-c", "import {}".format(size)]
+    return lambda: subprocess.run(command, check=True, stdout=subprocess.DEVNULL)
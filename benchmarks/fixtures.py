@@ -0,0 +1,150 @@
+"""
+   Offline datasets for the benchmarks: the PETR4 workbook and macd.csv shipped in the repository,
+   and seeded synthetic candles. ReplayOperator serves them through the exchange adapter interface
+   so that Trader code runs without any network access.
+"""
+from datetime import datetime, timedelta
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+macd_file_string = "./macd.csv"
+
+settings = {
+    "sound": False,
+    "tradeParameters": {
+        "tickerInterval": "oneMin",
+        "buy": {
+            "btcAmount": 0.001,
+            "rsiThreshold": 30,
+            "24HourVolumeThreshold": 10,
+            "minimumUnitPrice": 0.00001,
+            "maxOpenTrades": 3
+        },
+        "sell": {
+            "lossMarginThreshold": -5,
+            "rsiThreshold": 70,
+            "minProfitMarginThreshold": 0.5,
+            "profitMarginThreshold": 5
+        }
+    },
+    "pauseParameters": {
+        "buy": {"rsiThreshold": 0, "pauseTime": 0},
+        "sell": {"profitMarginThreshold": 0, "pauseTime": 0},
+        "balance": {"pauseTime": 0}
+    }
+}
+
+
+def synthetic_candles(size, seed=42, start=datetime(2021, 1, 1), step=timedelta(minutes=1)):
+    """
+    Seeded random walk candles in the adapter record format (T, O, H, L, C, V, BV)
+
+    :param size: Number of candles
+    :type size: int
+
+    :rtype: list
+    """
+    random = np.random.RandomState(seed)
+    close = 100 * np.exp(np.cumsum(random.normal(0, 0.002, size)))
+    open_ = np.concatenate([[close[0]], close[:-1]])
+    spread = np.abs(random.normal(0, 0.001, size)) * close
+    high = np.maximum(open_, close) + spread
+    low = np.minimum(open_, close) - spread
+    volume = random.lognormal(3, 1, size)
+    return [
+        {"T": start + step * i, "O": open_[i], "H": high[i], "L": low[i], "C": close[i], "V": volume[i],
+         "BV": volume[i] * close[i]}
+        for i in range(size)
+    ]
+
+
+@lru_cache(maxsize=None)
+def petr4():
+    """
+    The PETR4 indicator dataset, loaded once per run
+    """
+    from src import bayes
+    return bayes.load_dataset()
+
+
+def petr4_candles(size=None):
+    """
+    PETR4 daily candles from the workbook in the adapter record format, oldest first
+    """
+    df = petr4().sort_values("Data")
+    if size is not None:
+        df = df.tail(size)
+    volume = df["Volume"].astype(str).str.replace("M", "", regex=False).str.replace(",", ".", regex=False)
+    volume = pd.to_numeric(volume, errors="coerce").fillna(0) * 1e6
+    return [
+        {"T": row[0], "O": row[1], "H": row[2], "L": row[3], "C": row[4], "V": row[5], "BV": row[5] * row[4]}
+        for row in zip(df["Data"], df["Abertura"], df["Máximo"], df["Mínimo"], df["Fechamento"], volume)
+    ]
+
+
+def petr4_rows(size):
+    """
+    The first `size` rows of the PETR4 dataset by date, tiled when more rows than available are requested
+    """
+    df = petr4().sort_values("Data")
+    if size > len(df):
+        copies = []
+        for n in range(size // len(df) + 1):
+            copy = df.copy()
+            copy["Data"] = copy["Data"] + timedelta(days=(df["Data"].max() - df["Data"].min()).days * n + n)
+            copies.append(copy)
+        df = pd.concat(copies, ignore_index=True)
+    return df.head(size).reset_index(drop=True)
+
+
+@lru_cache(maxsize=None)
+def macd_table():
+    return pd.read_csv(macd_file_string, sep=";", index_col=0)
+
+
+class ReplayOperator(object):
+    """
+    Exchange adapter serving recorded or synthetic candles
+    """
+    _type = "Replay"
+    capabilities = frozenset(["historical_data", "market_summary", "bulk_summaries"])
+
+    def __init__(self, candles, coin_pairs=("BTC-LTC",)):
+        self.candles = candles
+        self.coin_pairs = list(coin_pairs)
+
+    def _get_type(self):
+        return self._type
+
+    def get_historical_data(self, coin_pair, period=None, unit=None):
+        if period is None:
+            return list(self.candles)
+        return self.candles[-period:]
+
+    def get_market_summary(self, coin_pair):
+        last = self.candles[-1]
+        return {
+            "success": True,
+            "message": "",
+            "result": [{
+                "MarketName": coin_pair, "High": last["H"], "Low": last["L"], "Volume": last["V"],
+                "Last": last["C"], "BaseVolume": last["BV"], "TimeStamp": str(last["T"]),
+                "Bid": last["C"] * 0.999, "Ask": last["C"] * 1.001, "OpenBuyOrders": 10, "OpenSellOrders": 10,
+                "PrevDay": self.candles[0]["C"], "Created": ""
+            }]
+        }
+
+    def get_market_summaries(self):
+        summary = self.get_market_summary(None)["result"][0]
+        return {"success": True, "message": "",
+                "result": [dict(summary, MarketName=coin_pair) for coin_pair in self.coin_pairs]}
+
+
+def make_trader(candles):
+    """
+    Builds a Trader wired to a ReplayOperator, without secrets so no message is ever sent
+    """
+    from src.trader import Trader
+    return Trader({}, settings, lambda secrets: ReplayOperator(candles))
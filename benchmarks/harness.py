@@ -0,0 +1,161 @@
+import gc
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+# Local to each machine (its timings only compare with its own), so it is kept out of git
+history_file_string = os.path.join(os.path.dirname(os.path.abspath(__file__)), "history.jsonl")
+
+registry = []
+
+
+def benchmark(sizes=(None,), repeat=5, group=None):
+    """
+    Registers a benchmark. The decorated function receives one data size, does its setup and returns
+    the zero-argument callable that is timed.
+
+    :param sizes: Data sizes to run the benchmark at
+    :type sizes: tuple
+    :param repeat: Number of timed runs per size
+    :type repeat: int
+    :param group: Group name used in reports, defaults to the module name
+    :type group: str
+    """
+    def decorator(function):
+        registry.append({
+            "name": function.__name__,
+            "group": group or function.__module__.split(".")[-1],
+            "function": function,
+            "sizes": sizes,
+            "repeat": repeat
+        })
+        return function
+    return decorator
+
+
+def measure(target, repeat):
+    """
+    Times a callable and measures the peak memory it allocates
+
+    :return: Timings in seconds and peak traced memory in bytes
+    :rtype: list, int
+    """
+    timings = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        target()
+        timings.append(time.perf_counter() - start)
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        target()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return timings, peak
+
+
+def run(name_filter=None, quick=False):
+    """
+    Runs every registered benchmark
+
+    :param name_filter: Only run benchmarks whose group.name contains this string
+    :type name_filter: str
+    :param quick: Only run the smallest size once
+    :type quick: bool
+
+    :return: One result dict per benchmark and size
+    :rtype: list
+    """
+    results = []
+    for entry in registry:
+        full_name = "{}.{}".format(entry["group"], entry["name"])
+        if name_filter and name_filter not in full_name:
+            continue
+        sizes = entry["sizes"][:1] if quick else entry["sizes"]
+        for size in sizes:
+            try:
+                target = entry["function"](size)
+            except ImportError as exception:
+                print("Skipping {}: {}".format(full_name, exception), file=sys.stderr)
+                break
+            timings, peak = measure(target, 1 if quick else entry["repeat"])
+            result = {
+                "name": full_name,
+                "size": size,
+                "runs": len(timings),
+                "min": min(timings),
+                "median": statistics.median(timings),
+                "peak_memory": peak
+            }
+            print("{:<55} {:>8} {:>12.6f} s {:>12.6f} s {:>10.1f} KiB".format(
+                full_name, str(size), result["min"], result["median"], peak / 1024
+            ))
+            results.append(result)
+    return results
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def record(results, file_string=history_file_string):
+    """
+    Appends a run to the benchmark history, one JSON object per line
+    """
+    entry = {
+        "date": datetime.now().isoformat(timespec="seconds"),
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "machine": platform.node(),
+        "results": results
+    }
+    with open(file_string, "a") as file:
+        file.write(json.dumps(entry) + "\n")
+    return entry
+
+
+def load_history(file_string=history_file_string):
+    if not os.path.exists(file_string):
+        return []
+    with open(file_string) as file:
+        return [json.loads(line) for line in file if line.strip()]
+
+
+def compare(previous, current):
+    """
+    Prints the speed and memory change of every benchmark present in both runs
+    """
+    before = {(result["name"], result["size"]): result for result in previous["results"]}
+    print("\nCompared with {} ({}):".format(previous["revision"], previous["date"]))
+    for result in current["results"]:
+        old = before.get((result["name"], result["size"]))
+        if old is None:
+            continue
+        speed = 100.0 * (result["median"] - old["median"]) / old["median"] if old["median"] else 0.0
+        memory = 100.0 * (result["peak_memory"] - old["peak_memory"]) / old["peak_memory"] if old["peak_memory"] else 0.0
+        print("{:<55} {:>8} time {:>+8.1f}%  memory {:>+8.1f}%".format(
+            result["name"], str(result["size"]), speed, memory
+        ))
+
+
+def import_benchmarks(modules):
+    """
+    Imports benchmark modules, skipping the ones whose dependencies are not installed
+    """
+    for module in modules:
+        try:
+            __import__(module)
+        except ImportError as exception:
+            print("Skipping {}: {}".format(module, exception), file=sys.stderr)
@@ -0,0 +1,47 @@
+"""
+   Runs the benchmark suite offline and appends the results to benchmarks/history.jsonl, this machine's history
+   (ignored by git) that --compare reads
+
+   python -m benchmarks.run [--filter get_supports] [--quick] [--compare] [--no-record]
+"""
+import argparse
+import warnings
+
+from benchmarks import harness
+
+modules = [
+    "benchmarks.bench_indicators",
+    "benchmarks.bench_decisions",
+    "benchmarks.bench_database",
+    "benchmarks.bench_adapters",
+    "benchmarks.bench_backtest",
+    "benchmarks.bench_risk",
+    "benchmarks.bench_startup",
+    "benchmarks.bench_bot",
+    "benchmarks.bench_charts"
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the benchmark suite")
+    parser.add_argument("--filter", help="Only run benchmarks whose name contains this string")
+    parser.add_argument("--quick", action="store_true", help="Run the smallest size once")
+    parser.add_argument("--compare", action="store_true", help="Compare with the previous recorded run")
+    parser.add_argument("--no-record", action="store_true", help="Do not append the run to the history")
+    args = parser.parse_args()
+
+    warnings.filterwarnings("ignore")
+    harness.import_benchmarks(modules)
+    print("{:<55} {:>8} {:>14} {:>14} {:>14}".format("benchmark", "size", "min", "median", "peak memory"))
+    results = harness.run(args.filter, args.quick)
+
+    history = harness.load_history()
+    current = {"revision": harness.git_revision(), "date": "now", "results": results}
+    if not args.no_record:
+        current = harness.record(results)
+    if args.compare and history:
+        harness.compare(history[-1], current)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+import argparse
+import time
+
+from src.logger import logger
+from src.operators import get_operator, names
+from utils.utils import get_secrets, get_settings
+
+
+def run_cycle(trader):
+    """
+    One full scan: sells on tracked pairs first, then buys on the remaining markets, both reading prices from
+    one snapshot of the market summaries when the operator has bulk summaries. The candles readers of the shared
+    candle cache ask for are published last
+    """
+    trader.refresh_snapshot()
+    trader.analyse_sells()
+    trader.analyse_buys()
+    trader.publish_candles()
+
+
+def profile(trader, cycles, output, interval):
+    """
+    Runs a number of cycles under the sampling profiler and writes the flame graph stacks and function table
+    """
+    from src.profiler import SamplingProfiler
+
+    with SamplingProfiler(interval=interval) as profiler:
+        for _ in range(cycles):
+            run_cycle(trader)
+    collapsed_file, table_file = profiler.write(output)
+    logger.warning("Profiled {} cycle(s), {} samples. Flame graph stacks: {} Function table: {}".format(
+        cycles, profiler.samples, collapsed_file, table_file
+    ))
+    print(profiler.function_table(limit=20))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the trading loop")
+    parser.add_argument("--operator", default="Bittrex", choices=names())
+    parser.add_argument("--sleep", type=float, default=10, help="Seconds to wait between cycles")
+    parser.add_argument("--profile", action="store_true", help="Profile a number of cycles and exit")
+    parser.add_argument("--cycles", type=int, default=1, help="Cycles to capture with --profile")
+    parser.add_argument("--profile-output", default="./logs/profile", help="Output directory for --profile")
+    parser.add_argument("--profile-interval", type=float, default=0.005, help="Seconds between profiler samples")
+    args = parser.parse_args()
+
+    from src.trader import Trader
+
+    trader = Trader(get_secrets(), get_settings(), get_operator(args.operator))
+    trader.initialise()
+
+    if args.profile:
+        profile(trader, args.cycles, args.profile_output, args.profile_interval)
+        return
+
+    while True:
+        run_cycle(trader)
+        time.sleep(args.sleep)
+
+
+if __name__ == "__main__":
+    main()
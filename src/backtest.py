@@ -0,0 +1,280 @@
+import numpy as np
+import pandas as pd
+
+from src.database import bittrex_trade_commission
+from src.trader import Trader
+
+TRADE_DTYPE = np.dtype([
+    ("buy_index", np.int64),
+    ("sell_index", np.int64),
+    ("quantity", np.float64),
+    ("buy_price", np.float64),
+    ("sell_price", np.float64),
+    ("buy_btc", np.float64),
+    ("sell_btc", np.float64),
+    ("profit_margin", np.float64)
+])
+
+
+def rolling_rsi(closing_prices, period=14, window=42):
+    """
+    Trader.calculate_rsi evaluated at every candle over the `window` closes ending on it.
+    Performs the same floating point operations in the same order as the live loop, so the values are identical
+
+    :param closing_prices: Closing prices, oldest first
+    :type closing_prices: np.ndarray
+    :param period: RSI period, the live strategy uses 14
+    :type period: int
+    :param window: Closes fetched per evaluation, the live strategy fetches period * 3
+    :type window: int
+
+    :return: RSI per candle, NaN where the window is incomplete or the average loss is 0
+    :rtype: np.ndarray
+    """
+    closes = np.asarray(closing_prices, dtype=np.float64)
+    size = len(closes)
+    rsi = np.full(size, np.nan)
+    if size < window:
+        return rsi
+    change = np.diff(closes)
+    gains = np.where(change > 0, change, 0.0)
+    losses = np.where(change < 0, np.abs(change), 0.0)
+    count = size - window + 1
+
+    average_gain = np.zeros(count)
+    average_loss = np.zeros(count)
+    for k in range(period):
+        average_gain += gains[k:k + count]
+        average_loss += losses[k:k + count]
+    average_gain /= period
+    average_loss /= period
+    for k in range(period, window - 1):
+        average_gain = (average_gain * (period - 1) + gains[k:k + count]) / period
+        average_loss = (average_loss * (period - 1) + losses[k:k + count]) / period
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rs = average_gain / average_loss
+        values = 100 - 100 / (1 + rs)
+    values[average_loss == 0] = np.nan
+    rsi[window - 1:] = values
+    return rsi
+
+
+class BacktestResult(object):
+    """
+    Trades and equity curve of a backtest run
+    """
+
+    def __init__(self, candles, trades, equity, initial_balance):
+        self.candles = candles
+        self.trades_array = trades
+        self.equity_array = equity
+        self.initial_balance = initial_balance
+
+    @property
+    def trades(self):
+        trades = pd.DataFrame(self.trades_array)
+        trades["buy_time"] = self.candles["T"].values[trades["buy_index"].values]
+        sell_index = trades["sell_index"].values
+        trades["sell_time"] = pd.Series(self.candles["T"].values[np.maximum(sell_index, 0)]).where(sell_index >= 0)
+        return trades
+
+    @property
+    def equity(self):
+        return pd.Series(self.equity_array, index=self.candles["T"].values, name="equity")
+
+    def summary(self):
+        closed = self.trades_array[self.trades_array["sell_index"] >= 0]
+        final_balance = self.equity_array[-1] if len(self.equity_array) else self.initial_balance
+        return {
+            "trades": len(self.trades_array),
+            "closed_trades": len(closed),
+            "win_rate": float(np.mean(closed["profit_margin"] > 0)) if len(closed) else 0.0,
+            "initial_balance": self.initial_balance,
+            "final_balance": float(final_balance),
+            "roi": float((final_balance - self.initial_balance) / self.initial_balance)
+        }
+
+
+class Backtest(object):
+    """
+    Replays the live RSI strategy of Trader.buy_strategy / Trader.sell_strategy over stored candles.
+    Signals are computed for every candle at once; the event loop only visits candles where a buy, a sell or a
+    pause can happen. Buys are filled at the ask and sells at the bid, both paying bittrex_trade_commission,
+    with one open trade per market as in Trader.analyse_buys. Commissions follow Database.get_profit_margin:
+    a buy of buy_btc costs buy_btc / (1 - commission), a sell of sell_btc returns sell_btc * (1 - commission)
+    """
+
+    # The very same checks the live strategy runs
+    check_buy_parameters = Trader.check_buy_parameters
+    check_sell_parameters = Trader.check_sell_parameters
+
+    def __init__(self, settings, commission=bittrex_trade_commission, spread=0.0, initial_balance=None,
+                 chunk_size=4096):
+        """
+        :param settings: The settings.json content
+        :type settings: dict
+        :param commission: Commission paid on each fill
+        :type commission: float
+        :param spread: Relative bid/ask spread around the close used by the fill model
+        :type spread: float
+        :param initial_balance: Starting BTC balance, defaults to the cost of one btcAmount buy with its commission
+        :type initial_balance: float
+        :param chunk_size: Candles scanned at a time when looking for the next sell
+        :type chunk_size: int
+        """
+        self.trade_params = settings["tradeParameters"]
+        self.pause_params = settings.get("pauseParameters", {})
+        self.commission = commission
+        self.spread = spread
+        self.initial_balance = initial_balance or self.buy_cost(self.trade_params["buy"]["btcAmount"])
+        self.chunk_size = chunk_size
+
+    @staticmethod
+    def prepare_candles(candles):
+        """
+        Accepts operator records (T, O, H, L, C, V, BV) or a DataFrame with those columns, sorted oldest first
+        """
+        df = candles if isinstance(candles, pd.DataFrame) else pd.DataFrame(candles)
+        df = df.copy()
+        df["T"] = pd.to_datetime(df["T"])
+        if "BV" not in df:
+            df["BV"] = df["V"] * df["C"]
+        return df.sort_values("T").reset_index(drop=True)
+
+    def signals(self, candles):
+        """
+        Computes the strategy inputs and buy signal for every candle
+
+        :return: Prepared candles and a dict of per-candle arrays (rsi, day_volume, ask, bid, buy, buy_pause)
+        :rtype: pd.DataFrame, dict
+        """
+        df = self.prepare_candles(candles)
+        close = df["C"].to_numpy(dtype=np.float64)
+        rsi = rolling_rsi(close)
+        day_volume = df.set_index("T")["BV"].astype(float).rolling("24h").sum().to_numpy()
+        ask = close * (1 + self.spread / 2)
+        bid = close * (1 - self.spread / 2)
+
+        valid = ~np.isnan(rsi)
+        buy = valid & self.check_buy_parameters(rsi, day_volume, ask)
+        buy_pause = np.zeros(len(df), dtype=bool)
+        if "buy" in self.pause_params and self.pause_params["buy"]["rsiThreshold"] > 0:
+            buy_pause = valid & ~buy & (rsi >= self.pause_params["buy"]["rsiThreshold"])
+        return df, {"rsi": rsi, "day_volume": day_volume, "ask": ask, "bid": bid, "buy": buy, "buy_pause": buy_pause}
+
+    def buy_cost(self, buy_btc):
+        """
+        BTC paid for a buy of buy_btc, commission included
+        """
+        return buy_btc / (1 - self.commission)
+
+    def profit_margin(self, buy_btc, quantity, bid):
+        """
+        Database.get_profit_margin on an array of bid prices
+        """
+        buy_btc_quantity = np.round(self.buy_cost(buy_btc), 8)
+        sell_btc_quantity = np.round(quantity * bid * (1 - self.commission), 8)
+        return 100 * (sell_btc_quantity - buy_btc_quantity) / buy_btc_quantity
+
+    def _pause_end(self, times, index, pause_type):
+        pause_time = pd.Timedelta(minutes=self.pause_params[pause_type]["pauseTime"])
+        return int(np.searchsorted(times, times[index] + pause_time, side="left"))
+
+    def _next_buy(self, events, times, start):
+        """
+        Index of the next candle at or after `start` where a buy happens, honouring buy pauses
+        """
+        buy_index, pause_index = events
+        while True:
+            position = np.searchsorted(buy_index, start)
+            buy = buy_index[position] if position < len(buy_index) else None
+            position = np.searchsorted(pause_index, start)
+            pause = pause_index[position] if position < len(pause_index) else None
+            if pause is None or (buy is not None and buy < pause):
+                return buy
+            start = max(self._pause_end(times, pause, "buy"), pause + 1)
+
+    def _next_sell(self, arrays, times, start, buy_btc, quantity):
+        """
+        Index of the next candle at or after `start` where the open trade is sold, honouring sell pauses
+        """
+        size = len(times)
+        sell_pause = "sell" in self.pause_params and self.pause_params["sell"]["profitMarginThreshold"] < 0
+        position = start
+        while position < size:
+            end = min(position + self.chunk_size, size)
+            rsi = arrays["rsi"][position:end]
+            margin = self.profit_margin(buy_btc, quantity, arrays["bid"][position:end])
+            valid = ~np.isnan(rsi)
+            sell = valid & self.check_sell_parameters(rsi, margin)
+            pause = valid & ~sell & (margin <= self.pause_params["sell"]["profitMarginThreshold"]) if sell_pause \
+                else np.zeros(len(rsi), dtype=bool)
+            events = np.flatnonzero(sell | pause)
+            if len(events) == 0:
+                position = end
+                continue
+            event = position + events[0]
+            if sell[events[0]]:
+                return event
+            position = max(self._pause_end(times, event, "sell"), event + 1)
+        return None
+
+    def run(self, candles):
+        """
+        Runs the strategy over the candles. Each cycle sells first then buys, as in main.run_cycle
+
+        :param candles: Operator records or DataFrame with T, C and V (and optionally BV) columns
+        :type candles: list, pd.DataFrame
+
+        :rtype: BacktestResult
+        """
+        df, arrays = self.signals(candles)
+        times = df["T"].values
+        size = len(df)
+        equity = np.full(size, float(self.initial_balance))
+        btc_amount = self.trade_params["buy"]["btcAmount"]
+        balance = float(self.initial_balance)
+        buy_events = np.flatnonzero(arrays["buy"]), np.flatnonzero(arrays["buy_pause"])
+        # A cycle sells before it buys, so a trade can open on the candle the previous one closed on: trades are
+        # only bounded by the buy signals, each opening on a later one than the trade before
+        trades = np.zeros(len(buy_events[0]), dtype=TRADE_DTYPE)
+        count = 0
+        start = 0
+
+        while self.trade_params["buy"]["maxOpenTrades"] > 0 and start < size:
+            buy = self._next_buy(buy_events, times, start)
+            if buy is None:
+                break
+            price = arrays["ask"][buy]
+            quantity = round(btc_amount / price, 8)
+            buy_btc = quantity * price
+            balance -= self.buy_cost(buy_btc)
+
+            sell = self._next_sell(arrays, times, buy + 1, buy_btc, quantity)
+            end = size if sell is None else sell
+            equity[buy:end] = balance + quantity * arrays["bid"][buy:end] * (1 - self.commission)
+
+            trade = trades[count]
+            trade["buy_index"] = buy
+            trade["quantity"] = quantity
+            trade["buy_price"] = price
+            trade["buy_btc"] = buy_btc
+            count += 1
+            if sell is None:
+                trade["sell_index"] = -1
+                trade["sell_price"] = np.nan
+                trade["sell_btc"] = np.nan
+                trade["profit_margin"] = self.profit_margin(buy_btc, quantity, arrays["bid"][-1])
+                break
+
+            sell_btc = quantity * arrays["bid"][sell]
+            balance += sell_btc * (1 - self.commission)
+            trade["sell_index"] = sell
+            trade["sell_price"] = arrays["bid"][sell]
+            trade["sell_btc"] = sell_btc
+            trade["profit_margin"] = self.profit_margin(buy_btc, quantity, arrays["bid"][sell])
+            equity[sell:] = balance
+            start = sell
+
+        return BacktestResult(df, trades[:count], equity, self.initial_balance)
@@ -0,0 +1,526 @@
+"""
+   Naive Bayes committee helpers ported from `Bayes aplicado.ipynb`, so that they can be imported,
+   benchmarked and reused outside of the notebook. Notebook globals (wait_time, features,
+   final_features, decision_weight) are explicit parameters here.
+"""
+from datetime import timedelta
+
+import pandas as pd
+
+from src.labels import encode, final_encode, macd_window_columns
+from src.recorder import Recorder
+from src.split_cache import split_cache
+
+dataset_file_string = "./database/indicadores petrobras_fase 1_ v1.2.xlsx"
+
+vols = [1, 2, 3, 5, 7, 9, 14, 21]
+
+base_features = ['Fechamento', 'Var.Dia (%)', 'Abertura', 'Mínimo', 'Máximo', 'IBOVESPA', '22D ROLLING BETA ',
+                 'Suporte ', 'Resistencia', 'Hammer']
+
+# Model 1 - Willians, Model 2 - 9MME, Model 3 - Sinais MACD, Model 4 - Divergencias
+features = {
+    'Willians_decisor': base_features + ['William %R'],
+    '9MME_decisor': base_features + ['Mínima 14', 'Máxima 14', '20MA', '12MME', '26MME', 'Oscilação diária',
+                                     'Volatilidade 5MA'],
+    'signalMACD_decisor': base_features + ['Mínima 14', 'Máxima 14', '9MME', '20MA', '12MME', '26MME',
+                                           'MACD Line', 'Signal Line', 'Histograma', 'Oscilação diária',
+                                           'Volatilidade 5MA'],
+    'divergency_decisor': base_features + ['Mínima 14', 'Máxima 14', '9MME', '20MA', '12MME', '26MME',
+                                           'MACD Line', 'Signal Line', 'Histograma', 'Oscilação diária',
+                                           'Volatilidade 5MA', 'Smin(21 pontos)', 'Rmax(21 pontos)']
+}
+
+labels = {
+    'Willians_decisor': ['Willians Buy', 'Willians Sell'],
+    '9MME_decisor': ['Posição Compra 9MME', 'Posição Venda 9MME'],
+    'signalMACD_decisor': ['Sinal de Compra (MACD)', 'Sinal de Venda (MACD)'],
+    'divergency_decisor': ['Tend. Alta por divergência', 'Tend.Baixa por divergência']  # tend alta-buy, baixa-sell
+}
+
+classifiers = ['Willians_decisor', '9MME_decisor', 'signalMACD_decisor', 'divergency_decisor']
+
+# Data de corte entre treino e teste
+train_cutoff = pd.to_datetime("01/02/2018", format="%d/%m/%Y")
+
+# Colunas dos registros de decisões e resultados
+model_decision_columns = [('Data', 'datetime64[ns]'), ('classifier', 'O'), ('real_decision', 'i8'),
+                          ('model_decision', 'i8'), ('value_fechamento', 'f8')]
+committee_decision_columns = [('Data', 'datetime64[ns]'), ('real_decision', 'i8'), ('value_fechamento', 'f8'),
+                              ('perc_aplicado', 'f8')]
+final_decision_columns = committee_decision_columns + [('stop_loss', 'f8'), ('final_model', 'i8'), ('holds', 'i8'),
+                                                       ('buys', 'i8'), ('sells', 'i8')]
+result_columns = [('Data', 'datetime64[ns]'), ('initial_maney', 'f8'), ('final_maney', 'f8'), ('quant_hold', 'f8'),
+                  ('value_fechamento', 'f8'), ('perc_usado', 'f8'), ('action', 'O')]
+
+
+def load_dataset(file_string=dataset_file_string, sheet_name="Tendencias"):
+    """
+    Reads the PETR4 indicators workbook and adds the rolling volatility and MACD signal columns
+
+    :param file_string: Path of the workbook
+    :type file_string: str
+    :param sheet_name: Sheet holding the indicators
+    :type sheet_name: str
+
+    :return: Dataset sorted by date, newest first
+    :rtype: pd.DataFrame
+    """
+    df = pd.read_excel(file_string, sheet_name=sheet_name).drop(['-', '--'], axis=1).dropna()
+    df = df.sort_values(['Data'])
+    macd = macd_window_columns(df, vols)
+    for volatilidade in vols:
+        df["Volatilidade_Close_"+str(volatilidade)] = df['Fechamento'].rolling(volatilidade).std()
+        df["Volatilidade_Min_"+str(volatilidade)] = df['Mínimo'].rolling(volatilidade).std()
+        df["Volatilidade_Max_"+str(volatilidade)] = df['Máximo'].rolling(volatilidade).std()
+        df["Compra_MACD_"+str(volatilidade)] = macd["Compra_MACD_"+str(volatilidade)]
+        df["Venda_MACD_"+str(volatilidade)] = macd["Venda_MACD_"+str(volatilidade)]
+    df = df.sort_values(['Data'], ascending=False).fillna(0)
+    return encode(df, {label: labels[label] for label in classifiers})
+
+
+def _encode(df, labels, label):
+    """
+        Sempre:
+            0-HODL
+            1-BUY
+            2-SELL
+    """
+    return encode(df, {label: labels})
+
+
+def _final_encode(df, labels, label):
+    """
+        Sempre:
+            0-HODL
+            1-BUY
+            2-SELL
+        no caso do final, ação = 1; ver nos indicadores e aplicar a ação escolhida
+    """
+    return final_encode(df, labels, label)
+
+
+def _filter_Train_n_Test(df, cutoff=train_cutoff):
+    train = df.loc[df.Data < cutoff]
+    test = df.loc[df.Data >= cutoff]
+    return train, test
+
+
+def _preprocess(df, X_labels, y_label, cutoff=train_cutoff):
+    """
+    Split e normalização compartilhados por todos os modelos (ver src.split_cache); as matrizes retornadas são somente leitura
+    """
+    return split_cache.get(df, X_labels, y_label, cutoff, _split_and_scale)
+
+
+def _split_and_scale(df, X_labels, y_label, cutoff=train_cutoff):
+    from sklearn.preprocessing import MinMaxScaler
+
+    train, test = _filter_Train_n_Test(df, cutoff)
+    X_train = train[X_labels]
+    y_train = train[y_label]
+    X_test = test[X_labels]
+    y_test = test[y_label]
+    scaler = MinMaxScaler()
+    # Prevenindo data leakage
+    scaler.fit(X_train)
+    X_train = scaler.transform(X_train)
+    X_test = scaler.transform(X_test)
+
+    return X_train, y_train, X_test, y_test, scaler
+
+
+def _apply_nb(model, name, df, features, label, silent):
+    X_train, y_train, X_test, y_test, scaler = _preprocess(df, features, label)
+
+    model.fit(X_train, y_train)
+
+    y_pred = model.predict(X_test)
+    if (silent):
+        return model, scaler
+    from sklearn import metrics
+    print(y_train.value_counts())
+    print("Accuracy (Model: {} | {}):".format(label, name), metrics.accuracy_score(y_test, y_pred))
+    return model, scaler
+
+
+def _apply_gaussianNB(df, features, label, silent=False):
+    """
+    Basea-se na suposição de que os dados seguem a distribuição normal para a predição da probabilidade a priori.
+    As features devem ter valores contínuos (caso dos valores de preço!)
+    """
+    from sklearn.naive_bayes import GaussianNB
+    return _apply_nb(GaussianNB(), "Gaussian Naive Bayes", df, features, label, silent)
+
+
+def _apply_complementNB(df, features, label, silent=False, _alpha=1):
+    """
+    Seguimos a distribuição normal, mas generalizamos a predição calculando a probabilidade do item pertencer a todas as classes.
+    (calculamos a probabilidade do item não pertencer a cada classe, selecionamos o menor valor, tendo em vista que calculamos a probabilidade de não ser da classe em cálculo)
+    Útil para datasets desbalanceados!
+    """
+    from sklearn.naive_bayes import ComplementNB
+    return _apply_nb(ComplementNB(alpha=_alpha), "Complement Naive Bayes", df, features, label, silent)
+
+
+def _apply_multinomialNB(df, features, label, silent=False, _alpha=1):
+    """
+    Esse algoritmo usa os dados em uma distribuição multinomial, que é uma generalização da distribuição binomial.
+    Essa distribuição é parametrizada por vetores θyi=(θy1,…,θyn), θyi é a probabilidade do evento i ocorrer, dado que a classe é y
+    """
+    from sklearn.naive_bayes import MultinomialNB
+    return _apply_nb(MultinomialNB(alpha=_alpha), "Multinomial Naive Bayes", df, features, label, silent)
+
+
+def _apply_model(df, model, scaler, features, label, decisions, wait_time=5):
+    """
+    Aplica as decisões dos primeiros modelos, para avaliação de como ponderar para uma gestão de risco baseada em resultados anteriores
+    """
+    # Variáveis de apoio
+    trades = 0 if len(decisions) == 0 else len(decisions) - 1
+    decisions = Recorder.from_frame(decisions, model_decision_columns, capacity=len(decisions) + len(df))
+
+    # Ordenar DF pela data (mais antiga primeiro)
+    df = df.sort_values('Data', ascending=True).reset_index(drop=True)
+
+    # para cada linha, aplicamos a decisão do modelo
+    for i, item in df.iterrows():
+        row_features = scaler.transform(pd.DataFrame(item[features]).T)
+        _data = item['Data']
+        if (trades > 0 and decisions[trades-1]['classifier'] == label):
+            _last_decision_date = pd.Timestamp(decisions[trades-1]['Data'])
+            _last_model_decision = decisions[trades-1]['model_decision']
+            _last_real_decision = decisions[trades-1]['real_decision']
+        else:
+            _last_decision_date = pd.to_datetime('01/01/1950')
+            _last_model_decision = 2
+            _last_real_decision = 2
+        _classifier = label
+        _real_decision = item[label]
+        _model_decision = model.predict(row_features)[0] if label != 'divergency_decisor' else item[label]  # No caso do decisor de divergência vamos usar o próprio dado real
+        _value_fechamento = item['Fechamento']
+        # se a data atual for maior que a data do ultimo trade e decisao diferente de HOLD e da anterior:
+        if ((_data >= _last_decision_date + timedelta(days=wait_time))):
+            if ((_model_decision != 0 and _model_decision != _last_model_decision) or (_real_decision != 0 and _real_decision != _last_real_decision)):
+                # Adicionamos nas decisões os dados de data, classificador, decisao real, decisao do modelo e valor
+                decisions.set(trades, Data=_data, classifier=_classifier, real_decision=_real_decision,
+                              model_decision=_model_decision, value_fechamento=_value_fechamento)
+                trades += 1
+    return decisions.to_frame()
+
+
+def _apply_decisions(model_decisions, classifier, money_start, decision_weight, n, silent_mode=False):
+    """
+    Aqui, aplicamos as decisões dos modelos sem uma gestão de risco, para gerar os pesos de ponderação para a gestão de risco;
+    "All in, All out!", ou seja, compramos tudo ou vendemos tudo!
+    """
+    last_decision = 2
+    money_atual = money_start
+    quant_comprada = 0
+    if (silent_mode == False):
+        print("--------------------------------------------------------")
+        print(classifier)
+        print("--------------------------------------------------------")
+    for i, row in model_decisions.iterrows():
+        if (row.model_decision != last_decision and row.model_decision != 0):
+            last_decision = row.model_decision
+            if (last_decision == 1):
+                quant_comprada = float(money_atual) / float(row.value_fechamento)
+                money_atual = float(money_atual) - (float(quant_comprada) * float(row.value_fechamento))
+                if (silent_mode == False):
+                    print("Decisão de compra -")
+                    print('Valor: {}'.format(str(row.value_fechamento)))
+                    print('Quantidade comprada: {}'.format(str(quant_comprada)))
+                    print("Money atual: {}".format(str(money_atual)))
+            elif (last_decision == 2):
+                money_comprado = float(quant_comprada) * float(row.value_fechamento)
+                money_atual = float(money_atual) + float(money_comprado)
+                if (silent_mode == False):
+                    print("Decisão de venda -")
+                    print('Valor: {}'.format(str(row.value_fechamento)))
+                    print('Quantidade vendida: {}'.format(str(quant_comprada)))
+                    print("Money atual: {}".format(str(money_atual)))
+        elif (silent_mode == False):
+            print("HODL!")
+    if (last_decision == 1):
+        money_atual = float(quant_comprada) * float(row.value_fechamento)
+    decision_weight.loc[n, 'classifier'] = classifier
+    decision_weight.loc[n, 'initial_maney'] = money_start
+    decision_weight.loc[n, 'final_maney'] = money_atual
+    decision_weight.loc[n, 'lucro_percentual'] = (money_atual - money_start)/money_start
+    return decision_weight
+
+
+def _apply_decisions_withperc(model_decisions, money_start, silent_mode=True):
+    """
+    Aplica as decisoes encontradas utilizando a ponderação dos melhores valores como método de gestão de risco
+    """
+    results = Recorder(result_columns, capacity=len(model_decisions) + 1)
+    last_decision = 2
+    money_atual = money_start
+    quant_comprada = 0
+    trades = 0
+    for i, row in model_decisions.iterrows():
+        if (row.real_decision != 0 and money_atual > 0):
+            data = row.Data
+            last_decision = row.real_decision
+            if (last_decision == 1):
+                action = 'compra'
+                money = float(money_atual) * float(row.perc_aplicado)
+                quant_acomprar = (float(money) / float(row.value_fechamento))
+                quant_comprada = quant_comprada + quant_acomprar
+                money_atual = float(money_atual) - (money)
+                if (silent_mode == False):
+                    print("--------------------------")
+                    print("Decisão de compra -")
+                    print('Valor: {}'.format(str(row.value_fechamento)))
+                    print('Quantidade comprada: {}'.format(str(quant_acomprar)))
+                    print('Quantidade em hold: '+str(quant_comprada))
+                    print("Money atual: {}".format(str(money_atual)))
+
+            elif (last_decision == 2):
+                action = 'venda'
+                quant_vender = float(quant_comprada) * float(row.perc_aplicado)
+                quant_comprada = float(quant_comprada) - float(quant_vender)
+                money_comprado = float(quant_vender) * float(row.value_fechamento)
+                money_atual = float(money_atual) + float(money_comprado)
+                if (silent_mode == False):
+                    print("--------------------------")
+                    print("Decisão de venda -")
+                    print('Valor: {}'.format(str(row.value_fechamento)))
+                    print('Quantidade vendida: {}'.format(str(quant_vender)))
+                    print('Quantidade em hold: '+str(quant_comprada))
+                    print("Money atual: {}".format(str(money_atual)))
+        elif (silent_mode == False):
+            print("HODL!")
+        results.set(trades, Data=data, initial_maney=money_start, final_maney=money_atual, quant_hold=quant_comprada,
+                    value_fechamento=float(row.value_fechamento), perc_usado=float(row.perc_aplicado), action=action)
+        trades += 1
+    if (last_decision == 1 or quant_comprada > 0):
+        money_atual = money_atual + (float(quant_comprada) * float(row.value_fechamento))
+        quant_comprada = 0
+        results.set(trades, Data=data, initial_maney=money_start, final_maney=money_atual, quant_hold=quant_comprada,
+                    value_fechamento=float(row.value_fechamento), perc_usado=float(row.perc_aplicado), action='final')
+    return results.to_frame()
+
+
+def _get_model_decisions(df, classifiers, scalers, models, features, decision_weight, wait_time=5, silent_mode=True):
+    """
+    Aqui, utilizando os modelos encontrados:
+        -verificamos quantos modelos consideram cada ação (buy, hold, sell),
+        -caso todos consiredem hold, não faz nada;
+        -caso a maioria seja buy/sell, compramos com a soma da ponderação encontrada a partir dos resultados anteriores
+    """
+    decisions = Recorder(committee_decision_columns, capacity=len(df))
+    # Variáveis de apoio
+    trades = 0
+
+    # Ordenar DF pela data (mais antiga primeiro)
+    df = df.sort_values('Data', ascending=True).reset_index(drop=True)
+    for i, item in df.iterrows():
+        _buy = []
+        _sell = []
+        _hold = []
+        _value_fechamento = item['Fechamento']
+        for classifier in classifiers:
+            row_features = scalers.get(
+                classifier
+            ).transform(
+                pd.DataFrame(
+                    item[features.get(classifier)]
+                ).T
+            )
+            _model_decision = (models.get(classifier).predict(row_features)[0] if classifier != 'divergency_decisor' else item[classifier])
+            if (_model_decision == 1):
+                _buy.append(decision_weight.loc[decision_weight.classifier == classifier, 'new_weight'].values[0])
+            elif (_model_decision == 2):
+                _sell.append(decision_weight.loc[decision_weight.classifier == classifier, 'new_weight'].values[0])
+            else:
+                _hold.append(1)
+        if (len(_hold) == 4):
+            _model_decision = 0
+            perc_ = 0
+        elif (len(_buy) > len(_sell)):
+            _model_decision = 1
+            perc_ = sum(_buy)
+            _data = item['Data']
+
+        else:
+            _model_decision = 2
+            perc_ = sum(_sell)
+            _data = item['Data']
+
+        if (perc_ > 0):
+            if (trades > 0):
+                _last_decision_date = pd.Timestamp(decisions[trades-1]['Data'])
+                _last_real_decision = decisions[trades-1]['real_decision']
+            else:
+                _last_decision_date = pd.to_datetime('01/01/1950')
+                _last_real_decision = 2
+            # se a data atual for maior que a data do ultimo trade e decisao diferente de HOLD e da anterior:
+            if ((_data >= _last_decision_date + timedelta(days=wait_time))):
+                if ((_model_decision != 0 and _model_decision != _last_real_decision)):
+                    # Adicionamos nas decisões os dados de data, classificador, decisao real, decisao do modelo e valor
+                    decisions.append(
+                        Data=_data,
+                        real_decision=_model_decision,
+                        value_fechamento=_value_fechamento,
+                        perc_aplicado=perc_)
+                    trades += 1
+    return decisions.to_frame()
+
+
+def _get_final_decisions(df, _stop_loss, _sell_by_stoploss, wait_time, final_scaler, final_model, classifiers, scalers,
+                         models, features, final_features, decision_weight):
+    """
+        -Função final com modelo de trade!
+        Iremos, utilizando os suportes como stop loss, e quando encontrar um preço de fechamento
+    igual ou menor ao suporte em um ponto de suporte, a venda de x% (definido pela var _sell_by_stoploss), aplicar os modelos encontrados quando o modelo final decidir agir.
+
+    """
+    # Variáveis de apoio
+    trades = 0
+    _last_decision_date = pd.to_datetime('01/01/1950')
+    _last_real_decision = 2
+    decisions = Recorder(final_decision_columns, capacity=len(df))
+    # Ordenar DF pela data (mais antiga primeiro)
+    df = df.sort_values('Data', ascending=True).reset_index(drop=True)
+
+    for i, item in df.iterrows():
+        _buy = []
+        _sell = []
+        _hold = []
+        _value_fechamento = item['Fechamento']
+        if (item['Suporte '] == 1):
+            _stop_loss = item['Mínimo']
+        row_features = final_scaler.transform(pd.DataFrame(item[final_features]).T)
+        _model_decision = final_model.predict(row_features)[0]  ## Pegamos a decisão do modelo geral
+        decisao_modelo_final = _model_decision
+        if (_model_decision == 1):  ## se for uma decisão de ação,
+            for classifier in classifiers:  ## aplicaremos os modelos criados anteriormente
+                row_features = scalers.get(
+                    classifier
+                ).transform(
+                    pd.DataFrame(
+                        item[features.get(classifier)]
+                    ).T
+                )
+                _model_decision = (models.get(classifier).predict(row_features)[0] if classifier != 'divergency_decisor' else item[classifier])
+                if (_model_decision == 1):
+                    _buy.append(decision_weight.loc[decision_weight.classifier == classifier, 'new_weight'].values[0])
+                elif (_model_decision == 2):
+                    _sell.append(decision_weight.loc[decision_weight.classifier == classifier, 'new_weight'].values[0])
+                else:
+                    _hold.append(decision_weight.loc[decision_weight.classifier == classifier, 'new_weight'].values[0])
+        if (decisao_modelo_final == 0):  ## Usamos um comitê dos decisores: o mais votado, vira a ação! caso o modelo inicial seja hold, aplica:
+            _model_decision = 0
+            perc_ = 0
+        elif (len(_buy) > len(_sell)):
+            _model_decision = 1
+            perc_ = sum(_buy)
+        elif (len(_sell) > len(_buy)):
+            _model_decision = 2
+            perc_ = sum(_sell)
+        else:
+            _model_decision = 0
+            perc_ = 0
+        _data = item['Data']
+
+        if (_model_decision > 0):
+            if (trades > 0):
+                _last_decision_date = pd.Timestamp(decisions[-1]['Data'])
+                _last_real_decision = decisions[-1]['real_decision']
+        # se a data atual for maior que a data do ultimo trade e decisao diferente de HOLD e da anterior:
+        if ((_data >= _last_decision_date + timedelta(days=wait_time))):
+            if (_value_fechamento <= _stop_loss and item['Suporte '] == 1):  # se encontrarmos um preço de fechamento menor ou igual ao suporte e um ponto de suporte, vendemos x%
+                _model_decision = 2
+                perc_ = _sell_by_stoploss
+            if ((_model_decision != 0)):
+                # Adicionamos nas decisões os dados de data, classificador, decisao real, decisao do modelo e valor
+                decisions.append(
+                    Data=_data,
+                    real_decision=_model_decision,
+                    value_fechamento=_value_fechamento,
+                    perc_aplicado=perc_,
+                    stop_loss=_stop_loss,
+                    holds=len(_hold),
+                    buys=len(_buy),
+                    sells=len(_sell),
+                    final_model=decisao_modelo_final)
+                trades += 1
+    return decisions.to_frame()
+
+
+def _print_decisions(decisions):
+    """
+    Função auxiliar para printar as decisões
+    """
+    print("Data inicial: {}".format(decisions.head(1).Data.values[0]))
+    print("Dinheiro inicial: R${:.2f}".format(decisions.tail(1).initial_maney.values[0]))
+    print("Data final: {}".format(decisions.tail(1).Data.values[0]))
+    print("Dinheiro final: R${:.2f}".format(decisions.tail(1).final_maney.values[0]))
+    print("Lucro final : {:.2f}%".format(((decisions.tail(1).final_maney.values[0] - decisions.tail(1).initial_maney.values[0])/decisions.tail(1).initial_maney.values[0]) * 100))
+
+
+def final_feature_columns(df):
+    """
+    Features of the final model: the four encoded decisions plus the volatility and MACD signal window columns
+    """
+    final_features = list(classifiers)
+    for prefix in ('Volatilidade', 'Compra_MACD_', 'Venda_MACD_'):
+        final_features += [column for column in df.columns if column.startswith(prefix)]
+    return final_features
+
+
+def train_committee(df, wait_time=5, quant=100):
+    """
+    Trains the committee as in `Bayes aplicado.ipynb`: one model per classifier, the decision weights from their
+    all in/all out results on the training period, and the final MultinomialNB model
+
+    :param df: Dataset returned by load_dataset
+    :type df: pd.DataFrame
+    :param wait_time: Days between decisions while weighting the classifiers
+    :type wait_time: int
+    :param quant: Shares bought with the starting money
+    :type quant: int
+
+    :return: models, scalers, features, decision_weight, final_model, final_scaler and final_features
+    :rtype: dict
+    """
+    train, test = _filter_Train_n_Test(df)
+    money_start = test.tail(1).Fechamento.values[0] * quant
+
+    models = {}
+    scalers = {}
+    decisions = pd.DataFrame(columns=['Data', 'classifier', 'real_decision', 'model_decision', 'value_fechamento'])
+    for label in classifiers:
+        apply = _apply_complementNB if label == 'divergency_decisor' else _apply_gaussianNB
+        models[label], scalers[label] = apply(df, features[label], label, silent=True)
+        decisions = _apply_model(train, models[label], scalers[label], features[label], label, decisions, wait_time)
+
+    model_decisions = decisions[['Data', 'classifier', 'model_decision', 'value_fechamento']]
+    model_decisions = model_decisions.drop_duplicates(subset=['Data', 'classifier', 'model_decision'], keep='first')
+    decision_weight = pd.DataFrame(columns=['classifier', 'initial_maney', 'final_maney', 'lucro_percentual'])
+    for n, classifier in enumerate(model_decisions.classifier.drop_duplicates()):
+        decision_weight = _apply_decisions(model_decisions.loc[model_decisions.classifier == classifier], classifier,
+                                           money_start, decision_weight, n, silent_mode=True)
+    # O decisor de divergência usa o dado real, recebe 60% do lucro dos demais
+    perc_total = sum(decision_weight.lucro_percentual)
+    decision_weight.loc[4, 'classifier'] = 'divergency_decisor'
+    decision_weight.loc[4, 'lucro_percentual'] = perc_total * 0.6
+    perc_total = sum(decision_weight.lucro_percentual)
+    decision_weight.loc[:, 'new_weight'] = decision_weight.loc[:, 'lucro_percentual'] / perc_total
+    decision_weight = decision_weight[['classifier', 'new_weight']]
+
+    df = _final_encode(df.copy(), list(classifiers), 'final_decision')
+    final_features = final_feature_columns(df)
+    final_model, final_scaler = _apply_multinomialNB(df, final_features, 'final_decision', silent=True)
+    return {
+        'models': models,
+        'scalers': scalers,
+        'features': {label: features[label] for label in classifiers},
+        'decision_weight': decision_weight,
+        'final_model': final_model,
+        'final_scaler': final_scaler,
+        'final_features': final_features
+    }
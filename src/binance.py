@@ -1,6 +1,7 @@
 import pandas as pd
 import numpy as np
-from binance.client import Client
+
+from src.metrics import InstrumentedClient
 
 class Binance(object):
     """
@@ -15,11 +16,13 @@ class Binance(object):
         _api_secret = secrets["binance"]["apiSecret"]
         self.api_key = str(_api_key) if _api_key is not None else ""
         self.api_secret = str(_api_secret) if _api_secret is not None else ""
-        self.client = Client(_api_key, _api_secret)
+        from binance.client import Client
+        self.client = InstrumentedClient(Client(_api_key, _api_secret), self._type)
 
+    # Values of Client.KLINE_INTERVAL_1MINUTE and KLINE_INTERVAL_5MINUTE, so the client is only imported on use
     binance_interval = {
-        'oneMin': Client.KLINE_INTERVAL_1MINUTE,
-        'fiveMin': Client.KLINE_INTERVAL_5MINUTE
+        'oneMin': '1m',
+        'fiveMin': '5m'
     }
     _order_status_to_IsOpen = {
         'NEW':True,
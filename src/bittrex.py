@@ -23,6 +23,7 @@ except ImportError:
     encrypted = False
 
 from src.logger import logger
+from src.metrics import track_api_call
 from src.directory_utilities import write_json_to_file
 
 BUY_ORDER_BOOK = "buy"
@@ -129,7 +130,8 @@ class Bittrex(object):
         apisign = hmac.new(self.api_secret.encode(),
                            request_url.encode(),
                            hashlib.sha512).hexdigest()
-        return self.dispatch(request_url, apisign)
+        with track_api_call(self._type, method):
+            return self.dispatch(request_url, apisign)
 
     def get_historical_data(self, market, period, unit):
         """
@@ -149,10 +151,11 @@ class Bittrex(object):
                                                                                                               unit)
 
         try:
-            historical_data = requests.get(request_url,
-                                           headers={"apisign": hmac.new(self.api_secret.encode(), request_url.encode(),
-                                                                        hashlib.sha512).hexdigest()}
-                                           ).json()
+            with track_api_call(self._type, "GetTicks"):
+                historical_data = requests.get(request_url,
+                                               headers={"apisign": hmac.new(self.api_secret.encode(), request_url.encode(),
+                                                                            hashlib.sha512).hexdigest()}
+                                               ).json()
             return historical_data["result"][-period:]
         except (json.decoder.JSONDecodeError, TypeError) as exception:
             logger.exception(exception)
@@ -0,0 +1,68 @@
+"""
+   Local store of candles, one file per ticker in the adapter record columns (T, O, H, L, C, V and optionally BV).
+   Files are Parquet when pyarrow is installed, CSV otherwise; both are read back the same way.
+"""
+import os
+
+import pandas as pd
+
+from src.directory_utilities import validate_or_make_directory
+
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
+candles_directory_string = "./database/candles"
+
+
+def default_format():
+    return "parquet" if pyarrow is not None else "csv"
+
+
+def _file_string(directory, ticker, file_format):
+    return os.path.join(directory, "{}.{}".format(ticker, file_format))
+
+
+def list_tickers(directory=candles_directory_string):
+    """
+    Tickers with candles in the store, sorted
+    """
+    if not os.path.isdir(directory):
+        return []
+    return sorted({os.path.splitext(name)[0] for name in os.listdir(directory)
+                   if name.endswith(".csv") or name.endswith(".parquet")})
+
+
+def read_candles(ticker, directory=candles_directory_string):
+    """
+    Candles of a ticker, oldest first
+
+    :param ticker: Ticker or coin pair (ex: PETR4.SA, BTC-LTC)
+    :type ticker: str
+
+    :rtype: pd.DataFrame
+    """
+    if pyarrow is not None and os.path.exists(_file_string(directory, ticker, "parquet")):
+        df = pd.read_parquet(_file_string(directory, ticker, "parquet"))
+    else:
+        df = pd.read_csv(_file_string(directory, ticker, "csv"), parse_dates=["T"])
+    return df.sort_values("T").reset_index(drop=True)
+
+
+def write_candles(ticker, candles, directory=candles_directory_string, file_format=None):
+    """
+    Stores candles given as adapter records or a DataFrame
+
+    :return: The file written
+    :rtype: str
+    """
+    df = candles if isinstance(candles, pd.DataFrame) else pd.DataFrame(candles)
+    file_format = file_format or default_format()
+    file_string = _file_string(directory, ticker, file_format)
+    validate_or_make_directory(file_string)
+    if file_format == "parquet":
+        df.to_parquet(file_string, index=False)
+    else:
+        df.to_csv(file_string, index=False)
+    return file_string
@@ -0,0 +1,468 @@
+"""
+   Chart rendering for the bot and dashboards. A chart is a plotly figure dict with four rows (candles, volume,
+   EMAs with the crossovers, MACD) whose traces hold the frame's numpy arrays, the candle colors coming from
+   one array comparison instead of a loop per candle. Figures are exported as PNG or SVG by plotly's headless
+   kaleido backend, or as figure JSON for dashboards drawing them with plotly.js, and kept in an LRU cache
+   keyed by (market, interval, last candle timestamp, format) and a digest of the last candle and the crossovers,
+   so repeated requests skip the export while a still open candle or a new crossover renders again.
+
+   Long histories are downsampled before they reach a figure, so its payload stays bounded: candles are merged
+   into buckets keeping each bucket's open, high, low and close (and summed volume), line series keep the points
+   picked by Largest-Triangle-Three-Buckets, and overlapping highlighted ranges are merged. Zooming renders the
+   visible range again, at full detail once it holds fewer candles than the point budget.
+"""
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from src import metrics
+from src.logger import logger
+
+INCREASING_COLOR = '#3D9970'
+DECREASING_COLOR = '#FF4136'
+
+signal_markers = {"Buy": "triangle-up", "Sell": "triangle-down"}
+signal_colors = {"Buy": INCREASING_COLOR, "Sell": DECREASING_COLOR}
+
+image_formats = ("png", "svg")
+
+rows = 4
+
+# Points per trace a chart is downsampled to
+max_points = 2000
+
+line_columns = ("EMA_Short", "EMA_Long", "MACD", "MACD_9")
+
+
+def candle_colors(values, increasing=INCREASING_COLOR, decreasing=DECREASING_COLOR):
+    """
+    increasing where a value is above the one before it, decreasing otherwise (and for the first)
+
+    :param values: Closes (or any series), oldest first
+    :type values: np.ndarray
+
+    :rtype: np.ndarray
+    """
+    values = np.asarray(values, dtype=np.float64)
+    before = np.empty(len(values))
+    before[:1] = np.inf
+    before[1:] = values[:-1]
+    return np.where(values > before, increasing, decreasing).astype(object)
+
+
+def bucket_starts(size, buckets):
+    """
+    First position of each of (at most) buckets runs of consecutive rows of equal length
+
+    :rtype: np.ndarray
+    """
+    return np.unique(np.linspace(0, size, min(buckets, size) + 1).astype(np.int64)[:-1])
+
+
+def downsample_ohlc(df, buckets=max_points):
+    """
+    Candles merged into buckets of consecutive candles: first Datetime and Open, highest High, lowest Low,
+    last Close and summed Volume, so every bucket still spans the whole price range of its candles
+
+    :param df: Candles with Datetime, Open, High, Low, Close and Volume
+    :type df: pd.DataFrame
+    :param buckets: Most candles returned, the frame itself being returned when it is not longer
+    :type buckets: int
+
+    :rtype: pd.DataFrame
+    """
+    if len(df) <= buckets:
+        return df
+    starts = bucket_starts(len(df), buckets)
+    ends = np.append(starts[1:], len(df)) - 1
+    return pd.DataFrame({
+        "Datetime": df["Datetime"].to_numpy()[starts],
+        "Open": df["Open"].to_numpy()[starts],
+        "High": np.maximum.reduceat(df["High"].to_numpy(dtype=np.float64), starts),
+        "Low": np.minimum.reduceat(df["Low"].to_numpy(dtype=np.float64), starts),
+        "Close": df["Close"].to_numpy()[ends],
+        "Volume": np.add.reduceat(df["Volume"].to_numpy(dtype=np.float64), starts)
+    })
+
+
+def lttb(x, y, threshold=max_points):
+    """
+    Positions of the points Largest-Triangle-Three-Buckets keeps from a line: the first and last points, and
+    in each bucket between them the point making the largest triangle with the point kept before it and the
+    mean of the next bucket. Peaks and troughs survive, unlike with a plain stride
+
+    :param x: Abscissas, ascending (datetimes are taken as nanoseconds)
+    :type x: np.ndarray
+    :param y: Ordinates
+    :type y: np.ndarray
+    :param threshold: Points kept
+    :type threshold: int
+
+    :rtype: np.ndarray
+    """
+    size = len(y)
+    if threshold >= size or threshold < 3:
+        return np.arange(size)
+    x = np.asarray(x)
+    x = (x.astype(np.int64) if np.issubdtype(x.dtype, np.datetime64) else x).astype(np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    edges = np.linspace(1, size - 1, threshold - 1).astype(np.int64)
+    # Mean point of every bucket, the last point standing in for the bucket after the last one
+    counts = np.diff(edges)
+    mean_x = np.append(np.add.reduceat(x[1:size - 1], edges[:-1] - 1) / counts, x[-1])
+    valid = ~np.isnan(y[1:size - 1])
+    sums = np.add.reduceat(np.where(valid, y[1:size - 1], 0.0), edges[:-1] - 1)
+    with np.errstate(invalid="ignore"):
+        mean_y = np.append(sums / np.add.reduceat(valid, edges[:-1] - 1), y[-1])
+    y = np.where(np.isnan(y), -np.inf, y)
+    kept = np.empty(threshold, dtype=np.int64)
+    kept[0], kept[-1] = 0, size - 1
+    previous = 0
+    for bucket in range(threshold - 2):
+        low, high = edges[bucket], edges[bucket + 1]
+        dx, dy = x[previous] - mean_x[bucket + 1], mean_y[bucket + 1] - y[previous]
+        area = np.abs(dx * (y[low:high] - y[previous]) - (x[previous] - x[low:high]) * dy)
+        previous = low + int(np.argmax(area))
+        kept[bucket + 1] = previous
+    return kept
+
+
+def merge_ranges(starts, ends, gap=0):
+    """
+    Overlapping (or closer than gap) ranges merged into one, sorted by start
+
+    :param starts: Range starts
+    :type starts: np.ndarray
+    :param ends: Range ends
+    :type ends: np.ndarray
+    :param gap: Distance under which two ranges merge, in the unit of the ranges
+    :return: Starts and ends of the merged ranges
+    :rtype: np.ndarray, np.ndarray
+    """
+    starts, ends = np.asarray(starts), np.asarray(ends)
+    if len(starts) == 0:
+        return starts, ends
+    order = np.argsort(starts, kind="stable")
+    starts, ends = starts[order], ends[order]
+    reach = np.maximum.accumulate(ends)
+    new = np.ones(len(starts), dtype=bool)
+    new[1:] = starts[1:] > reach[:-1] + gap
+    first = np.flatnonzero(new)
+    return starts[first], np.maximum.reduceat(ends, first)
+
+
+def _axes(spacing=0.075):
+    """
+    Layout axes of the rows, top row first, every x axis following the first one's zoom
+    """
+    height = (1 - spacing * (rows - 1)) / rows
+    layout = {}
+    for row in range(1, rows + 1):
+        suffix = "" if row == 1 else str(row)
+        top = 1 - (row - 1) * (height + spacing)
+        layout["xaxis" + suffix] = {"anchor": "y" + suffix, "domain": [0, 1], "showticklabels": row == rows}
+        if row > 1:
+            layout["xaxis" + suffix]["matches"] = "x"
+        layout["yaxis" + suffix] = {"anchor": "x" + suffix, "domain": [max(top - height, 0), top]}
+    layout["xaxis"]["rangeslider"] = {"visible": False}
+    return layout
+
+
+def _trace(row, **trace):
+    suffix = "" if row == 1 else str(row)
+    trace.update(xaxis="x" + suffix, yaxis="y" + suffix)
+    return trace
+
+
+def _line(row, df, column, points, **trace):
+    dates = df["Datetime"].to_numpy()
+    values = df[column].to_numpy(dtype=np.float64)
+    if points is not None:
+        kept = lttb(dates, values, points)
+        dates, values = dates[kept], values[kept]
+    return _trace(row, type="scatter", x=dates, y=values, name=column, **trace)
+
+
+def build_traces(df, crossovers=None, points=None):
+    """
+    Traces of a candle frame. Indicator traces are only added for the columns the frame has
+
+    :param df: Candles with Datetime, Open, High, Low, Close and Volume, optionally EMA_Short, EMA_Long,
+        MACD and MACD_9 (Trader.get_historical_prices)
+    :type df: pd.DataFrame
+    :param crossovers: EMA crossovers with Datetime, EMA_Short and Signal (Trader.get_signals), their trace
+        being kept when empty so the trace indices only depend on the columns
+    :type crossovers: pd.DataFrame
+    :param points: Most points per trace, None to keep every candle
+    :type points: int
+
+    :rtype: list
+    """
+    if points is not None and len(df) <= points:
+        points = None
+    candles = df if points is None else downsample_ohlc(df, points)
+    dates = candles["Datetime"].to_numpy()
+    traces = [
+        _trace(1, type="candlestick", x=dates, open=candles["Open"].to_numpy(), high=candles["High"].to_numpy(),
+               low=candles["Low"].to_numpy(), close=candles["Close"].to_numpy(), name="candlestick"),
+        _trace(2, type="bar", x=dates, y=candles["Volume"].to_numpy(),
+               marker={"color": candle_colors(candles["Close"])}, name="Volume")
+    ]
+    for column in ("EMA_Short", "EMA_Long"):
+        if column in df:
+            traces.append(_line(3, df, column, points, mode="lines"))
+    if crossovers is not None:
+        signals = crossovers["Signal"]
+        traces.append(_trace(3, type="scatter", mode="markers", x=crossovers["Datetime"].to_numpy(),
+                             y=crossovers["EMA_Short"].to_numpy(), name="Buy/Sell",
+                             marker={"symbol": signals.map(signal_markers).to_numpy(),
+                                     "color": signals.map(signal_colors).to_numpy(), "size": 15}))
+    if "MACD" in df:
+        macd = _line(4, df, "MACD", points, mode="lines+markers", line={"color": "black"})
+        macd["marker"] = {"color": candle_colors(macd["y"]), "size": 3}
+        traces.append(macd)
+    if "MACD_9" in df:
+        traces.append(_line(4, df, "MACD_9", points, mode="lines", line={"color": "blue"}))
+    return traces
+
+
+def build_figure(df, crossovers=None, title=None, points=max_points):
+    """
+    Figure dict of a candle frame, accepted by plotly.graph_objects.Figure and plotly.io
+
+    :param points: Most points per trace, None to keep every candle
+    :type points: int
+
+    :rtype: dict
+    """
+    layout = _axes()
+    layout["showlegend"] = False
+    if title is not None:
+        layout["title"] = {"text": title}
+    return {"data": build_traces(df, crossovers, points), "layout": layout}
+
+
+def build_levels_figure(df, hammers, res_lvl, sup_lvl, points=max_points):
+    """
+    Candles and volume with the resistance and support levels, the analysed area (from the last lowest close to
+    the last highest close) and the hammers, each hammer highlighting the two candles before it and the one after
+    it. Hammer ranges closer than a downsampled bucket merge, so the shapes stay as bounded as the traces
+
+    :param hammers: Hammer candles with Datetime
+    :type hammers: pd.DataFrame
+    :param res_lvl: Resistance as the fraction of the close range below the highest close (ex: 0.236)
+    :type res_lvl: float
+    :param sup_lvl: Support as the fraction of the close range below the highest close (ex: 0.764)
+    :type sup_lvl: float
+
+    :rtype: dict
+    """
+    closes = df["Close"].to_numpy(dtype=np.float64)
+    dates = df["Datetime"].to_numpy()
+    high, low = closes.max(), closes.min()
+    candles = df if len(df) <= points else downsample_ohlc(df, points)
+    data = [
+        _trace(1, type="candlestick", x=candles["Datetime"].to_numpy(), open=candles["Open"].to_numpy(),
+               high=candles["High"].to_numpy(), low=candles["Low"].to_numpy(), close=candles["Close"].to_numpy(),
+               name="candlestick"),
+        _trace(2, type="bar", x=candles["Datetime"].to_numpy(), y=candles["Volume"].to_numpy(),
+               marker={"color": candle_colors(candles["Close"], '#17BECF', '#7F7F7F')}, name="Volume")
+    ]
+
+    layout = {key: value for key, value in _axes().items() if key[-1] not in "34"}
+    layout["xaxis"]["showticklabels"] = False
+    layout["xaxis2"]["showticklabels"] = True
+    layout["yaxis"]["domain"], layout["yaxis2"]["domain"] = [0.55, 1], [0, 0.45]
+    shapes, annotations = [], []
+    for name, level in (("Resistência", high - (high - low) * res_lvl), ("Suporte", high - (high - low) * sup_lvl)):
+        shapes.append({"type": "line", "xref": "x domain", "x0": 0, "x1": 1, "yref": "y", "y0": level, "y1": level,
+                       "line": {"dash": "dot"}})
+        annotations.append({"text": name, "xref": "x domain", "x": 1, "yref": "y", "y": level,
+                            "xanchor": "right", "yanchor": "top", "showarrow": False})
+
+    def vrect(x0, x1, text, color, position):
+        shapes.append({"type": "rect", "xref": "x", "x0": x0, "x1": x1, "yref": "paper", "y0": 0, "y1": 1,
+                       "fillcolor": color, "opacity": 0.25, "line": {"width": 0}, "layer": "below"})
+        annotations.append({"text": text, "xref": "x", "x": x0 if position == "left" else x1, "yref": "paper",
+                            "y": 1 if position == "left" else 0, "showarrow": False,
+                            "xanchor": position, "yanchor": "top" if position == "left" else "bottom"})
+
+    vrect(dates[np.flatnonzero(closes == low)[-1]], dates[np.flatnonzero(closes == high)[-1]], "Área analisada",
+          "green", "right")
+    if hammers is not None and len(hammers):
+        moments = pd.to_datetime(hammers["Datetime"]).to_numpy()
+        bucket = (dates[-1] - dates[0]) / max(len(candles) - 1, 1) if len(dates) > 1 else np.timedelta64(0)
+        starts, ends = merge_ranges(moments - np.timedelta64(2, "m"), moments + np.timedelta64(1, "m"), bucket)
+        for start, end in zip(starts, ends):
+            vrect(start, end, "Hammer", "blue", "left")
+    layout.update(showlegend=False, shapes=shapes, annotations=annotations)
+    return {"data": data, "layout": layout}
+
+
+def _jsonable(value):
+    if isinstance(value, np.ndarray):
+        if np.issubdtype(value.dtype, np.datetime64):
+            return np.datetime_as_string(value, unit="s").tolist()
+        if value.dtype.kind == "f":
+            return np.where(np.isnan(value), None, value).tolist()
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError("{} is not JSON serializable".format(type(value).__name__))
+
+
+def to_json(figure):
+    """
+    Figure as plotly.js JSON, NaN becoming null
+
+    :rtype: bytes
+    """
+    return json.dumps(figure, default=_jsonable, separators=(",", ":")).encode("utf-8")
+
+
+def export(figure, fmt="png", width=1200, height=900):
+    """
+    Image (png or svg) or JSON of a figure. Images need plotly and kaleido
+
+    :rtype: bytes
+    """
+    if fmt == "json":
+        return to_json(figure)
+    if fmt not in image_formats:
+        raise ValueError("Unknown chart format '{}', use one of: {}".format(fmt, ", ".join(image_formats + ("json",))))
+    import plotly.io as pio
+    return pio.to_image(figure, format=fmt, width=width, height=height)
+
+
+class ChartRenderer(object):
+    """
+    Renders market charts, serving repeated requests for the same candles from an LRU cache
+    """
+
+    def __init__(self, max_entries=128, width=1200, height=900, points=max_points):
+        """
+        :param max_entries: Rendered charts kept in memory
+        :type max_entries: int
+        :param points: Most points per trace of a chart
+        :type points: int
+        :param width: Image width in pixels
+        :type width: int
+        :param height: Image height in pixels
+        :type height: int
+        """
+        self.max_entries = max_entries
+        self.width = width
+        self.height = height
+        self.points = points
+        self.entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _digest(df, crossovers):
+        """
+        Hash of the last candle and the crossovers: the last candle changes until it closes, under the same
+        timestamp, and the crossovers are passed apart from the candles
+        """
+        digest = hashlib.sha1(repr([df[column].iat[-1] for column in df.columns]).encode("utf-8"))
+        if crossovers is not None and len(crossovers):
+            digest.update(pd.util.hash_pandas_object(crossovers, index=False).values.tobytes())
+        return digest.hexdigest()
+
+    def _cached(self, key, build):
+        with self._lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                metrics.cache.hit("chart")
+                return self.entries[key]
+        metrics.cache.miss("chart")
+        content = build()
+        with self._lock:
+            self.entries[key] = content
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        return content
+
+    def render(self, market, interval, df, crossovers=None, fmt="png", start=None, end=None):
+        """
+        Chart of a market's candles, exported again only when the last candle or the crossovers changed. A dashboard
+        zooming in asks again with the visible range as start and end, getting that range with finer detail
+
+        :param market: Market name (ex: BTC-LTC), part of the cache key and the title
+        :type market: str
+        :param interval: Candle interval (ex: fiveMin), part of the cache key
+        :type interval: str
+        :param df: Candles, see build_traces
+        :type df: pd.DataFrame
+        :param fmt: png, svg or json
+        :type fmt: str
+        :param start: First candle time shown, defaults to the first candle
+        :type start: pd.Timestamp
+        :param end: Last candle time shown, defaults to the last candle
+        :type end: pd.Timestamp
+
+        :rtype: bytes
+        """
+        if len(df) == 0:
+            raise ValueError("No candles to chart for {}".format(market))
+        key = (market, interval, df["Datetime"].iloc[-1], fmt, start, end, self._digest(df, crossovers))
+
+        def build():
+            logger.debug("Rendering the {} {} chart as {}".format(market, interval, fmt))
+            frame, shown = df, crossovers
+            if start is not None or end is not None:
+                dates = df["Datetime"].to_numpy()
+                first = 0 if start is None else np.searchsorted(dates, np.datetime64(start))
+                last = len(dates) if end is None else np.searchsorted(dates, np.datetime64(end), side="right")
+                frame = df.iloc[first:last]
+                if len(frame) == 0:
+                    raise ValueError("No {} candles to chart between {} and {}".format(market, start, end))
+                if crossovers is not None:
+                    moments = crossovers["Datetime"]
+                    shown = crossovers[(moments >= frame["Datetime"].iloc[0]) & (moments <= frame["Datetime"].iloc[-1])]
+            figure = build_figure(frame, shown, "{} {}".format(market, interval), self.points)
+            return export(figure, fmt, self.width, self.height)
+        return self._cached(key, build)
+
+    def tail(self, market, interval, df, since, crossovers=None):
+        """
+        Only the candles after since, as plotly.js JSON of {"updates": [{"traces": [index], "update": {...}}]},
+        one Plotly.extendTraces call per entry on a dashboard already showing the chart up to since. The volume
+        and MACD colors of the first new candle compare with the candle before it. The tail holds the raw candles,
+        not downsampled ones, so it only matches a full render of a chart within the point budget; a dashboard
+        showing a downsampled chart should ask render again instead
+
+        :param since: Last candle the dashboard has
+        :type since: pd.Timestamp
+
+        :rtype: bytes
+        """
+        dates = df["Datetime"].to_numpy()
+        start = int(np.searchsorted(dates, np.datetime64(since), side="right"))
+        key = (market, interval, df["Datetime"].iloc[-1] if len(df) else None, "tail", since,
+               self._digest(df, crossovers) if len(df) else None)
+
+        def build():
+            # The candle before the tail sets the first new colors, then is dropped from the candle traces
+            frame = df.iloc[max(start - 1, 0):]
+            new = crossovers[crossovers["Datetime"] > since] if crossovers is not None else None
+            updates = []
+            for index, trace in enumerate(build_traces(frame, new)):
+                size = len(trace["x"]) - (1 if start > 0 and trace["name"] != "Buy/Sell" else 0)
+                if size <= 0:
+                    continue
+                update = {field: [trace[field][len(trace["x"]) - size:]]
+                          for field in ("x", "y", "open", "high", "low", "close") if field in trace}
+                for field in ("color", "symbol"):
+                    if isinstance(trace.get("marker", {}).get(field), np.ndarray):
+                        update["marker." + field] = [trace["marker"][field][len(trace["x"]) - size:]]
+                updates.append({"traces": [index], "update": update})
+            return to_json({"updates": updates})
+        return self._cached(key, build)
+
+    def clear(self):
+        with self._lock:
+            self.entries.clear()
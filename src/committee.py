@@ -0,0 +1,188 @@
+"""
+   Live inference for the Naive Bayes committee of `_get_final_decisions`. The final MultinomialNB gates the
+   action, the classifiers vote with their decision weights and the last support low acts as stop loss.
+   Scaling is folded into each model's arrays when the committee is loaded, so a decision costs a few
+   matrix products instead of a MinMaxScaler and a scikit-learn predict per model.
+"""
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+
+from src.bayes import final_decision_columns
+from src.recorder import Recorder
+
+# Classifiers voting with the labelled value instead of a model prediction, as in _get_final_decisions
+real_label_classifiers = ('divergency_decisor',)
+
+
+class FusedMember(object):
+    """
+    A committee member predicting straight from unscaled features
+    """
+
+    def __init__(self, member, columns):
+        """
+        :param member: Registry member
+        :type member: src.model_registry.ScaledPredictor
+        :param columns: Column order of the feature vectors the committee receives
+        :type columns: list
+        """
+        self.index = np.array([columns.index(feature) for feature in member.features])
+        predictor = member.predictor
+        self.classes = predictor.classes
+        self.gaussian = predictor.kind == "gaussian"
+        if self.gaussian:
+            # Σ ((x·s + o - θ)² / σ²) = Σ (s² / σ²)·(x - (θ - o) / s)²
+            self.weights = member.scale ** 2 / predictor.var
+            self.centers = (predictor.theta - member.offset) / member.scale
+            self.bias = predictor.log_prior + predictor.log_norm
+        else:
+            # (x·s + o)·Fᵀ = x·(s·Fᵀ) + o·Fᵀ
+            self.weights = member.scale[:, None] * predictor.feature_log_prob.T
+            self.bias = np.dot(member.offset, predictor.feature_log_prob.T)
+            if predictor.kind == "multinomial" or len(self.classes) == 1:
+                self.bias = self.bias + predictor.class_log_prior
+
+    def predict(self, X):
+        """
+        :param X: Feature vectors in committee column order
+        :type X: np.ndarray
+        """
+        X = X[:, self.index]
+        if self.gaussian:
+            joint = self.bias - 0.5 * np.einsum("cf,ncf->nc", self.weights, (X[:, None, :] - self.centers) ** 2)
+        else:
+            joint = np.dot(X, self.weights) + self.bias
+        return self.classes[np.argmax(joint, axis=1)]
+
+
+class Committee(object):
+    """
+    Stateful committee decisions, one candle at a time (step) or over a history (decide)
+    """
+
+    def __init__(self, record, stop_loss=0, sell_by_stoploss=0.9, wait_time=3):
+        """
+        :param record: Committee loaded from the model registry
+        :type record: src.model_registry.CommitteeRecord
+        :param stop_loss: Initial stop loss price, replaced by the low of every support candle
+        :type stop_loss: float
+        :param sell_by_stoploss: Share of the position sold when the stop loss is hit
+        :type sell_by_stoploss: float
+        :param wait_time: Minimum days between two decisions
+        :type wait_time: int
+        """
+        self.classifiers = list(record.classifiers)
+        self.weights = np.array([record.decision_weight[classifier] for classifier in self.classifiers])
+        self.sell_by_stoploss = sell_by_stoploss
+        self.wait_time = timedelta(days=wait_time)
+        self.initial_stop_loss = stop_loss
+
+        columns = ['Fechamento', 'Mínimo', 'Suporte ']
+        for member in record.members.values():
+            columns += [feature for feature in member.features if feature not in columns]
+        columns += [classifier for classifier in self.classifiers if classifier not in columns]
+        self.columns = columns
+        self.final = FusedMember(record.final, columns)
+        self.members = [None if classifier in real_label_classifiers
+                        else FusedMember(record.members[classifier], columns) for classifier in self.classifiers]
+        self.label_index = np.array([columns.index(classifier) for classifier in self.classifiers])
+        self.reset()
+
+    def reset(self):
+        self.stop_loss = self.initial_stop_loss
+        self.last_decision_date = pd.to_datetime('01/01/1950')
+        self.decisions = Recorder(final_decision_columns)
+
+    def vectors(self, rows):
+        """
+        :param rows: Feature rows with the dataset column names
+        :type rows: pd.DataFrame
+
+        :rtype: np.ndarray
+        """
+        return rows[self.columns].to_numpy(dtype=np.float64)
+
+    def votes(self, X):
+        """
+        Final model decision and classifier votes for each feature vector
+
+        :rtype: np.ndarray, np.ndarray
+        """
+        final = self.final.predict(X)
+        votes = np.empty((len(X), len(self.classifiers)), dtype=np.int64)
+        for k, member in enumerate(self.members):
+            votes[:, k] = X[:, self.label_index[k]] if member is None else member.predict(X)
+        return final, votes
+
+    def _advance(self, date, x, final, votes):
+        """
+        Applies one candle to the committee state, as one iteration of _get_final_decisions
+
+        :return: Action (0-HODL, 1-BUY, 2-SELL) and share of the money or position to trade
+        :rtype: int, float
+        """
+        close, low, support = x[0], x[1], x[2]
+        if support == 1:
+            self.stop_loss = low
+        buys = sells = holds = 0
+        buy_perc = sell_perc = 0
+        if final == 1:
+            for k, vote in enumerate(votes):
+                if vote == 1:
+                    buys += 1
+                    buy_perc += self.weights[k]
+                elif vote == 2:
+                    sells += 1
+                    sell_perc += self.weights[k]
+                else:
+                    holds += 1
+        if final == 0:
+            action, perc = 0, 0
+        elif buys > sells:
+            action, perc = 1, buy_perc
+        elif sells > buys:
+            action, perc = 2, sell_perc
+        else:
+            action, perc = 0, 0
+
+        if action > 0 and len(self.decisions) > 0:
+            self.last_decision_date = pd.Timestamp(self.decisions[-1]['Data'])
+        if date < self.last_decision_date + self.wait_time:
+            return 0, 0
+        if close <= self.stop_loss and support == 1:
+            action, perc = 2, self.sell_by_stoploss
+        if action != 0:
+            self.decisions.append(Data=date, real_decision=action, value_fechamento=close, perc_aplicado=perc,
+                                  stop_loss=self.stop_loss, holds=holds, buys=buys, sells=sells, final_model=final)
+        return action, perc
+
+    def step(self, row, date=None):
+        """
+        Decision for one new candle
+
+        :param row: Feature values by dataset column name (a dataset row, dict or pd.Series)
+        :param date: Candle date, defaults to row['Data']
+
+        :return: Action (0-HODL, 1-BUY, 2-SELL) and share of the money or position to trade
+        :rtype: int, float
+        """
+        x = np.fromiter((row[column] for column in self.columns), dtype=np.float64, count=len(self.columns))
+        final, votes = self.votes(x[None, :])
+        return self._advance(pd.Timestamp(row['Data'] if date is None else date), x, final[0], votes[0])
+
+    def decide(self, df):
+        """
+        Decisions over a history, oldest candle first. Same rows as bayes._get_final_decisions
+
+        :rtype: pd.DataFrame
+        """
+        self.reset()
+        df = df.sort_values('Data', ascending=True).reset_index(drop=True)
+        X = self.vectors(df)
+        final, votes = self.votes(X)
+        dates = pd.to_datetime(df['Data'])
+        for i in range(len(df)):
+            self._advance(dates[i], X[i], final[i], votes[i])
+        return self.decisions.to_frame()
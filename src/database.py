@@ -2,7 +2,7 @@ import pydash as py_
 import time
 
 from src.directory_utilities import get_json_from_file, write_json_to_file
-from src.logger import logger
+from src.logger import logger, span
 
 bittrex_trade_commission = 0.0025
 
@@ -34,6 +34,18 @@ class Database(object):
             self.trades = get_json_from_file(self.trades_file_string, default_trades)
             self.app_data = get_json_from_file(self.app_data_file_string, default_app_data)
 
+        def save(self, file_string, content):
+            """
+            Used to write a database file to disk
+
+            :param file_string: The database file path (ex: ./database/trades.json)
+            :type file_string: str
+            :param content: The JSON content to write
+            :type content: dict
+            """
+            with span("persistence", file=file_string):
+                write_json_to_file(file_string, content)
+
         def store_initial_buy(self, coin_pair, buy_order_uuid):
             """
             Used to place an initial trade in the database
@@ -57,7 +69,7 @@ class Database(object):
             self.trades["trackedCoinPairs"].append(coin_pair)
             self.trades["trades"].append(new_buy_object)
 
-            write_json_to_file(self.trades_file_string, self.trades)
+            self.save(self.trades_file_string, self.trades)
 
         def store_buy(self, bittrex_order, stats):
             """
@@ -79,7 +91,7 @@ class Database(object):
             trade["quantity"] = round(bittrex_order["Quantity"] - bittrex_order["QuantityRemaining"], 8)
             trade["buy"] = order
 
-            write_json_to_file(self.trades_file_string, self.trades)
+            self.save(self.trades_file_string, self.trades)
 
         def store_sell(self, bittrex_order, stats):
             """
@@ -101,7 +113,7 @@ class Database(object):
             trade["sell"] = order
             self.trades["trackedCoinPairs"].remove(bittrex_order["Exchange"])
 
-            write_json_to_file(self.trades_file_string, self.trades)
+            self.save(self.trades_file_string, self.trades)
 
         def pause_buy(self, coin_pair):
             """
@@ -112,7 +124,7 @@ class Database(object):
             """
             self.app_data["coinPairs"].remove(coin_pair)
 
-            write_json_to_file(self.app_data_file_string, self.app_data)
+            self.save(self.app_data_file_string, self.app_data)
 
         def pause_sell(self, coin_pair):
             """
@@ -127,7 +139,7 @@ class Database(object):
             if self.app_data["pauseTime"]["sell"] is None:
                 self.app_data["pauseTime"]["sell"] = time.time()
 
-            write_json_to_file(self.app_data_file_string, self.app_data)
+            self.save(self.app_data_file_string, self.app_data)
 
         def store_coin_pairs(self, btc_coin_pairs):
             """
@@ -139,7 +151,7 @@ class Database(object):
             self.app_data["coinPairs"] = btc_coin_pairs
             self.app_data["pauseTime"]["buy"] = time.time()
 
-            write_json_to_file(self.app_data_file_string, self.app_data)
+            self.save(self.app_data_file_string, self.app_data)
 
         def resume_sells(self):
             """
@@ -151,7 +163,7 @@ class Database(object):
             self.app_data["pausedTrackedCoinPairs"] = []
             self.app_data["pauseTime"]["sell"] = None
 
-            write_json_to_file(self.app_data_file_string, self.app_data)
+            self.save(self.app_data_file_string, self.app_data)
 
         def reset_balance_notifier(self, current_balance=None):
             """
@@ -164,7 +176,7 @@ class Database(object):
                 self.app_data["previousBalance"] = current_balance
             self.app_data["pauseTime"]["balance"] = time.time()
 
-            write_json_to_file(self.app_data_file_string, self.app_data)
+            self.save(self.app_data_file_string, self.app_data)
 
         def check_resume(self, pause_time, pause_type):
             """
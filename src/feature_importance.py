@@ -0,0 +1,154 @@
+"""
+   Drop-column feature importance, as `drop_col_feat_imp` in `Bayes aplicado.ipynb`.
+   MinMaxScaler scales every column on its own, so the data is split and scaled once and columns are
+   dropped from the scaled matrix. GaussianNB scores come from the per-class statistics computed once;
+   other estimators are refit on each reduced matrix in a process pool.
+"""
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from sklearn.base import clone
+from sklearn.naive_bayes import GaussianNB
+
+from src import bayes
+
+
+def petr4_features(df):
+    """
+    Every feature column of the PETR4 dataset: all columns but the labels, their source columns, Data and Volume
+    """
+    excluded = set(bayes.classifiers) | {column for columns in bayes.labels.values() for column in columns}
+    excluded |= {'Data', 'Volume'}
+    return [column for column in df.columns if column not in excluded]
+
+
+def _gaussian_terms(X, means, variances):
+    """
+    Per feature terms of the GaussianNB joint log likelihood
+
+    :return: log(2πσ²) per class and feature, and (x-θ)²/σ² per sample, class and feature
+    :rtype: np.ndarray, np.ndarray
+    """
+    log_terms = np.log(2.0 * np.pi * variances)
+    square_terms = (X[:, None, :] - means[None, :, :]) ** 2 / variances[None, :, :]
+    return log_terms, square_terms
+
+
+def gaussian_drop_scores(X, y, var_smoothing=1e-9, priors=None):
+    """
+    Training accuracy of a GaussianNB fitted on all columns and on each set of all columns but one,
+    computed from one pass of per-class means and variances.
+    Dropping the column with the largest variance changes sklearn's variance smoothing, those columns are
+    recomputed with the smoothing of the remaining columns
+
+    :param X: Scaled training matrix
+    :type X: np.ndarray
+    :param y: Training labels
+    :type y: np.ndarray
+    :param var_smoothing: GaussianNB var_smoothing
+    :type var_smoothing: float
+    :param priors: GaussianNB priors, None for the class frequencies
+    :type priors: np.ndarray
+
+    :return: Score with all columns and the score with each column dropped
+    :rtype: float, np.ndarray
+    """
+    X = np.asarray(X, dtype=np.float64)
+    y = np.asarray(y)
+    classes, y_index, counts = np.unique(y, return_inverse=True, return_counts=True)
+    if priors is None:
+        priors = counts / counts.sum()
+    means = np.array([X[y_index == k].mean(axis=0) for k in range(len(classes))])
+    raw_variances = np.array([X[y_index == k].var(axis=0) for k in range(len(classes))])
+
+    feature_variances = np.var(X, axis=0)
+    epsilon = var_smoothing * feature_variances.max()
+    log_terms, square_terms = _gaussian_terms(X, means, raw_variances + epsilon)
+    joint = np.log(priors)[None, :] - 0.5 * log_terms.sum(axis=1)[None, :] - 0.5 * square_terms.sum(axis=2)
+    benchmark_score = np.mean(classes[joint.argmax(axis=1)] == y)
+
+    # Removing the contribution of one feature at a time, for every feature at once
+    dropped = joint[:, :, None] + 0.5 * (log_terms[None, :, :] + square_terms)
+    drop_scores = np.mean(classes[dropped.argmax(axis=1)] == y[:, None], axis=0)
+
+    for column in range(X.shape[1]):
+        others = np.delete(feature_variances, column)
+        if len(others) == 0 or var_smoothing * others.max() == epsilon:
+            continue
+        keep = np.delete(np.arange(X.shape[1]), column)
+        log_terms, square_terms = _gaussian_terms(X[:, keep], means[:, keep],
+                                                  raw_variances[:, keep] + var_smoothing * others.max())
+        joint = np.log(priors)[None, :] - 0.5 * log_terms.sum(axis=1)[None, :] - 0.5 * square_terms.sum(axis=2)
+        drop_scores[column] = np.mean(classes[joint.argmax(axis=1)] == y)
+    return benchmark_score, drop_scores
+
+
+def _refit_score(model, X, y):
+    return clone(model).fit(X, y).score(X, y)
+
+
+def refit_drop_scores(model, X, y, random_state=42, n_jobs=None):
+    """
+    Training accuracy of a clone of the model fitted on all columns and on each set of all columns but one
+
+    :param n_jobs: Worker processes for the refits, 1 to refit in this process
+    :type n_jobs: int
+
+    :rtype: float, np.ndarray
+    """
+    model = clone(model)
+    model.random_state = random_state
+    X = np.asarray(X)
+    y = np.asarray(y)
+    reduced = [np.delete(X, column, axis=1) for column in range(X.shape[1])]
+    benchmark_score = _refit_score(model, X, y)
+    if n_jobs == 1:
+        return benchmark_score, np.array([_refit_score(model, X_drop, y) for X_drop in reduced])
+    with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+        scores = executor.map(_refit_score, [model] * len(reduced), reduced, [y] * len(reduced))
+        return benchmark_score, np.array(list(scores))
+
+
+def drop_col_feat_imp(model, df, features, label, random_state=42, n_jobs=None):
+    """
+    Drop-column importance of each feature: the training score lost when the model is fitted without it
+
+    :param model: Estimator to evaluate; GaussianNB is scored from cached statistics, anything else is refit
+    :param df: Dataset with the features and the encoded label
+    :type df: pd.DataFrame
+    :param features: Feature columns
+    :type features: list
+    :param label: Encoded label column
+    :type label: str
+    :param random_state: random_state set on the refit clones
+    :type random_state: int
+    :param n_jobs: Worker processes for the refits of other estimators
+    :type n_jobs: int
+
+    :return: One row per feature with the columns col, score and label
+    :rtype: pd.DataFrame
+    """
+    X_train, y_train, X_test, y_test, scaler = bayes._preprocess(df, features, label)
+    if type(model) is GaussianNB:
+        benchmark_score, drop_scores = gaussian_drop_scores(X_train, y_train.values, model.var_smoothing,
+                                                            model.priors)
+    else:
+        benchmark_score, drop_scores = refit_drop_scores(model, X_train, y_train.values, random_state, n_jobs)
+    return pd.DataFrame({'col': list(features), 'score': benchmark_score - drop_scores, 'label': label})
+
+
+def rank_features(df, models, features=None, n_jobs=None):
+    """
+    Drop-column importance of every feature for each label, most important first
+
+    :param models: Estimator per encoded label column
+    :type models: dict
+    :param features: Feature columns, defaults to every PETR4 feature
+    :type features: list
+
+    :rtype: pd.DataFrame
+    """
+    features = features or petr4_features(df)
+    importances = [drop_col_feat_imp(model, df, features, label, n_jobs=n_jobs) for label, model in models.items()]
+    return pd.concat(importances, ignore_index=True).sort_values(['label', 'score'], ascending=[True, False])
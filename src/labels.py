@@ -0,0 +1,122 @@
+"""
+   Vectorized labelling for the Naive Bayes datasets: HODL/BUY/SELL targets for many label groups at once,
+   and rolling window counts of the MACD signals (the Compra_MACD_n / Venda_MACD_n columns of macd.csv)
+   for any list of windows.
+"""
+import numpy as np
+import pandas as pd
+
+HODL = 0
+BUY = 1
+SELL = 2
+
+macd_signal_prefixes = {
+    'Sinal de Compra (MACD)': 'Compra_MACD_',
+    'Sinal de Venda (MACD)': 'Venda_MACD_'
+}
+
+
+def encode_targets(buy, sell):
+    """
+    HODL/BUY/SELL codes from buy and sell flags, SELL winning when both are set
+
+    :param buy: Buy flags, one column per label
+    :type buy: np.ndarray
+    :param sell: Sell flags, same shape as buy
+    :type sell: np.ndarray
+
+    :rtype: np.ndarray
+    """
+    return np.where(sell == 1, SELL, np.where(buy == 1, BUY, HODL))
+
+
+def encode(df, groups):
+    """
+    Adds one encoded label per group, as bayes._encode does for a single one
+
+    :param df: Dataset with the buy and sell flag columns
+    :type df: pd.DataFrame
+    :param groups: Label name to its [buy column, sell column]
+    :type groups: dict
+
+    :rtype: pd.DataFrame
+    """
+    names = list(groups)
+    buy = df[[groups[name][0] for name in names]].to_numpy()
+    sell = df[[groups[name][1] for name in names]].to_numpy()
+    codes = encode_targets(buy, sell)
+    for k, name in enumerate(names):
+        df[name] = codes[:, k]
+    return df
+
+
+def final_encode(df, labels, label):
+    """
+    1 when any of the labels asks for an action, 0 otherwise, as bayes._final_encode
+    """
+    df[label] = (df[labels].sum(axis=1).to_numpy().astype(int) > 0).astype(np.int64)
+    return df
+
+
+def binarize(values):
+    """
+    1 where a count is a number above 0, 0 elsewhere (NaN included)
+    """
+    values = np.asarray(values, dtype=np.float64)
+    with np.errstate(invalid="ignore"):
+        return (~np.isnan(values) & (np.trunc(values) > 0)).astype(np.int64)
+
+
+def rolling_sums(values, windows):
+    """
+    Rolling sums of every column for every window in one pass over the cumulative sums.
+    Same values as Series.rolling(window).sum(): NaN until a window is full and for every window holding a NaN
+
+    :param values: Signal flags, rows oldest first, one column per signal
+    :type values: np.ndarray
+    :param windows: Window lengths
+    :type windows: list
+
+    :return: Array of shape (len(windows), rows, columns)
+    :rtype: np.ndarray
+    """
+    values = np.asarray(values, dtype=np.float64)
+    if values.ndim == 1:
+        values = values[:, None]
+    valid = ~np.isnan(values)
+    zeros = np.zeros((1, values.shape[1]))
+    # NaNs are summed as 0 and counted apart, so one missing flag only blanks the windows it falls in
+    cumulative = np.vstack([zeros, np.cumsum(np.where(valid, values, 0.0), axis=0)])
+    counts = np.vstack([zeros, np.cumsum(valid, axis=0)])
+    sums = np.full((len(windows),) + values.shape, np.nan)
+    for k, window in enumerate(windows):
+        if window <= len(values):
+            full = counts[window:] - counts[:-window] == window
+            sums[k, window - 1:] = np.where(full, cumulative[window:] - cumulative[:-window], np.nan)
+    return sums
+
+
+def macd_window_columns(signals, windows, prefixes=None, binary=False):
+    """
+    Compra_MACD_n / Venda_MACD_n columns: how many MACD signals happened in the last n rows
+
+    :param signals: MACD signal flag columns, rows oldest first
+    :type signals: pd.DataFrame
+    :param windows: Window lengths (ex: bayes.vols)
+    :type windows: list
+    :param prefixes: Signal column to the prefix of its window columns, defaults to macd_signal_prefixes
+    :type prefixes: dict
+    :param binary: Keep 1 for windows with any signal instead of the count, as the notebook's commented encoders
+    :type binary: bool
+
+    :return: One column per signal and window, in window order
+    :rtype: pd.DataFrame
+    """
+    prefixes = prefixes or macd_signal_prefixes
+    names = [name for name in prefixes if name in signals]
+    sums = rolling_sums(signals[names].to_numpy(), windows)
+    columns = {}
+    for k, window in enumerate(windows):
+        for j, name in enumerate(names):
+            columns[prefixes[name] + str(window)] = binarize(sums[k, :, j]) if binary else sums[k, :, j]
+    return pd.DataFrame(columns, index=signals.index)
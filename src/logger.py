@@ -1,20 +1,114 @@
-import logging
+import atexit
 import datetime
+import json
+import logging
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from logging.handlers import QueueHandler, QueueListener, TimedRotatingFileHandler
 
 from src.directory_utilities import validate_or_make_directory
 
-date = "{:%Y-%m-%d}".format(datetime.datetime.now())
-log_file_string = "./logs/{}.log".format(date)
+log_file_string = "./logs/trader.log"
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Formats log records as one JSON object per line
+    """
+
+    reserved = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+    def format(self, record):
+        entry = {
+            "time": datetime.datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage()
+        }
+        for key, value in vars(record).items():
+            if key not in self.reserved:
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class _DelayedFileHandler(TimedRotatingFileHandler):
+    """
+    Rotating log file that is only created, with its directory, when the first record is written
+    """
+
+    def _open(self):
+        validate_or_make_directory(self.baseFilename)
+        return super()._open()
+
+
+class _SkipSpans(logging.Filter):
+    """
+    Keeps span timings out of the console, they only go to the JSON log file
+    """
+
+    def filter(self, record):
+        return not hasattr(record, "span")
 
-validate_or_make_directory(log_file_string)
 
 logFormatter = logging.Formatter("%(asctime)s - [%(levelname)s]  %(message)s")
 logger = logging.getLogger()
 
-fileHandler = logging.FileHandler(log_file_string)
-fileHandler.setFormatter(logFormatter)
-logger.addHandler(fileHandler)
+fileHandler = _DelayedFileHandler(log_file_string, when="midnight", backupCount=30, encoding="utf-8", delay=True)
+fileHandler.setFormatter(JsonFormatter())
 
 consoleHandler = logging.StreamHandler()
 consoleHandler.setFormatter(logFormatter)
-logger.addHandler(consoleHandler)
\ No newline at end of file
+consoleHandler.addFilter(_SkipSpans())
+
+# Records are only put on a queue by the calling thread; formatting and I/O happen on the listener thread
+log_queue = queue.SimpleQueue()
+logger.addHandler(QueueHandler(log_queue))
+
+listener = QueueListener(log_queue, fileHandler, consoleHandler, respect_handler_level=True)
+listener.start()
+atexit.register(listener.stop)
+
+span_logger = logging.getLogger("span")
+span_logger.setLevel(logging.INFO)
+
+# Names of the spans currently open on each thread, innermost last. Read by src.profiler to tag samples
+active_spans = {}
+
+
+def current_phase(thread_id=None):
+    """
+    Returns the innermost open span on a thread, or None outside of any span
+
+    :param thread_id: Thread identifier, defaults to the calling thread
+    :type thread_id: int
+
+    :rtype: str
+    """
+    stack = active_spans.get(threading.get_ident() if thread_id is None else thread_id)
+    return stack[-1] if stack else None
+
+
+@contextmanager
+def span(name, **fields):
+    """
+    Times the enclosed block and logs its duration as a structured record
+
+    :param name: Name of the timed stage (ex: fetch, indicators, strategy, order)
+    :type name: str
+    :param fields: Extra fields to store with the record (ex: coin_pair)
+    :type fields: dict
+    """
+    stack = active_spans.setdefault(threading.get_ident(), [])
+    stack.append(name)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        duration_ms = (time.perf_counter() - start) * 1000
+        stack.pop()
+        span_logger.info("{} took {:.3f} ms".format(name, duration_ms),
+                         extra=dict(fields, span=name, duration_ms=round(duration_ms, 3)))
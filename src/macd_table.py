@@ -0,0 +1,132 @@
+"""
+   Generator of the MACD volatility-window table (macd.csv): the MACD crossover signals of a close series and
+   how many of them happened in each of the last n rows, for a list of windows, in one vectorized pass.
+   Many tickers are streamed from the candle store through a worker pool, each one written as it completes.
+
+   python -m src.macd_table [--windows 1 2 3 5 7 9 14 21] [--format parquet] [TICKER ...]
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+from src import candle_store
+from src.directory_utilities import validate_or_make_directory
+from src.labels import macd_window_columns
+from src.logger import logger
+from src.pool import imap_bounded
+
+default_windows = [1, 2, 3, 5, 7, 9, 14, 21]
+
+tables_directory_string = "./database/macd"
+
+
+def macd_signals(close, short=12, long=26, signal=9):
+    """
+    MACD line crossing over (buy) and under (sell) its signal line
+
+    :param close: Closing prices, oldest first
+    :type close: pd.Series
+
+    :return: Buy flags and sell flags
+    :rtype: np.ndarray, np.ndarray
+    """
+    close = pd.Series(np.asarray(close, dtype=np.float64))
+    macd = close.ewm(span=short, adjust=False).mean() - close.ewm(span=long, adjust=False).mean()
+    above = (macd > macd.ewm(span=signal, adjust=False).mean()).to_numpy()
+    previous = np.concatenate([[False], above[:-1]])
+    return (above & ~previous).astype(np.int64), (~above & previous).astype(np.int64)
+
+
+def macd_table(dates, close=None, windows=default_windows, signals=None, sell=True):
+    """
+    Table with the MACD signals and their window counts, in the macd.csv layout
+
+    :param dates: Candle dates, oldest first
+    :param close: Closing prices, used when signals is not given
+    :param windows: Window lengths
+    :type windows: list
+    :param signals: Existing 'Sinal de Compra (MACD)' / 'Sinal de Venda (MACD)' flags, for example the workbook's
+    :type signals: pd.DataFrame
+    :param sell: Also emit the sell signal and Venda_MACD_n columns (macd.csv only holds the buy side)
+    :type sell: bool
+
+    :rtype: pd.DataFrame
+    """
+    if signals is None:
+        buy_flags, sell_flags = macd_signals(close)
+        signals = pd.DataFrame({'Sinal de Compra (MACD)': buy_flags, 'Sinal de Venda (MACD)': sell_flags})
+    sides = ['Sinal de Compra (MACD)', 'Sinal de Venda (MACD)'] if sell else ['Sinal de Compra (MACD)']
+    windows_df = macd_window_columns(signals[sides], windows).fillna(0)
+
+    dates = pd.to_datetime(pd.Series(np.asarray(dates)))
+    date_format = '%Y-%m-%d' if (dates.dt.normalize() == dates).all() else '%Y-%m-%d %H:%M:%S'
+    table = pd.DataFrame({'Data': dates.dt.strftime(date_format).to_numpy()}, index=signals.index)
+    for side in sides:
+        prefix = 'Compra_MACD_' if side == 'Sinal de Compra (MACD)' else 'Venda_MACD_'
+        table[side] = signals[side].to_numpy()
+        for window in windows:
+            table[prefix + str(window)] = windows_df[prefix + str(window)].to_numpy()
+    return table
+
+
+def write_table(table, file_string):
+    """
+    Writes a table as Parquet (.parquet, needs pyarrow) or as macd.csv does (';' separated)
+
+    :return: The file written
+    :rtype: str
+    """
+    validate_or_make_directory(file_string)
+    if file_string.endswith(".parquet"):
+        if candle_store.pyarrow is None:
+            file_string = file_string[:-len(".parquet")] + ".csv"
+            logger.warning("pyarrow is not installed, writing {} instead".format(file_string))
+        else:
+            table.to_parquet(file_string, index=False)
+            return file_string
+    table.to_csv(file_string, sep=";")
+    return file_string
+
+
+def _generate_one(job):
+    ticker, candles_directory, directory, windows, file_format = job
+    candles = candle_store.read_candles(ticker, candles_directory)
+    table = macd_table(candles["T"], candles["C"], windows)
+    return ticker, write_table(table, os.path.join(directory, "{}.{}".format(ticker, file_format))), len(table)
+
+
+def generate(tickers=None, windows=default_windows, directory=tables_directory_string,
+             candles_directory=candle_store.candles_directory_string, file_format="csv", n_jobs=None):
+    """
+    Builds and writes the table of every ticker in a worker pool, keeping at most two tickers per worker in flight
+    so memory stays bounded however many tickers are given
+
+    :param tickers: Tickers to process, defaults to every ticker in the candle store
+    :type tickers: iterable
+    :param file_format: 'csv' or 'parquet'
+    :type file_format: str
+    :param n_jobs: Worker processes
+    :type n_jobs: int
+
+    :return: (ticker, file written, rows) as tickers complete
+    :rtype: generator
+    """
+    tickers = tickers if tickers is not None else candle_store.list_tickers(candles_directory)
+    jobs = ((ticker, candles_directory, directory, windows, file_format) for ticker in tickers)
+    return imap_bounded(_generate_one, jobs, n_jobs)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Build the MACD volatility-window tables from the candle store")
+    parser.add_argument("tickers", nargs="*", help="Tickers to process, defaults to the whole candle store")
+    parser.add_argument("--windows", nargs="+", type=int, default=default_windows)
+    parser.add_argument("--format", default="csv", choices=["csv", "parquet"])
+    parser.add_argument("--output", default=tables_directory_string)
+    parser.add_argument("--jobs", type=int, default=None)
+    args = parser.parse_args()
+    for ticker, file_string, rows in generate(args.tickers or None, args.windows, args.output,
+                                              file_format=args.format, n_jobs=args.jobs):
+        print("{}: {} rows -> {}".format(ticker, rows, file_string))
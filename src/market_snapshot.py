@@ -0,0 +1,89 @@
+"""
+   Every market summary of an exchange at one moment (one getmarketsummaries call), parsed into columns
+   indexed by market so that a whole cycle reads prices and volumes from memory and filters all the
+   markets with array operations.
+"""
+import time
+
+import numpy as np
+
+# Summary fields kept as float columns, the others (MarketName, TimeStamp, Created) are not needed by the scan
+numeric_columns = ["High", "Low", "Volume", "Last", "BaseVolume", "Bid", "Ask", "OpenBuyOrders", "OpenSellOrders",
+                   "PrevDay"]
+
+
+class MarketSnapshot(object):
+    """
+    Columnar table of market summaries
+    """
+
+    def __init__(self, markets, columns, taken_at=None):
+        """
+        :param markets: Market names (ex: BTC-LTC)
+        :type markets: list
+        :param columns: Summary field to its values, in the order of markets
+        :type columns: dict
+        :param taken_at: time.time() of the request, defaults to now
+        :type taken_at: float
+        """
+        self.markets = list(markets)
+        self.columns = columns
+        self.taken_at = time.time() if taken_at is None else taken_at
+        self.index = {market: position for position, market in enumerate(self.markets)}
+
+    @classmethod
+    def from_summaries(cls, summaries, taken_at=None):
+        """
+        Parses the result of a getmarketsummaries call, missing or null fields become NaN
+
+        :param summaries: Market summary dicts (the "result" of the response)
+        :type summaries: list
+
+        :rtype: MarketSnapshot
+        """
+        markets = [summary["MarketName"] for summary in summaries]
+        columns = {}
+        for name in numeric_columns:
+            values = [summary.get(name) for summary in summaries]
+            columns[name] = np.array([np.nan if value is None else value for value in values], dtype=np.float64)
+        return cls(markets, columns, taken_at)
+
+    def __len__(self):
+        return len(self.markets)
+
+    def __contains__(self, market):
+        return market in self.index
+
+    def age(self):
+        """
+        Seconds since the snapshot was taken
+        """
+        return time.time() - self.taken_at
+
+    def column(self, name, markets=None):
+        """
+        Values of a summary field, for every market or for the given ones (NaN for markets not in the snapshot)
+
+        :rtype: np.ndarray
+        """
+        if markets is None:
+            return self.columns[name]
+        positions = np.array([self.index.get(market, -1) for market in markets], dtype=np.int64)
+        values = np.full(len(positions), np.nan)
+        found = positions >= 0
+        values[found] = self.columns[name][positions[found]]
+        return values
+
+    def get(self, market, item):
+        return float(self.columns[item][self.index[market]])
+
+    def summary(self, market):
+        """
+        The market's row in the format of a getmarketsummary response, so it can stand in for that call
+
+        :rtype: dict
+        """
+        position = self.index[market]
+        row = {name: float(values[position]) for name, values in self.columns.items()}
+        row["MarketName"] = market
+        return {"success": True, "message": "", "result": [row]}
@@ -1,6 +1,7 @@
 import pandas as pd
 import numpy as np
-import yfinance as yf
+
+from src.metrics import track_api_call
 
 class MarketData(object):
     """
@@ -38,7 +39,10 @@ class MarketData(object):
                 ]
             """
 
-            df = yf.download(coin_pair,'2016-01-26').reset_index()
+            import yfinance as yf
+
+            with track_api_call("MarketData", "download"):
+                df = yf.download(coin_pair,'2016-01-26').reset_index()
             df.Close = df['Adj Close']
             df['T'] = pd.to_datetime(df.Date)
             df['O'] = df[['Open']].astype(float)
@@ -2,27 +2,24 @@ import smtplib
 import time
 import pandas as pd
 #from telegramclient import telegramClient
-from termcolor import cprint
 from math import floor, ceil
-from src.logger import logger
+from src.logger import logger, span
 from datetime import datetime, timedelta
 
-from telegram import ReplyKeyboardMarkup, ReplyKeyboardRemove, Update
-from telegram.ext import (
-    Updater,
-    CommandHandler,
-    MessageHandler,
-    Filters,
-    ConversationHandler,
-    CallbackContext,
-)
-
 try:
     import winsound
 except ImportError:
     winsound = None
 
 
+def cprint(*args, **kwargs):
+    """
+    termcolor's cprint, imported on the first colored print
+    """
+    from termcolor import cprint as termcolor_cprint
+    termcolor_cprint(*args, **kwargs)
+
+
 class Messenger(object):
     """
     Used for handling messaging functionality
@@ -43,6 +40,7 @@ class Messenger(object):
         if "telegram" in secrets:
             self.telegram = True
             self.telegram_channel = secrets["telegram"]["channel"]
+            from telegram.ext import Updater
             self.telegram_client = Updater(secrets["telegram"]["token"])
 
         self.sound = False
@@ -142,11 +140,12 @@ class Messenger(object):
         header += "Subject: %s\n\n" % subject
         message = header + message
 
-        server = smtplib.SMTP(self.smtp_server_address)
-        server.starttls()
-        server.login(self.login, self.password)
-        errors = server.sendmail(self.from_address, self.to_address_list, message)
-        server.quit()
+        with span("notification", channel="gmail"):
+            server = smtplib.SMTP(self.smtp_server_address)
+            server.starttls()
+            server.login(self.login, self.password)
+            errors = server.sendmail(self.from_address, self.to_address_list, message)
+            server.quit()
 
         return errors
 
@@ -160,9 +159,10 @@ class Messenger(object):
         if not self.telegram:
             return
 
-        self.telegram_client.message.reply_text(
-            text=message
-        )
+        with span("notification", channel="telegram"):
+            self.telegram_client.message.reply_text(
+                text=message
+            )
     def _print(self, coin_pair, period, dados, crossovers, MACDs):
         coin_pair = coin_pair.replace("-","")
         dados = dados.tail(1).reset_index(drop=True)
@@ -183,8 +183,9 @@ class Messenger(object):
             logger.error(_str_op)
             logger.error('--------------------------------------------------------------------')
             logger.error('--------------------------------------------------------------------')
-            dados = dados.append(pd.read_csv("./database/"+coin_pair+"_"+period +"_dados_trades.csv", sep=";", decimal=","))
-            dados.to_csv("./database/"+coin_pair+"_"+period +"_dados_trades.csv", index=False, sep=";", decimal=",")
+            with span("persistence", file=coin_pair+"_"+period +"_dados_trades.csv"):
+                dados = dados.append(pd.read_csv("./database/"+coin_pair+"_"+period +"_dados_trades.csv", sep=";", decimal=","))
+                dados.to_csv("./database/"+coin_pair+"_"+period +"_dados_trades.csv", index=False, sep=";", decimal=",")
         #logger.error(error_str)
     def send_buy_gmail(self, order, stats, recipient_name=None):
         """
@@ -198,6 +199,8 @@ class Messenger(object):
         :param recipient_name: Name of the email"s recipient (ex: John)
         :type recipient_name: str
         """
+        if not self.gmail:
+            return
         if recipient_name is None:
             recipient_name = self.recipient_name
         main_market, coin = order["Exchange"].split("-")
@@ -220,6 +223,8 @@ class Messenger(object):
         :param recipient_name: Name of the email's recipient (ex: John)
         :type recipient_name: str
         """
+        if not self.gmail:
+            return
         if recipient_name is None:
             recipient_name = self.recipient_name
 
@@ -500,12 +505,15 @@ class Messenger(object):
         """
         if not self.sound or winsound is None:
             return
-        winsound.Beep(frequency, duration)
+        with span("notification", channel="sound"):
+            winsound.Beep(frequency, duration)
 
     def play_sw_theme(self):
         """
         Used to play the Star Wars theme song
         """
+        if not self.sound or winsound is None:
+            return
         self.play_beep(1046, 880)
         self.play_beep(1567, 880)
         self.play_beep(1396, 55)
@@ -533,6 +541,8 @@ class Messenger(object):
         """
         Used to play the Star Wars Imperial March song
         """
+        if not self.sound or winsound is None:
+            return
         self.play_beep(440, 500)
         self.play_beep(440, 500)
         self.play_beep(440, 500)
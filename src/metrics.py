@@ -0,0 +1,301 @@
+"""
+   In-process metrics rendered in the Prometheus text exposition format
+   See https://prometheus.io/docs/instrumenting/exposition_formats/
+"""
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _format_labels(label_names, label_values, extra=None):
+    pairs = list(zip(label_names, label_values))
+    if extra is not None:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join('{}="{}"'.format(name, str(value).replace("\\", "\\\\").replace('"', '\\"'))
+                          for name, value in pairs) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value))
+
+
+class _Metric(object):
+    """
+    Base class holding one value per label combination
+    """
+    type_name = ""
+
+    def __init__(self, name, documentation, label_names=()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        return tuple(labels.get(name, "") for name in self.label_names)
+
+    def _samples(self):
+        with self._lock:
+            return [(self.name, key, None, value) for key, value in self._values.items()]
+
+    def render(self):
+        lines = [
+            "# HELP {} {}".format(self.name, self.documentation),
+            "# TYPE {} {}".format(self.name, self.type_name)
+        ]
+        for name, key, extra, value in self._samples():
+            lines.append("{}{} {}".format(name, _format_labels(self.label_names, key, extra), _format_value(value)))
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    """
+    Monotonically increasing value (ex: number of API calls)
+    """
+    type_name = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def get(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+
+class Gauge(_Metric):
+    """
+    Value that can go up and down (ex: number of open trades)
+    """
+    type_name = "gauge"
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def get(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+
+class Histogram(_Metric):
+    """
+    Distribution of observed values in cumulative buckets (ex: request latency in seconds)
+    """
+    type_name = "histogram"
+
+    def __init__(self, name, documentation, label_names=(), buckets=DEFAULT_BUCKETS):
+        super(Histogram, self).__init__(name, documentation, label_names)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """
+        Observes the duration of the enclosed block in seconds
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def _samples(self):
+        samples = []
+        with self._lock:
+            for key, (counts, total, count) in self._values.items():
+                cumulative = 0
+                for bucket, bucket_count in zip(self.buckets, counts):
+                    cumulative += bucket_count
+                    samples.append((self.name + "_bucket", key, ("le", _format_value(bucket)), cumulative))
+                samples.append((self.name + "_sum", key, None, total))
+                samples.append((self.name + "_count", key, None, count))
+        return samples
+
+
+class CacheStats(_Metric):
+    """
+    Hit and miss counters for a cache, rendered with the derived hit ratio
+    """
+    type_name = "gauge"
+
+    def __init__(self, name, documentation):
+        super(CacheStats, self).__init__(name, documentation, ("cache",))
+
+    def hit(self, cache):
+        self.record(cache, True)
+
+    def miss(self, cache):
+        self.record(cache, False)
+
+    def record(self, cache, hit):
+        with self._lock:
+            state = self._values.setdefault((cache,), [0, 0])
+            state[0 if hit else 1] += 1
+
+    def ratio(self, cache):
+        hits, misses = self._values.get((cache,), (0, 0))
+        return hits / (hits + misses) if hits + misses else 0.0
+
+    def render(self):
+        with self._lock:
+            values = {key: list(state) for key, state in self._values.items()}
+        lines = []
+        for suffix, type_name, doc in (("_hits_total", "counter", "hits"),
+                                       ("_misses_total", "counter", "misses"),
+                                       ("_hit_ratio", "gauge", "hit ratio")):
+            lines.append("# HELP {}{} {} ({})".format(self.name, suffix, self.documentation, doc))
+            lines.append("# TYPE {}{} {}".format(self.name, suffix, type_name))
+            for key, (hits, misses) in values.items():
+                if suffix == "_hits_total":
+                    value = hits
+                elif suffix == "_misses_total":
+                    value = misses
+                else:
+                    value = hits / (hits + misses) if hits + misses else 0.0
+                lines.append("{}{}{} {}".format(self.name, suffix, _format_labels(self.label_names, key),
+                                                 _format_value(value)))
+        return "\n".join(lines)
+
+
+class Registry(object):
+    """
+    Holds every metric of the process and renders them for scraping
+    """
+
+    def __init__(self):
+        self.metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            return self.metrics.setdefault(metric.name, metric)
+
+    def counter(self, name, documentation, label_names=()):
+        return self._register(Counter(name, documentation, label_names))
+
+    def gauge(self, name, documentation, label_names=()):
+        return self._register(Gauge(name, documentation, label_names))
+
+    def histogram(self, name, documentation, label_names=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(name, documentation, label_names, buckets))
+
+    def cache_stats(self, name, documentation):
+        return self._register(CacheStats(name, documentation))
+
+    def render(self):
+        return "\n".join(metric.render() for metric in list(self.metrics.values())) + "\n"
+
+
+registry = Registry()
+
+api_calls = registry.counter("trader_api_calls_total", "Exchange API calls", ("operator", "endpoint"))
+api_errors = registry.counter("trader_api_errors_total", "Exchange API calls that raised", ("operator", "endpoint"))
+api_latency = registry.histogram("trader_api_request_seconds", "Exchange API request latency",
+                                 ("operator", "endpoint"))
+scan_time = registry.histogram("trader_scan_seconds", "Time spent scanning markets per cycle", ("side",))
+tracked_coin_pairs = registry.gauge("trader_tracked_coin_pairs", "Coin pairs tracked for buys")
+paused_coin_pairs = registry.gauge("trader_paused_coin_pairs", "Tracked coin pairs with paused sells")
+open_trades = registry.gauge("trader_open_trades", "Trades bought and not yet sold")
+cache = registry.cache_stats("trader_cache", "Cache lookups")
+screened_markets = registry.counter("trader_screened_markets_total", "Markets pruned by each screening stage",
+                                    ("stage",))
+screen_saved_time = registry.counter("trader_screen_saved_seconds_total",
+                                     "Estimated scan time saved by the snapshot screening stage")
+
+
+@contextmanager
+def track_api_call(operator, endpoint):
+    """
+    Counts and times one exchange API call
+
+    :param operator: Operator name (ex: Bittrex, Binance)
+    :type operator: str
+    :param endpoint: API endpoint or client method name (ex: getmarketsummary)
+    :type endpoint: str
+    """
+    api_calls.inc(operator=operator, endpoint=endpoint)
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        api_errors.inc(operator=operator, endpoint=endpoint)
+        raise
+    finally:
+        api_latency.observe(time.perf_counter() - start, operator=operator, endpoint=endpoint)
+
+
+class InstrumentedClient(object):
+    """
+    Wraps an exchange client so that every method call is counted and timed
+    """
+
+    def __init__(self, client, operator):
+        self._client = client
+        self._operator = operator
+
+    def __getattr__(self, name):
+        attribute = getattr(self._client, name)
+        if not callable(attribute):
+            return attribute
+
+        def call(*args, **kwargs):
+            with track_api_call(self._operator, name):
+                return attribute(*args, **kwargs)
+
+        return call
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/", "/metrics"):
+            self.send_error(404)
+            return
+        body = registry.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_http_server(port, address="127.0.0.1"):
+    """
+    Serves the registry on http://address:port/metrics from a daemon thread
+
+    :param port: Local port to listen on
+    :type port: int
+    :param address: Interface to bind, local only by default
+    :type address: str
+
+    :return: The running server
+    :rtype: ThreadingHTTPServer
+    """
+    server = ThreadingHTTPServer((address, port), _MetricsHandler)
+    thread = threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True)
+    thread.start()
+    return server
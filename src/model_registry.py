@@ -0,0 +1,289 @@
+"""
+   Versioned storage of the Naive Bayes committee. Each fitted model and its MinMaxScaler are kept as the plain
+   arrays needed to predict (class priors, means and variances or feature log probabilities, scaler min and
+   scale), in one .npz file per version next to a JSON manifest with the dataset fingerprint and the decision
+   weights. Loading a version does not import scikit-learn nor retrain anything.
+
+   python -m src.model_registry [--name petr4]   trains the committee from the workbook and registers it
+"""
+import hashlib
+import json
+import os
+import re
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from src.directory_utilities import validate_or_make_directory
+from src.logger import logger
+
+registry_directory_string = "./database/models"
+
+
+def dataset_fingerprint(df):
+    """
+    Hash of the dataset content a committee was trained on
+
+    :rtype: str
+    """
+    return hashlib.sha1(pd.util.hash_pandas_object(df, index=True).values.tobytes()).hexdigest()
+
+
+class GaussianPredictor(object):
+    """
+    GaussianNB prediction from its fitted arrays, computed in the same order as scikit-learn
+    """
+    kind = "gaussian"
+
+    def __init__(self, classes, class_prior, theta, var):
+        self.classes = classes
+        self.class_prior = class_prior
+        self.theta = theta
+        self.var = var
+        self.log_prior = np.log(class_prior)
+        self.log_norm = np.array([-0.5 * np.sum(np.log(2.0 * np.pi * var[i, :])) for i in range(len(classes))])
+
+    @classmethod
+    def from_sklearn(cls, model):
+        return cls(model.classes_, model.class_prior_, model.theta_, model.var_)
+
+    def arrays(self):
+        return {"classes": self.classes, "class_prior": self.class_prior, "theta": self.theta, "var": self.var}
+
+    def joint_log_likelihood(self, X):
+        joint = np.empty((X.shape[0], len(self.classes)))
+        for i in range(len(self.classes)):
+            joint[:, i] = self.log_prior[i] + (
+                self.log_norm[i] - 0.5 * np.sum(((X - self.theta[i, :]) ** 2) / (self.var[i, :]), 1)
+            )
+        return joint
+
+    def predict(self, X):
+        return self.classes[np.argmax(self.joint_log_likelihood(X), axis=1)]
+
+
+class DiscretePredictor(object):
+    """
+    MultinomialNB and ComplementNB prediction from their fitted arrays
+    """
+
+    def __init__(self, kind, classes, class_log_prior, feature_log_prob):
+        self.kind = kind
+        self.classes = classes
+        self.class_log_prior = class_log_prior
+        self.feature_log_prob = feature_log_prob
+
+    @classmethod
+    def from_sklearn(cls, model):
+        kind = "complement" if type(model).__name__ == "ComplementNB" else "multinomial"
+        return cls(kind, model.classes_, model.class_log_prior_, model.feature_log_prob_)
+
+    def arrays(self):
+        return {"classes": self.classes, "class_log_prior": self.class_log_prior,
+                "feature_log_prob": self.feature_log_prob}
+
+    def joint_log_likelihood(self, X):
+        joint = np.dot(X, self.feature_log_prob.T)
+        if self.kind == "multinomial" or len(self.classes) == 1:
+            joint += self.class_log_prior
+        return joint
+
+    def predict(self, X):
+        return self.classes[np.argmax(self.joint_log_likelihood(X), axis=1)]
+
+
+class ScaledPredictor(object):
+    """
+    One committee member: its feature columns, MinMaxScaler arrays and predictor
+    """
+
+    def __init__(self, features, scale, offset, predictor):
+        self.features = list(features)
+        self.scale = scale
+        self.offset = offset
+        self.predictor = predictor
+
+    @classmethod
+    def from_sklearn(cls, model, scaler, features):
+        predictor = GaussianPredictor.from_sklearn(model) if hasattr(model, "theta_") \
+            else DiscretePredictor.from_sklearn(model)
+        return cls(features, scaler.scale_, scaler.min_, predictor)
+
+    def transform(self, X):
+        X = np.array(X, dtype=np.float64)
+        X *= self.scale
+        X += self.offset
+        return X
+
+    def predict(self, X):
+        """
+        :param X: Unscaled feature rows, columns in self.features order
+        :type X: np.ndarray
+        """
+        return self.predictor.predict(self.transform(X))
+
+    def arrays(self):
+        arrays = {"scale": self.scale, "offset": self.offset}
+        arrays.update(self.predictor.arrays())
+        return arrays
+
+    @classmethod
+    def from_arrays(cls, kind, features, arrays):
+        if kind == "gaussian":
+            predictor = GaussianPredictor(arrays["classes"], arrays["class_prior"], arrays["theta"], arrays["var"])
+        else:
+            predictor = DiscretePredictor(kind, arrays["classes"], arrays["class_log_prior"],
+                                          arrays["feature_log_prob"])
+        return cls(features, arrays["scale"], arrays["offset"], predictor)
+
+
+class CommitteeRecord(object):
+    """
+    A loaded committee version: the members by label, the final model and the manifest
+    """
+    final_name = "final_decision"
+
+    def __init__(self, members, manifest):
+        self.members = members
+        self.manifest = manifest
+
+    @property
+    def version(self):
+        return self.manifest["version"]
+
+    @property
+    def fingerprint(self):
+        return self.manifest["fingerprint"]
+
+    @property
+    def classifiers(self):
+        return self.manifest["classifiers"]
+
+    @property
+    def decision_weight(self):
+        return self.manifest["decision_weight"]
+
+    @property
+    def final(self):
+        return self.members[self.final_name]
+
+    @classmethod
+    def from_committee(cls, committee, fingerprint=None, metadata=None):
+        """
+        :param committee: Result of bayes.train_committee
+        :type committee: dict
+        """
+        members = {
+            label: ScaledPredictor.from_sklearn(model, committee["scalers"][label], committee["features"][label])
+            for label, model in committee["models"].items()
+        }
+        members[cls.final_name] = ScaledPredictor.from_sklearn(
+            committee["final_model"], committee["final_scaler"], committee["final_features"]
+        )
+        weights = committee["decision_weight"]
+        manifest = {
+            "version": None,
+            "fingerprint": fingerprint,
+            "classifiers": list(committee["models"]),
+            "decision_weight": {str(classifier): float(weight)
+                                for classifier, weight in zip(weights.classifier, weights.new_weight)},
+            "metadata": metadata or {}
+        }
+        return cls(members, manifest)
+
+
+class ModelRegistry(object):
+    """
+    Versioned committees on disk: <directory>/<name>-v<version>.npz and .json
+    """
+
+    def __init__(self, directory=registry_directory_string):
+        self.directory = directory
+
+    def _file_string(self, name, version, extension):
+        return os.path.join(self.directory, "{}-v{}.{}".format(name, version, extension))
+
+    def versions(self, name):
+        """
+        :return: Registered versions of a committee, oldest first
+        :rtype: list
+        """
+        if not os.path.isdir(self.directory):
+            return []
+        pattern = re.compile(r"^{}-v(\d+)\.json$".format(re.escape(name)))
+        return sorted(int(match.group(1)) for match in map(pattern.match, os.listdir(self.directory)) if match)
+
+    def save(self, name, record):
+        """
+        Stores a committee as the next version of name
+
+        :type record: CommitteeRecord
+        :return: The new version number
+        :rtype: int
+        """
+        versions = self.versions(name)
+        version = versions[-1] + 1 if versions else 1
+        arrays = {}
+        members = {}
+        for label, member in record.members.items():
+            members[label] = {"kind": member.predictor.kind, "features": member.features}
+            for key, value in member.arrays().items():
+                arrays["{}/{}".format(label, key)] = value
+
+        manifest = dict(record.manifest, name=name, version=version, members=members,
+                        created=datetime.now().isoformat(timespec="seconds"))
+        validate_or_make_directory(self._file_string(name, version, "npz"))
+        np.savez(self._file_string(name, version, "npz"), **arrays)
+        # The manifest is written last, a version only exists once it is complete
+        with open(self._file_string(name, version, "json"), "w") as file:
+            json.dump(manifest, file, indent=4)
+        record.manifest = manifest
+        logger.info("Registered committee {} v{} ({})".format(name, version, manifest["fingerprint"]))
+        return version
+
+    def load(self, name, version=None):
+        """
+        Loads a committee version, the latest one by default
+
+        :rtype: CommitteeRecord
+        """
+        if version is None:
+            versions = self.versions(name)
+            if not versions:
+                raise FileNotFoundError("No committee named {} in {}".format(name, self.directory))
+            version = versions[-1]
+        with open(self._file_string(name, version, "json")) as file:
+            manifest = json.load(file)
+        with np.load(self._file_string(name, version, "npz"), allow_pickle=False) as data:
+            members = {}
+            for label, member in manifest["members"].items():
+                arrays = {key.split("/", 1)[1]: data[key] for key in data.files if key.startswith(label + "/")}
+                members[label] = ScaledPredictor.from_arrays(member["kind"], member["features"], arrays)
+        return CommitteeRecord(members, manifest)
+
+
+def register_committee(name="petr4", df=None, registry=None, wait_time=5):
+    """
+    Trains the committee from the dataset and registers it
+
+    :return: The new version number
+    :rtype: int
+    """
+    from src import bayes
+
+    if df is None:
+        df = bayes.load_dataset()
+    committee = bayes.train_committee(df, wait_time=wait_time)
+    record = CommitteeRecord.from_committee(committee, dataset_fingerprint(df), {"wait_time": wait_time})
+    return (registry or ModelRegistry()).save(name, record)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Train the Naive Bayes committee and register it")
+    parser.add_argument("--name", default="petr4")
+    parser.add_argument("--wait-time", type=int, default=5)
+    args = parser.parse_args()
+    print("Registered {} v{}".format(args.name, register_committee(args.name, wait_time=args.wait_time)))
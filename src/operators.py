@@ -0,0 +1,111 @@
+"""
+   Registry of the exchange adapters. Each operator is registered by name with the module and class that
+   implement it and the capabilities it offers, so choosing an operator, or checking what it can do, never
+   imports the adapters (and their clients) that are not used.
+"""
+import importlib
+
+# Capabilities an adapter can declare
+HISTORICAL_DATA = "historical_data"
+MARKET_SUMMARY = "market_summary"
+BULK_SUMMARIES = "bulk_summaries"
+ORDER_BOOK = "order_book"
+STREAMING = "streaming"
+LIMIT_BUY = "limit_buy"
+LIMIT_SELL = "limit_sell"
+CANCEL = "cancel"
+# get_order needs the coin pair along with the order id
+ORDER_BY_PAIR = "order_by_pair"
+
+
+class OperatorPlugin(object):
+    """
+    One registered exchange adapter, imported on the first load()
+    """
+
+    def __init__(self, name, module, class_name, capabilities):
+        self.name = name
+        self.module = module
+        self.class_name = class_name
+        self.capabilities = frozenset(capabilities)
+        self._operator = None
+
+    def load(self):
+        """
+        :return: The adapter class
+        :rtype: type
+        """
+        if self._operator is None:
+            self._operator = getattr(importlib.import_module(self.module), self.class_name)
+        return self._operator
+
+    @property
+    def loaded(self):
+        return self._operator is not None
+
+
+registry = {}
+
+
+def register(name, module, class_name, capabilities=()):
+    """
+    Registers an exchange adapter without importing it
+
+    :param name: Operator name (ex: Bittrex)
+    :type name: str
+    :param module: Module path of the adapter (ex: src.bittrex)
+    :type module: str
+    :param class_name: Adapter class in the module
+    :type class_name: str
+    :param capabilities: Capabilities of the adapter, see the constants of this module
+    :type capabilities: iterable
+
+    :rtype: OperatorPlugin
+    """
+    registry[name] = OperatorPlugin(name, module, class_name, capabilities)
+    return registry[name]
+
+
+register("Bittrex", "src.bittrex", "Bittrex",
+         [HISTORICAL_DATA, MARKET_SUMMARY, BULK_SUMMARIES, ORDER_BOOK, LIMIT_BUY, LIMIT_SELL, CANCEL])
+register("Binance", "src.binance", "Binance",
+         [HISTORICAL_DATA, MARKET_SUMMARY, LIMIT_SELL, ORDER_BY_PAIR])
+register("MarketData", "src.marketdata", "MarketData",
+         [HISTORICAL_DATA])
+
+
+def names():
+    return list(registry)
+
+
+def get_operator(name):
+    """
+    Imports the exchange adapter class for an operator name
+
+    :param name: Operator name (one of: 'Bittrex', 'Binance', 'MarketData')
+    :type name: str
+    """
+    if name not in registry:
+        raise KeyError("Unknown operator {}, expected one of {}".format(name, ", ".join(registry)))
+    return registry[name].load()
+
+
+def capabilities_of(operator):
+    """
+    Capabilities of an operator given by name, adapter class or adapter instance. Adapters that are not
+    registered (ex: test doubles) may declare a `capabilities` attribute
+
+    :rtype: frozenset
+    """
+    if isinstance(operator, str):
+        return registry[operator].capabilities
+    operator_class = operator if isinstance(operator, type) else type(operator)
+    for plugin in registry.values():
+        if plugin.loaded and plugin.load() is operator_class:
+            return plugin.capabilities
+    return frozenset(getattr(operator, "capabilities", ()))
+
+
+def supports(operator, capability):
+    return capability in capabilities_of(operator)
+
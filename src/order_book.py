@@ -0,0 +1,242 @@
+"""
+   Local order book depth per market, kept as sorted price and quantity arrays. A book is seeded from a snapshot
+   (Bittrex getorderbook) and can be updated with incremental diffs (price, quantity, a quantity of 0 removing the
+   level, as Binance depth streams send them) through apply_diff, for an adapter streaming depth (none of the
+   current ones does, they refresh from snapshots). The price needed to fill a quantity is a binary search on the
+   cumulative quantities, so limit orders can be placed where they fill at once instead of at the top of the book,
+   as long as that stays within the allowed slippage from the price the strategy approved.
+"""
+import time
+
+import numpy as np
+
+from src import operators
+
+
+class BookSide(object):
+    """
+    One side of a book, best level first: asks by ascending price, bids by descending price
+    """
+
+    def __init__(self, descending=False):
+        self.descending = descending
+        self._keys = np.empty(0)
+        self.quantities = np.empty(0)
+        self._cumulative = None
+        self._notional = None
+
+    @property
+    def prices(self):
+        return -self._keys if self.descending else self._keys
+
+    def __len__(self):
+        return len(self._keys)
+
+    def _sort_keys(self, prices):
+        prices = np.asarray(prices, dtype=np.float64)
+        return -prices if self.descending else prices
+
+    def replace(self, prices, quantities):
+        """
+        Replaces every level with a snapshot
+        """
+        keys = self._sort_keys(prices)
+        quantities = np.asarray(quantities, dtype=np.float64)
+        order = np.argsort(keys, kind="stable")
+        keep = quantities[order] > 0
+        self._keys = keys[order][keep]
+        self.quantities = quantities[order][keep]
+        self._cumulative = None
+
+    def apply(self, prices, quantities):
+        """
+        Applies a diff: each price gets its new total quantity, 0 removing the level
+
+        :param prices: Prices of the changed levels
+        :type prices: np.ndarray
+        :param quantities: New quantities of the changed levels
+        :type quantities: np.ndarray
+        """
+        keys = self._sort_keys(prices)
+        quantities = np.asarray(quantities, dtype=np.float64)
+        if len(keys) == 0:
+            return
+        # The last update of a price wins
+        keys, first = np.unique(keys[::-1], return_index=True)
+        quantities = quantities[::-1][first]
+
+        positions = np.searchsorted(self._keys, keys)
+        inside = positions < len(self._keys)
+        present = np.zeros(len(keys), dtype=bool)
+        present[inside] = self._keys[positions[inside]] == keys[inside]
+
+        quantities_now = self.quantities.copy()
+        quantities_now[positions[present]] = quantities[present]
+        added = ~present & (quantities > 0)
+        levels = np.insert(self._keys, positions[added], keys[added])
+        quantities_now = np.insert(quantities_now, positions[added], quantities[added])
+        keep = quantities_now > 0
+        self._keys = levels[keep]
+        self.quantities = quantities_now[keep]
+        self._cumulative = None
+
+    def _totals(self):
+        if self._cumulative is None:
+            self._cumulative = np.cumsum(self.quantities)
+            self._notional = np.cumsum(self.quantities * self.prices)
+        return self._cumulative, self._notional
+
+    def depth(self):
+        """
+        Total quantity on this side
+        """
+        return float(self._totals()[0][-1]) if len(self) else 0.0
+
+    def fill_price(self, quantity):
+        """
+        Worst price reached by a market order of this quantity, that is the limit price filling it at once
+
+        :return: The price, None when the side does not hold the quantity
+        :rtype: float
+        """
+        cumulative, _ = self._totals()
+        level = np.searchsorted(cumulative, quantity)
+        if level >= len(cumulative):
+            return None
+        return float(self.prices[level])
+
+    def average_price(self, quantity):
+        """
+        Mean price paid filling this quantity level by level
+
+        :return: The price, None when the side does not hold the quantity
+        :rtype: float
+        """
+        cumulative, notional = self._totals()
+        level = np.searchsorted(cumulative, quantity)
+        if level >= len(cumulative) or quantity <= 0:
+            return None
+        filled = cumulative[level - 1] if level else 0.0
+        cost = notional[level - 1] if level else 0.0
+        return float((cost + (quantity - filled) * self.prices[level]) / quantity)
+
+
+class OrderBook(object):
+    """
+    Bids and asks of one market
+    """
+
+    def __init__(self, market):
+        self.market = market
+        self.bids = BookSide(descending=True)
+        self.asks = BookSide()
+        self.updated_at = None
+
+    def replace(self, bids, asks):
+        """
+        :param bids: (price, quantity) levels
+        :type bids: list
+        :param asks: (price, quantity) levels
+        :type asks: list
+        """
+        for side, levels in ((self.bids, bids), (self.asks, asks)):
+            levels = np.asarray(levels, dtype=np.float64).reshape(-1, 2)
+            side.replace(levels[:, 0], levels[:, 1])
+        self.updated_at = time.time()
+
+    def apply_diff(self, bids=(), asks=()):
+        """
+        Applies (price, quantity) changes to each side, a quantity of 0 removing the level
+        """
+        for side, levels in ((self.bids, bids), (self.asks, asks)):
+            levels = np.asarray(levels, dtype=np.float64).reshape(-1, 2)
+            side.apply(levels[:, 0], levels[:, 1])
+        self.updated_at = time.time()
+
+    @classmethod
+    def from_bittrex(cls, market, result):
+        """
+        Book from the result of a getorderbook call of type both
+        """
+        book = cls(market)
+        book.replace([(level["Rate"], level["Quantity"]) for level in result.get("buy") or []],
+                     [(level["Rate"], level["Quantity"]) for level in result.get("sell") or []])
+        return book
+
+    def age(self):
+        return float("inf") if self.updated_at is None else time.time() - self.updated_at
+
+    def fill_price(self, side, quantity):
+        """
+        Limit price filling a buy (walking the asks) or a sell (walking the bids) of quantity at once
+
+        :param side: 'buy' or 'sell'
+        :type side: str
+        """
+        return (self.asks if side == "buy" else self.bids).fill_price(quantity)
+
+
+class OrderBookCache(object):
+    """
+    Order books of the tracked markets, refreshed from operator snapshots when they get older than max_age,
+    or kept current by feeding stream diffs to apply_diff
+    """
+
+    def __init__(self, operator, max_age=10, depth=50, max_slippage=None):
+        """
+        :param operator: Exchange adapter instance
+        :param max_age: Seconds a book is used before a new snapshot is requested
+        :type max_age: float
+        :param depth: Levels requested per side
+        :type depth: int
+        :param max_slippage: Largest fraction the fill price may be past the reference price, None for no limit
+        :type max_slippage: float
+        """
+        self.operator = operator
+        self.max_age = max_age
+        self.depth = depth
+        self.max_slippage = max_slippage
+        self.books = {}
+
+    def get(self, market):
+        """
+        The market's book, refreshed when stale and the operator has order books
+
+        :return: The book, None when there is none
+        :rtype: OrderBook
+        """
+        book = self.books.get(market)
+        if (book is None or book.age() > self.max_age) and operators.supports(self.operator, operators.ORDER_BOOK):
+            response = self.operator.get_order_book(market, "both", self.depth)
+            if response["success"]:
+                book = self.books[market] = OrderBook.from_bittrex(market, response["result"])
+        return book
+
+    def apply_diff(self, market, bids=(), asks=()):
+        """
+        Applies a stream diff, the book being created empty when it does not exist yet
+        """
+        self.books.setdefault(market, OrderBook(market)).apply_diff(bids, asks)
+
+    def drop(self, market):
+        self.books.pop(market, None)
+
+    def fill_price(self, market, side, quantity, default=None):
+        """
+        Limit price filling quantity at once on the market, default when there is no book or not enough depth
+
+        :param default: Reference price (the ask of a buy, the bid of a sell), slippage is measured from it
+        :type default: float
+
+        :return: The price, None when it is more than max_slippage past default
+        :rtype: float
+        """
+        book = self.get(market)
+        price = book.fill_price(side, quantity) if book is not None else None
+        if price is None:
+            return default
+        if self.max_slippage is not None and default:
+            slippage = (price - default) / default if side == "buy" else (default - price) / default
+            if slippage > self.max_slippage:
+                return None
+        return price
@@ -0,0 +1,31 @@
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+
+def imap_bounded(function, jobs, n_jobs=None, in_flight=2):
+    """
+    Runs function over jobs in a process pool, submitting jobs lazily so that at most in_flight jobs per worker
+    are queued. Results are yielded as they complete, not in job order
+
+    :param function: Picklable function of one job
+    :param jobs: Iterable of jobs, consumed lazily
+    :param n_jobs: Worker processes, defaults to the CPU count
+    :type n_jobs: int
+    :param in_flight: Jobs submitted per worker ahead of the results being consumed
+    :type in_flight: int
+
+    :rtype: generator
+    """
+    workers = n_jobs or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = set()
+        for job in jobs:
+            pending.add(executor.submit(function, job))
+            if len(pending) >= in_flight * workers:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
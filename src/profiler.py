@@ -0,0 +1,126 @@
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+from src.logger import current_phase
+
+NO_PHASE = "other"
+
+
+class SamplingProfiler(object):
+    """
+    Samples the call stack of one thread at a fixed interval from a background thread.
+    Each sample is tagged with the innermost open span (fetch, indicators, strategy, persistence, notification, order)
+    """
+
+    def __init__(self, interval=0.005, thread_id=None):
+        """
+        :param interval: Seconds between two samples
+        :type interval: float
+        :param thread_id: Thread to sample, defaults to the thread creating the profiler
+        :type thread_id: int
+        """
+        self.interval = interval
+        self.thread_id = threading.get_ident() if thread_id is None else thread_id
+        self.stacks = Counter()
+        self.samples = 0
+        self._running = threading.Event()
+        self._thread = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def start(self):
+        self._running.set()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._running.clear()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while self._running.is_set():
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self._sample(frame)
+            time.sleep(self.interval)
+
+    def _sample(self, frame):
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            stack.append("{}:{}".format(os.path.basename(code.co_filename), code.co_name))
+            frame = frame.f_back
+        stack.append(current_phase(self.thread_id) or NO_PHASE)
+        stack.reverse()
+        self.stacks[tuple(stack)] += 1
+        self.samples += 1
+
+    def collapsed(self):
+        """
+        Returns the samples in the collapsed-stack format read by flamegraph.pl and speedscope,
+        the phase being the root frame of each stack
+
+        :rtype: str
+        """
+        return "".join("{} {}\n".format(";".join(stack), count) for stack, count in self.stacks.most_common())
+
+    def function_table(self, limit=40):
+        """
+        Returns a per-function table sorted by inclusive samples
+
+        :param limit: Number of functions to include
+        :type limit: int
+
+        :rtype: str
+        """
+        own = Counter()
+        total = Counter()
+        phases = Counter()
+        for stack, count in self.stacks.items():
+            phases[stack[0]] += count
+            own[stack[-1]] += count
+            for function in set(stack[1:]):
+                total[function] += count
+
+        samples = max(self.samples, 1)
+        lines = ["{:>8} {:>7}  {}".format("samples", "%", "phase")]
+        for phase, count in phases.most_common():
+            lines.append("{:>8} {:>6.1f}%  {}".format(count, 100.0 * count / samples, phase))
+        lines.append("")
+        lines.append("{:>8} {:>7} {:>8} {:>7}  {}".format("total", "%", "self", "%", "function"))
+        for function, count in total.most_common(limit):
+            lines.append("{:>8} {:>6.1f}% {:>8} {:>6.1f}%  {}".format(
+                count, 100.0 * count / samples, own[function], 100.0 * own[function] / samples, function
+            ))
+        return "\n".join(lines) + "\n"
+
+    def write(self, directory, prefix="profile"):
+        """
+        Writes the collapsed stacks and the function table to a directory
+
+        :param directory: The output directory (ex: ./logs/profile)
+        :type directory: str
+        :param prefix: File name prefix
+        :type prefix: str
+
+        :return: Paths of the collapsed-stack file and of the function table
+        :rtype: str, str
+        """
+        os.makedirs(directory, exist_ok=True)
+        collapsed_file = os.path.join(directory, prefix + ".collapsed")
+        table_file = os.path.join(directory, prefix + ".txt")
+        with open(collapsed_file, "w") as file:
+            file.write(self.collapsed())
+        with open(table_file, "w") as file:
+            file.write(self.function_table())
+        return collapsed_file, table_file
@@ -0,0 +1,74 @@
+import numpy as np
+import pandas as pd
+
+
+class Recorder(object):
+    """
+    Row recorder backed by a typed NumPy record array.
+    Rows are written in place and the buffer doubles when full, so recording n rows costs O(n) instead of the
+    O(n²) of growing a DataFrame with .loc or concat. The DataFrame is only built once, by to_frame
+    """
+
+    def __init__(self, columns, capacity=64):
+        """
+        :param columns: (name, dtype) pairs, in the column order of the final DataFrame
+        :type columns: list
+        :param capacity: Initial number of rows allocated
+        :type capacity: int
+        """
+        self.dtype = np.dtype(list(columns))
+        self.records = np.zeros(max(capacity, 1), dtype=self.dtype)
+        self.size = 0
+
+    @classmethod
+    def from_frame(cls, df, columns, capacity=64):
+        """
+        Creates a recorder holding the rows of an existing DataFrame
+        """
+        recorder = cls(columns, capacity=max(capacity, 2 * len(df)))
+        for name in recorder.dtype.names:
+            values = df[name]
+            if np.issubdtype(recorder.dtype[name], np.datetime64):
+                values = pd.to_datetime(values)
+            recorder.records[name][:len(df)] = values.to_numpy()
+        recorder.size = len(df)
+        return recorder
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, index):
+        return self.records[:self.size][index]
+
+    def _reserve(self, size):
+        if size <= len(self.records):
+            return
+        records = np.zeros(max(size, 2 * len(self.records)), dtype=self.dtype)
+        records[:self.size] = self.records[:self.size]
+        self.records = records
+
+    def set(self, index, **values):
+        """
+        Writes a row at index, which may be an existing row or the next one. Columns not given keep their value
+
+        :param index: Row position, at most len(self)
+        :type index: int
+        """
+        if index > self.size:
+            raise IndexError("Row {} is past the end of a recorder with {} rows".format(index, self.size))
+        self._reserve(index + 1)
+        record = self.records[index]
+        for name, value in values.items():
+            record[name] = value
+        self.size = max(self.size, index + 1)
+
+    def append(self, **values):
+        self.set(self.size, **values)
+
+    def to_frame(self):
+        """
+        :return: The recorded rows, one column per field
+        :rtype: pd.DataFrame
+        """
+        records = self.records[:self.size]
+        return pd.DataFrame({name: records[name] for name in self.dtype.names})
@@ -0,0 +1,197 @@
+"""
+   Portfolio level position sizing across many markets at once. Every market gets a volatility scaled weight
+   (target volatility over its rolling std of returns), capped per asset, limited to max_positions and scaled
+   down to fit the total exposure. All the math runs over the last axis of the arrays, so one cycle of hundreds
+   of pairs, or a whole (candles x pairs) history, is sized in a few array operations.
+"""
+import numpy as np
+
+
+def returns(closes):
+    """
+    Simple returns of closing prices, NaN on the first row
+
+    :param closes: Closing prices, rows oldest first, one column per market
+    :type closes: np.ndarray
+
+    :rtype: np.ndarray
+    """
+    closes = np.asarray(closes, dtype=np.float64)
+    changes = np.full(closes.shape, np.nan)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        changes[1:] = closes[1:] / closes[:-1] - 1.0
+    return changes
+
+
+def rolling_volatility(closes, window=14):
+    """
+    Rolling std of returns, as Series.pct_change().rolling(window).std() for every column at once
+
+    :param closes: Closing prices, rows oldest first, one column per market
+    :type closes: np.ndarray
+    :param window: Number of returns in each std
+    :type window: int
+
+    :return: Same shape as closes, NaN until a window is full
+    :rtype: np.ndarray
+    """
+    changes = returns(closes)
+    if changes.ndim == 1:
+        return rolling_volatility(np.asarray(closes, dtype=np.float64)[:, None], window)[:, 0]
+    volatility = np.full(changes.shape, np.nan)
+    if window < 2 or window >= len(changes):
+        return volatility
+    values = changes[1:]
+    count = len(values) - window + 1
+    # Two passes over shifted slices, the mean then the squared deviations from it: no cancellation between
+    # running sums of x and x**2 on long series, and a flat window has exactly 0 volatility
+    mean = np.zeros((count, values.shape[1]))
+    for k in range(window):
+        mean += values[k:k + count]
+    mean /= window
+    variance = np.zeros_like(mean)
+    for k in range(window):
+        deviation = values[k:k + count] - mean
+        variance += deviation * deviation
+    volatility[window:] = np.sqrt(variance / (window - 1))
+    return volatility
+
+
+def drawdown(equity):
+    """
+    Maximum drawdown of an equity curve, as a negative fraction
+    """
+    equity = np.asarray(equity, dtype=np.float64)
+    if len(equity) == 0:
+        return 0.0
+    return float((equity / np.maximum.accumulate(equity) - 1.0).min())
+
+
+class RiskEngine(object):
+    """
+    Allocates capital across simultaneous buy signals
+    """
+
+    def __init__(self, capital, max_asset_exposure=0.2, max_total_exposure=1.0, target_volatility=0.01,
+                 max_positions=None, window=14):
+        """
+        :param capital: Capital the weights refer to (ex: BTC balance)
+        :type capital: float
+        :param max_asset_exposure: Largest fraction of the capital in one market
+        :type max_asset_exposure: float
+        :param max_total_exposure: Largest fraction of the capital in all markets together
+        :type max_total_exposure: float
+        :param target_volatility: Volatility each position is sized to, a market with this rolling std gets a
+            weight of 1 before the caps
+        :type target_volatility: float
+        :param max_positions: Most markets held at once, None for no limit
+        :type max_positions: int
+        :param window: Rolling std window, in candles
+        :type window: int
+        """
+        self.capital = capital
+        self.max_asset_exposure = max_asset_exposure
+        self.max_total_exposure = max_total_exposure
+        self.target_volatility = target_volatility
+        self.max_positions = max_positions
+        self.window = window
+
+    @classmethod
+    def from_settings(cls, settings):
+        """
+        Engine from the optional riskParameters of settings.json, None when they are not set.
+        maxOpenTrades is used as max_positions unless riskParameters sets maxPositions
+        """
+        params = settings.get("riskParameters")
+        if not params:
+            return None
+        return cls(params["capital"],
+                   params.get("maxAssetExposure", 0.2),
+                   params.get("maxTotalExposure", 1.0),
+                   params.get("targetVolatility", 0.01),
+                   params.get("maxPositions", settings["tradeParameters"]["buy"].get("maxOpenTrades") or None),
+                   params.get("window", 14))
+
+    def weights(self, signals, volatility, scores=None, exposure=None):
+        """
+        Fractions of the capital to put in each market
+
+        :param signals: Buy flags, one per market on the last axis
+        :type signals: np.ndarray
+        :param volatility: Rolling std of returns, same shape as signals
+        :type volatility: np.ndarray
+        :param scores: Optional conviction per market in [0, 1] (ex: perc_aplicado), multiplies the weights
+        :type scores: np.ndarray
+        :param exposure: Fractions already held per market, they count against every cap
+        :type exposure: np.ndarray
+
+        :rtype: np.ndarray
+        """
+        signals = np.asarray(signals) > 0
+        volatility = np.asarray(volatility, dtype=np.float64)
+        exposure = np.zeros(signals.shape) if exposure is None else np.asarray(exposure, dtype=np.float64)
+
+        usable = signals & np.isfinite(volatility) & (volatility > 0)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            raw = np.where(usable, self.target_volatility / volatility, 0.0)
+        if scores is not None:
+            raw = raw * np.clip(np.nan_to_num(np.asarray(scores, dtype=np.float64)), 0.0, 1.0)
+        raw = np.clip(np.minimum(raw, self.max_asset_exposure - exposure), 0.0, None)
+
+        if self.max_positions is not None:
+            # New positions only take the free slots, the largest weights first
+            slots = self.max_positions - (exposure > 0).sum(axis=-1, keepdims=True)
+            candidates = np.where(exposure > 0, 0.0, raw)
+            rank = np.argsort(np.argsort(-candidates, axis=-1, kind="stable"), axis=-1, kind="stable")
+            raw = np.where((exposure > 0) | ((rank < slots) & (candidates > 0)), raw, 0.0)
+
+        room = np.clip(self.max_total_exposure - exposure.sum(axis=-1, keepdims=True), 0.0, None)
+        total = raw.sum(axis=-1, keepdims=True)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            scale = np.where(total > room, room / total, 1.0)
+        return raw * scale
+
+    def allocate(self, signals, volatility, scores=None, exposure=None, capital=None):
+        """
+        Capital to spend on each market this cycle, see weights
+
+        :rtype: np.ndarray
+        """
+        capital = self.capital if capital is None else capital
+        return self.weights(signals, volatility, scores, exposure) * capital
+
+    def evaluate(self, closes, signals, scores=None, commission=0.0):
+        """
+        Vectorized portfolio backtest: at every candle the portfolio is rebalanced to the weights of that candle's
+        signals, and earns the next candle's returns
+
+        :param closes: Closing prices, rows oldest first, one column per market
+        :type closes: np.ndarray
+        :param signals: Buy flags, same shape as closes (a market is held while its flag is set)
+        :type signals: np.ndarray
+        :param scores: Optional conviction per market and candle
+        :type scores: np.ndarray
+        :param commission: Fraction paid on the traded turnover
+        :type commission: float
+
+        :return: Equity curve starting at capital, weights held after each candle and summary
+        :rtype: np.ndarray, np.ndarray, dict
+        """
+        closes = np.asarray(closes, dtype=np.float64)
+        weights = self.weights(signals, rolling_volatility(closes, self.window), scores)
+        changes = np.nan_to_num(returns(closes))
+
+        portfolio = np.zeros(len(closes))
+        portfolio[1:] = (weights[:-1] * changes[1:]).sum(axis=1)
+        turnover = np.abs(np.diff(weights, axis=0, prepend=0.0)).sum(axis=1)
+        equity = self.capital * np.cumprod((1.0 + portfolio) * (1.0 - commission * turnover))
+        final = float(equity[-1]) if len(equity) else float(self.capital)
+        summary = {
+            "initial_balance": self.capital,
+            "final_balance": final,
+            "roi": (final - self.capital) / self.capital,
+            "max_drawdown": drawdown(equity),
+            "mean_exposure": float(weights.sum(axis=1).mean()) if len(weights) else 0.0,
+            "max_positions": int((weights > 0).sum(axis=1).max()) if len(weights) else 0
+        }
+        return equity, weights, summary
@@ -0,0 +1,127 @@
+"""
+   Two stage screening of the buy scan. Stage one filters every market at once from the cycle's market snapshot
+   (24 hour volume, minimum unit price and liquidity); stage two runs the full per pair strategy (candles, RSI and
+   the snapshot's prices) on the survivors only. Each run reports what every stage pruned and the time stage one
+   saved. The strategy only evaluates: orders are placed after the run, so their fills are not counted as screening.
+"""
+import time
+
+import numpy as np
+
+from src import metrics
+from src.logger import logger
+
+
+class ScreenReport(object):
+    """
+    Outcome of one screening run
+    """
+
+    def __init__(self, markets, survivors, selected, stage_one_time, stage_two_time):
+        self.markets = markets
+        self.survivors = survivors
+        self.selected = selected
+        self.stage_one_time = stage_one_time
+        self.stage_two_time = stage_two_time
+
+    @property
+    def stage_one_pruned(self):
+        return self.markets - self.survivors
+
+    @property
+    def stage_two_pruned(self):
+        return self.survivors - self.selected
+
+    @property
+    def saved_time(self):
+        """
+        Estimated seconds saved: the pairs pruned by stage one times the mean stage two time per pair
+        """
+        if self.survivors == 0:
+            return 0.0
+        return self.stage_one_pruned * self.stage_two_time / self.survivors - self.stage_one_time
+
+    def summary(self):
+        return {
+            "markets": self.markets,
+            "stage_one_pruned": self.stage_one_pruned,
+            "stage_two_pruned": self.stage_two_pruned,
+            "selected": self.selected,
+            "stage_one_seconds": round(self.stage_one_time, 6),
+            "stage_two_seconds": round(self.stage_two_time, 6),
+            "saved_seconds": round(self.saved_time, 6)
+        }
+
+
+class Screener(object):
+    """
+    Prunes the markets of a buy scan before the per pair strategy runs
+    """
+
+    def __init__(self, check_buy_parameters, screen_params=None):
+        """
+        :param check_buy_parameters: Trader.check_buy_parameters, applied element-wise to the snapshot columns
+        :type check_buy_parameters: function
+        :param screen_params: Optional screenParameters of settings.json: maxSpread (largest (ask - bid) / ask)
+            and minOpenOrders (fewest open buy and sell orders on each side)
+        :type screen_params: dict
+        """
+        screen_params = screen_params or {}
+        self.check_buy_parameters = check_buy_parameters
+        self.max_spread = screen_params.get("maxSpread")
+        self.min_open_orders = screen_params.get("minOpenOrders", 0)
+
+    def stage_one(self, snapshot, coin_pairs):
+        """
+        Coin pairs passing the volume, price and liquidity checks on the snapshot. Pairs missing from the
+        snapshot are kept, stage two checks them one by one
+
+        :param snapshot: The cycle's market summaries, None to keep every pair
+        :type snapshot: src.market_snapshot.MarketSnapshot
+        :param coin_pairs: Coin pair markets to scan (ex: BTC-ETH, BTC-FCT)
+        :type coin_pairs: list
+
+        :rtype: list
+        """
+        if snapshot is None:
+            return list(coin_pairs)
+        day_volume = snapshot.column("BaseVolume", coin_pairs)
+        ask = snapshot.column("Ask", coin_pairs)
+        # Any RSI passes, so only the volume and price checks apply
+        passed = self.check_buy_parameters(-np.inf, day_volume, ask)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            if self.max_spread is not None:
+                spread = (ask - snapshot.column("Bid", coin_pairs)) / ask
+                passed = passed & (spread <= self.max_spread)
+            if self.min_open_orders:
+                open_orders = np.minimum(snapshot.column("OpenBuyOrders", coin_pairs),
+                                         snapshot.column("OpenSellOrders", coin_pairs))
+                passed = passed & (open_orders >= self.min_open_orders)
+        missing = np.isnan(day_volume) & np.isnan(ask)
+        return [coin_pair for coin_pair, keep in zip(coin_pairs, passed | missing) if keep]
+
+    def run(self, snapshot, coin_pairs, strategy):
+        """
+        Runs both stages
+
+        :param strategy: Stage two, called with each surviving coin pair, returning True when it selects the pair.
+            It must not place orders, or their waits would be timed as evaluation
+        :type strategy: function
+
+        :rtype: ScreenReport
+        """
+        start = time.perf_counter()
+        survivors = self.stage_one(snapshot, coin_pairs)
+        stage_one_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        selected = sum(1 for coin_pair in survivors if strategy(coin_pair))
+        stage_two_time = time.perf_counter() - start
+
+        report = ScreenReport(len(coin_pairs), len(survivors), selected, stage_one_time, stage_two_time)
+        metrics.screened_markets.inc(report.stage_one_pruned, stage="one")
+        metrics.screened_markets.inc(report.stage_two_pruned, stage="two")
+        metrics.screen_saved_time.inc(max(report.saved_time, 0.0))
+        logger.info("Screened {markets} markets: stage one pruned {stage_one_pruned}, stage two pruned "
+                    "{stage_two_pruned}, saving about {saved_seconds} s".format(**report.summary()))
+        return report
@@ -0,0 +1,364 @@
+"""
+   Candle cache in shared memory, written by the trader and mapped read-only by the Telegram bot and any other
+   process, so they read the trader's candles from memory instead of asking the exchange again.
+
+   One small index segment holds a slot per (coin pair, unit): its key, ring position and a sequence number.
+   Each slot owns a ring buffer segment of float64 rows (T as epoch seconds, O, H, L, C, V, BV). The single
+   writer makes a slot's sequence odd while it writes and even when it is done, readers copy the rows and
+   retry when the sequence was odd or moved (a seqlock), so no lock is shared between processes.
+
+   A third segment holds the last market snapshot (every market summary of a cycle) behind the same kind of
+   seqlock, so readers get prices and volumes without a summary request of their own.
+
+   A writer that restarts creates new segments under the same names, stamped with a new generation, while readers
+   keep mapping the old ones; reattach gives readers the current segments, or the cache once a writer created it.
+"""
+import atexit
+import time
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+import pandas as pd
+
+from src.logger import logger
+from src.market_snapshot import MarketSnapshot, numeric_columns
+
+segment_prefix = "i2a2_candles"
+
+columns = ["T", "O", "H", "L", "C", "V", "BV"]
+
+index_dtype = np.dtype([
+    ("key", "S48"),
+    ("sequence", np.int64),
+    ("head", np.int64),
+    ("count", np.int64),
+    ("updated_at", np.float64)
+])
+
+# Index header: number of slots and ring capacity, so readers map the same layout as the writer, and the
+# generation of the segments, a new one each time a writer creates them
+header_dtype = np.dtype([("slots", np.int64), ("capacity", np.int64), ("generation", np.int64)])
+
+# Summaries header: sequence, number of markets written and time of the snapshot
+summaries_dtype = np.dtype([("sequence", np.int64), ("count", np.int64), ("taken_at", np.float64)])
+
+# Segments created by this process, whose tracker registration belongs to their writer
+_created = set()
+
+
+def _key(coin_pair, unit):
+    return "{}|{}".format(coin_pair, unit).encode("utf-8")
+
+
+def _to_epoch(dates):
+    return pd.to_datetime(pd.Series(dates)).to_numpy(dtype="datetime64[ns]").astype(np.int64) / 1e9
+
+
+class SharedCandleCache(object):
+    """
+    Writer (create=True, one per host) or read-only view (create=False) of the shared candle cache
+    """
+
+    def __init__(self, name=segment_prefix, create=False, slots=256, capacity=1440, max_age=120, summary_slots=1024):
+        """
+        :param name: Prefix of the shared memory segments
+        :type name: str
+        :param create: Create the segments and own them (the trader), or attach to existing ones
+        :type create: bool
+        :param slots: Most (coin pair, unit) series, used when creating
+        :type slots: int
+        :param capacity: Candles kept per series, used when creating
+        :type capacity: int
+        :param max_age: Seconds a reader trusts a series (or the market snapshot) after its last write
+        :type max_age: float
+        :param summary_slots: Most markets of the shared snapshot, used when creating
+        :type summary_slots: int
+        """
+        self.name = name
+        self.create = create
+        self.max_age = max_age
+        self._segments = {}
+        size = header_dtype.itemsize + slots * index_dtype.itemsize
+        self._index_segment = self._open(name + "_index", size)
+        buffer = self._index_segment.buf
+        self.header = np.ndarray((), dtype=header_dtype, buffer=buffer)
+        if create:
+            self.header["slots"] = slots
+            self.header["capacity"] = capacity
+            self.header["generation"] = time.time_ns()
+        self.generation = int(self.header["generation"])
+        self.slots = int(self.header["slots"])
+        self.capacity = int(self.header["capacity"])
+        self.index = np.ndarray((self.slots,), dtype=index_dtype, buffer=buffer, offset=header_dtype.itemsize)
+        if create:
+            self.index[:] = np.zeros(self.slots, dtype=index_dtype)
+
+        # The market count is the first field of the segment, so readers map the writer's layout
+        size = 8 + summaries_dtype.itemsize + summary_slots * (48 + 8 * len(numeric_columns))
+        self._summaries_segment = self._open(name + "_summaries", size)
+        buffer = self._summaries_segment.buf
+        count = np.ndarray((), dtype=np.int64, buffer=buffer)
+        if create:
+            count[...] = summary_slots
+        self.markets = int(count)
+        offset = 8
+        self.summaries = np.ndarray((), dtype=summaries_dtype, buffer=buffer, offset=offset)
+        if create:
+            self.summaries[...] = np.zeros((), dtype=summaries_dtype)
+        offset += summaries_dtype.itemsize
+        self.market_keys = np.ndarray((self.markets,), dtype="S48", buffer=buffer, offset=offset)
+        offset += self.markets * 48
+        self.market_values = np.ndarray((self.markets, len(numeric_columns)), dtype=np.float64, buffer=buffer,
+                                        offset=offset)
+        if not create:
+            for array in (self.header, self.index, self.summaries, self.market_keys, self.market_values):
+                array.flags.writeable = False
+
+    def _open(self, segment_name, size):
+        if self.create:
+            try:
+                shared_memory.SharedMemory(segment_name).unlink()
+            except FileNotFoundError:
+                pass
+            _created.add(segment_name)
+            return shared_memory.SharedMemory(segment_name, create=True, size=size)
+        segment = shared_memory.SharedMemory(segment_name)
+        # Readers must not unlink the writer's segments when they exit (the tracker would do so)
+        if segment_name not in _created:
+            resource_tracker.unregister(segment._name, "shared_memory")
+        return segment
+
+    def _ring(self, slot):
+        if slot not in self._segments:
+            segment = self._open("{}_{}".format(self.name, slot), self.capacity * len(columns) * 8)
+            ring = np.ndarray((self.capacity, len(columns)), dtype=np.float64, buffer=segment.buf)
+            if not self.create:
+                ring.flags.writeable = False
+            self._segments[slot] = (segment, ring)
+        return self._segments[slot][1]
+
+    def _slot(self, coin_pair, unit):
+        found = np.flatnonzero(self.index["key"] == _key(coin_pair, unit))
+        return int(found[0]) if len(found) else None
+
+    def series(self):
+        """
+        (coin pair, unit) of every series in the cache
+        """
+        keys = self.index["key"][self.index["key"] != b""]
+        return [tuple(key.decode("utf-8").split("|", 1)) for key in keys]
+
+    def write(self, coin_pair, unit, candles):
+        """
+        Adds the candles newer than the cached ones, the last cached candle being overwritten when it comes
+        again (it may still have been open)
+
+        :param candles: Adapter records (T, O, H, L, C, V and optionally BV), oldest first
+        :type candles: list
+        """
+        if not self.create:
+            raise PermissionError("The shared candle cache is read-only in this process")
+        if len(candles) == 0:
+            return
+        df = pd.DataFrame(candles)
+        rows = np.column_stack([_to_epoch(df["T"])] + [
+            df[column].to_numpy(dtype=np.float64) if column in df else np.full(len(df), np.nan)
+            for column in columns[1:]
+        ])
+
+        slot = self._slot(coin_pair, unit)
+        new = slot is None
+        if new:
+            free = np.flatnonzero(self.index["key"] == b"")
+            # When full, the least recently updated series gives its slot away
+            slot = int(free[0]) if len(free) else int(np.argmin(self.index["updated_at"]))
+        ring = self._ring(slot)
+        entry = self.index[slot:slot + 1]
+
+        entry["sequence"] += 1
+        if new:
+            entry["key"] = _key(coin_pair, unit)
+            entry["head"] = entry["count"] = 0
+        head, count = int(entry["head"][0]), int(entry["count"][0])
+        if count:
+            last = ring[(head - 1) % self.capacity, 0]
+            rows = rows[rows[:, 0] >= last]
+            if len(rows) and rows[0, 0] == last:
+                head, count = (head - 1) % self.capacity, count - 1
+        rows = rows[-self.capacity:]
+        positions = (head + np.arange(len(rows))) % self.capacity
+        ring[positions] = rows
+        entry["head"] = (head + len(rows)) % self.capacity
+        entry["count"] = min(count + len(rows), self.capacity)
+        entry["updated_at"] = time.time()
+        entry["sequence"] += 1
+
+    def read(self, coin_pair, unit, period=None, retries=100):
+        """
+        Last candles of a series as an array of rows (columns T, O, H, L, C, V, BV), oldest first
+
+        :param period: Number of candles, defaults to all the cached ones
+        :type period: int
+
+        :return: The rows, None when the series is not cached
+        :rtype: np.ndarray
+        """
+        slot = self._slot(coin_pair, unit)
+        if slot is None:
+            return None
+        key = _key(coin_pair, unit)
+        ring = self._ring(slot)
+        entry = self.index[slot:slot + 1]
+        for _ in range(retries):
+            sequence = int(entry["sequence"][0])
+            if sequence % 2:
+                time.sleep(0)
+                continue
+            count = int(entry["count"][0])
+            size = count if period is None else min(period, count)
+            positions = (int(entry["head"][0]) - size + np.arange(size)) % self.capacity
+            rows = ring[positions]
+            if int(entry["sequence"][0]) == sequence:
+                # The slot may have been given to another series in the meantime
+                return rows if entry["key"][0] == key else None
+        return None
+
+    def age(self, coin_pair, unit):
+        """
+        Seconds since the series was last written, infinite when it is not cached
+        """
+        slot = self._slot(coin_pair, unit)
+        if slot is None:
+            return float("inf")
+        return time.time() - float(self.index["updated_at"][slot])
+
+    def attached(self):
+        """
+        Whether the segments mapped are still the writer's, False once the writer created new ones or removed them
+        """
+        if self.create:
+            return True
+        try:
+            segment = self._open(self.name + "_index", header_dtype.itemsize)
+        except FileNotFoundError:
+            return False
+        try:
+            return int(np.ndarray((), dtype=header_dtype, buffer=segment.buf)["generation"]) == self.generation
+        finally:
+            segment.close()
+
+    def write_snapshot(self, snapshot):
+        """
+        Shares a market snapshot, the markets past the segment's size being left out
+
+        :type snapshot: src.market_snapshot.MarketSnapshot
+        """
+        if not self.create:
+            raise PermissionError("The shared candle cache is read-only in this process")
+        count = min(len(snapshot), self.markets)
+        if count < len(snapshot):
+            logger.warning("Sharing {} of the {} markets of the snapshot".format(count, len(snapshot)))
+        self.summaries["sequence"] += 1
+        self.market_keys[:count] = [market.encode("utf-8") for market in snapshot.markets[:count]]
+        self.market_values[:count] = np.column_stack([snapshot.columns[name][:count] for name in numeric_columns])
+        self.summaries["count"] = count
+        self.summaries["taken_at"] = snapshot.taken_at
+        self.summaries["sequence"] += 1
+
+    def snapshot_age(self):
+        """
+        Seconds since the shared snapshot was taken, infinite when none was written
+        """
+        taken_at = float(self.summaries["taken_at"])
+        return time.time() - taken_at if taken_at else float("inf")
+
+    def read_snapshot(self, retries=100):
+        """
+        Copy of the shared market snapshot
+
+        :return: The snapshot, None when none was written
+        :rtype: src.market_snapshot.MarketSnapshot
+        """
+        for _ in range(retries):
+            sequence = int(self.summaries["sequence"])
+            if sequence % 2:
+                time.sleep(0)
+                continue
+            count = int(self.summaries["count"])
+            taken_at = float(self.summaries["taken_at"])
+            keys = self.market_keys[:count].copy()
+            values = self.market_values[:count].copy()
+            if int(self.summaries["sequence"]) == sequence:
+                if not taken_at:
+                    return None
+                columns = {name: values[:, position] for position, name in enumerate(numeric_columns)}
+                return MarketSnapshot([key.decode("utf-8") for key in keys], columns, taken_at)
+        return None
+
+    def get_historical_data(self, coin_pair, period=None, unit=None):
+        """
+        Cached candles in the adapter record format, so the cache can stand in for an operator's candle fetch
+        """
+        rows = self.read(coin_pair, unit, period)
+        if rows is None:
+            return None
+        dates = pd.to_datetime(np.round(rows[:, 0] * 1e3).astype(np.int64), unit="ms")
+        return [dict(zip(columns, (date,) + tuple(row[1:]))) for date, row in zip(dates, rows)]
+
+    def close(self):
+        """
+        Unmaps the segments, and removes them when this process created them
+        """
+        for segment, _ in self._segments.values():
+            segment.close()
+            if self.create:
+                segment.unlink()
+        self._segments = {}
+        self.header = self.index = self.summaries = self.market_keys = self.market_values = None
+        for segment in (self._index_segment, self._summaries_segment):
+            segment.close()
+            if self.create:
+                segment.unlink()
+
+
+def open_cache(params, create=False):
+    """
+    Cache from the sharedCandles settings (optional name, slots, capacity, summarySlots and maxAge, the seconds a
+    reader trusts a series), created by the trader and attached to by the bot and other readers, which call
+    reattach every reattachInterval seconds
+
+    :param create: Create the cache (writer) or attach to it (reader)
+    :type create: bool
+
+    :return: The cache, None when reading and no writer has created it
+    :rtype: SharedCandleCache
+    """
+    try:
+        cache = SharedCandleCache(params.get("name", segment_prefix), create, params.get("slots", 256),
+                                  params.get("capacity", 1440), params.get("maxAge", 120),
+                                  params.get("summarySlots", 1024))
+    except FileNotFoundError:
+        logger.warning("No shared candle cache to read, is the trader running with sharedCandles set?")
+        return None
+    if create:
+        atexit.register(cache.close)
+    return cache
+
+
+def reattach(cache, params):
+    """
+    The reader's cache attached to the writer's current segments: opened when there was none (the writer was
+    not running yet), opened again when the writer created new segments since (it restarted)
+
+    :param cache: The reader's cache, None when it could not attach so far
+    :type cache: SharedCandleCache
+
+    :return: The cache to read, None when no writer has created it
+    :rtype: SharedCandleCache
+    """
+    if cache is not None and cache.attached():
+        return cache
+    if cache is not None:
+        logger.info("The shared candle cache was created again by its writer, attaching to the new one")
+        cache.close()
+    return open_cache(params, create=False)
@@ -0,0 +1,159 @@
+"""
+   Content-addressed cache of the train/test split and fitted MinMaxScaler built by bayes._preprocess.
+   Entries are keyed by a hash of the rows used (dates, features and label), the feature list, the label
+   and the cutoff date, so every model builder asking for the same matrices shares one split and one fit.
+   The module-level cache persists its entries under database/splits in the repository, wherever the process
+   runs from (notebooks run from their own directory), so a restart does not refit them.
+"""
+import copy
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from src import metrics
+from src.directory_utilities import validate_or_make_directory
+from src.logger import logger
+
+split_cache_directory_string = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                            "database", "splits")
+
+
+def dataset_key(df, features, label, cutoff):
+    """
+    Hash of everything the split depends on
+
+    :rtype: str
+    """
+    columns = ['Data'] + list(features) + [label]
+    digest = hashlib.sha1(pd.util.hash_pandas_object(df[columns], index=True).values.tobytes())
+    digest.update(json.dumps([list(features), label, str(pd.Timestamp(cutoff))]).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def _read_only(array):
+    array.setflags(write=False)
+    return array
+
+
+def _handout(entry):
+    """
+    The X arrays are read-only and shared; the y Series and the scaler are mutable, so each caller gets its own
+    """
+    X_train, y_train, X_test, y_test, scaler = entry
+    return X_train, y_train.copy(), X_test, y_test.copy(), copy.deepcopy(scaler)
+
+
+class SplitCache(object):
+    """
+    LRU cache of (X_train, y_train, X_test, y_test, scaler) tuples, optionally persisted as .npz files
+    """
+
+    def __init__(self, max_entries=64, directory=None):
+        """
+        :param max_entries: Entries kept in memory
+        :type max_entries: int
+        :param directory: Directory of the .npz files, None to keep the cache in memory only
+        :type directory: str
+        """
+        self.max_entries = max_entries
+        self.directory = directory
+        self.entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, df, features, label, cutoff, build):
+        """
+        Returns the cached split, building it with build(df, features, label, cutoff) on a miss.
+        The X arrays are shared between callers and marked read-only, the y Series and the scaler are copies
+
+        :rtype: tuple
+        """
+        key = dataset_key(df, features, label, cutoff)
+        with self._lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                metrics.cache.hit("split")
+                return _handout(self.entries[key])
+
+        entry = self._load(key)
+        if entry is None:
+            metrics.cache.miss("split")
+            entry = build(df, features, label, cutoff)
+            for array in (entry[0], entry[2]):
+                _read_only(array)
+            self._save(key, entry)
+        else:
+            metrics.cache.hit("split")
+
+        with self._lock:
+            self.entries[key] = entry
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        return _handout(entry)
+
+    def clear(self):
+        with self._lock:
+            self.entries.clear()
+
+    def _file_string(self, key):
+        return os.path.join(self.directory, "{}.npz".format(key))
+
+    def _save(self, key, entry):
+        if self.directory is None:
+            return
+        X_train, y_train, X_test, y_test, scaler = entry
+        if y_train.index.dtype == object or y_test.index.dtype == object:
+            return
+        file_string = self._file_string(key)
+        validate_or_make_directory(file_string)
+        try:
+            np.savez(
+                file_string,
+                X_train=X_train, y_train=y_train.values, y_train_index=y_train.index.values,
+                X_test=X_test, y_test=y_test.values, y_test_index=y_test.index.values,
+                label=np.array(y_train.name), features=np.array(scaler.feature_names_in_, dtype=str),
+                feature_range=np.array(scaler.feature_range), data_min=scaler.data_min_, data_max=scaler.data_max_,
+                n_samples_seen=np.array(scaler.n_samples_seen_)
+            )
+        except OSError as exception:
+            logger.warning("Could not persist split {}: {}".format(key, exception))
+
+    def _load(self, key):
+        if self.directory is None or not os.path.exists(self._file_string(key)):
+            return None
+        from sklearn.preprocessing import MinMaxScaler
+
+        with np.load(self._file_string(key), allow_pickle=False) as data:
+            label = str(data["label"])
+            scaler = MinMaxScaler(feature_range=tuple(data["feature_range"]))
+            scaler.n_features_in_ = len(data["features"])
+            scaler.feature_names_in_ = data["features"].astype(object)
+            scaler.n_samples_seen_ = int(data["n_samples_seen"])
+            scaler.data_min_ = data["data_min"]
+            scaler.data_max_ = data["data_max"]
+            scaler.data_range_ = scaler.data_max_ - scaler.data_min_
+            # Same computation as MinMaxScaler.partial_fit
+            feature_range = scaler.feature_range
+            scaler.scale_ = (feature_range[1] - feature_range[0]) / _handle_zeros_in_scale(scaler.data_range_)
+            scaler.min_ = feature_range[0] - scaler.data_min_ * scaler.scale_
+            return (
+                _read_only(data["X_train"]),
+                pd.Series(data["y_train"], index=data["y_train_index"], name=label),
+                _read_only(data["X_test"]),
+                pd.Series(data["y_test"], index=data["y_test_index"], name=label),
+                scaler
+            )
+
+
+def _handle_zeros_in_scale(scale):
+    scale = scale.copy()
+    scale[scale < 10 * np.finfo(scale.dtype).eps] = 1.0
+    return scale
+
+
+split_cache = SplitCache(directory=split_cache_directory_string)
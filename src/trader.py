@@ -4,10 +4,14 @@ import numpy as np
 import time
 from datetime import datetime, timedelta
 
-from src.bittrex import Bittrex
 from src.messenger import Messenger
 from src.database import Database
-from src.logger import logger
+from src.logger import logger, span
+from src.market_snapshot import MarketSnapshot
+from src.order_book import OrderBookCache
+from src.risk import RiskEngine, rolling_volatility
+from src.screener import Screener
+from src import metrics, operators
 
 
 class Trader(object):
@@ -15,13 +19,42 @@ class Trader(object):
     Used for handling all trade functionality
     """
     operator = ""
-    def __init__(self, secrets, settings, operator):
+    def __init__(self, secrets, settings, operator, candle_writer=True):
         self.trade_params = settings["tradeParameters"]
         self.pause_params = settings["pauseParameters"]
 
         self.Messenger = Messenger(secrets, settings)
         self.Database = Database()
         self.operator = operator(secrets)
+        self.capabilities = operators.capabilities_of(self.operator)
+        self.snapshot = None
+        self.snapshot_max_age = settings.get("snapshotParameters", {}).get("maxAge", 60)
+        self.Screener = Screener(self.check_buy_parameters, settings.get("screenParameters"))
+        self.screen_report = None
+        self.buy_candidates = []
+        self.CandleCache = None
+        self.shared_params = settings.get("sharedCandles") or {}
+        self.candle_reader = bool(self.shared_params) and not candle_writer
+        self.cache_checked_at = time.time()
+        if self.shared_params:
+            from src.shared_candles import open_cache
+            self.CandleCache = open_cache(self.shared_params, candle_writer)
+        book_params = settings.get("orderBookParameters", {})
+        self.OrderBooks = OrderBookCache(self.operator, book_params.get("maxAge", 10), book_params.get("depth", 50),
+                                         book_params.get("maxSlippage"))
+
+        if settings.get("metricsPort"):
+            metrics.start_http_server(settings["metricsPort"])
+
+        self.RiskEngine = RiskEngine.from_settings(settings)
+
+        self.committee_params = settings.get("committee")
+        self.committee_record = None
+        self.committees = {}
+        if self.committee_params:
+            from src.model_registry import ModelRegistry
+            self.committee_record = ModelRegistry().load(self.committee_params["name"],
+                                                         self.committee_params.get("version"))
 
     def initialise(self):
         """
@@ -42,17 +75,99 @@ class Trader(object):
         """
         trade_len = len(self.Database.trades["trackedCoinPairs"])
         pause_trade_len = len(self.Database.app_data["pausedTrackedCoinPairs"])
-        if (trade_len < 1 or pause_trade_len == trade_len) and trade_len < self.trade_params["buy"]["maxOpenTrades"]:
-            for coin_pair in self.Database.app_data["coinPairs"]:
-                self.buy_strategy(coin_pair)
+        with metrics.scan_time.time(side="buy"):
+            self.buy_candidates = []
+            if (trade_len < 1 or pause_trade_len == trade_len) and trade_len < self.trade_params["buy"]["maxOpenTrades"]:
+                self.screen_report = self.Screener.run(self.snapshot, self.Database.app_data["coinPairs"],
+                                                       self.buy_strategy)
+        self.place_buys()
+        self.update_trade_gauges()
+
+    def place_buys(self):
+        """
+        Places the buys the scan selected, sized together by the risk engine when there is one. They are placed
+        once the scan is over, so the screen only times the evaluation and not the orders and their fills
+        """
+        candidates, self.buy_candidates = self.buy_candidates, []
+        if not candidates:
+            return
+        btc_amounts = np.full(len(candidates), self.trade_params["buy"]["btcAmount"])
+        if self.RiskEngine is not None:
+            btc_amounts = self.position_sizes([coin_pair for coin_pair, _, _ in candidates])
+        for (coin_pair, current_buy_price, buy_stats), btc_amount in zip(candidates, btc_amounts):
+            if btc_amount > 0:
+                self.buy(coin_pair, float(btc_amount), current_buy_price, buy_stats)
 
     def analyse_sells(self):
         """
         Analyse all the un-paused tracked coin pairs for sell signals and apply sells
         """
-        for coin_pair in self.Database.trades["trackedCoinPairs"]:
-            if coin_pair not in self.Database.app_data["pausedTrackedCoinPairs"]:
-                self.sell_strategy(coin_pair)
+        with metrics.scan_time.time(side="sell"):
+            for coin_pair in self.Database.trades["trackedCoinPairs"]:
+                if coin_pair not in self.Database.app_data["pausedTrackedCoinPairs"]:
+                    self.sell_strategy(coin_pair)
+        self.update_trade_gauges()
+
+    def refresh_snapshot(self):
+        """
+        Takes a snapshot of every market summary in one request, when the operator can, so that the cycle's
+        prices and volumes are read from it instead of one summary request per coin pair
+
+        :return: The snapshot, None when the operator has no bulk summaries or the request failed
+        :rtype: MarketSnapshot
+        """
+        self.snapshot = None
+        if operators.BULK_SUMMARIES not in self.capabilities:
+            return None
+        with span("fetch", endpoint="market_summaries"):
+            summaries = self.operator.get_market_summaries()
+        if not summaries["success"]:
+            logger.error("Could not get the market summaries: {}".format(summaries["message"]))
+            return None
+        self.snapshot = MarketSnapshot.from_summaries(summaries["result"])
+        if self.CandleCache is not None and self.CandleCache.create:
+            self.CandleCache.write_snapshot(self.snapshot)
+        return self.snapshot
+
+    def publish_candles(self):
+        """
+        Writes the series readers of the shared candle cache (the Telegram bot) ask for, so they are answered from
+        memory: the publishUnits intervals (default the bot's fiveMin, thirtyMin and hour) of the publishPairs
+        (default the tracked coin pairs), publishPeriod candles each, every series being fetched again once it
+        is half maxAge old
+        """
+        cache = self.CandleCache
+        if cache is None or not cache.create:
+            return
+        coin_pairs = self.shared_params.get("publishPairs", self.Database.trades["trackedCoinPairs"])
+        units = self.shared_params.get("publishUnits", ["fiveMin", "thirtyMin", "hour"])
+        period = self.shared_params.get("publishPeriod", 100)
+        for coin_pair in coin_pairs:
+            for unit in units:
+                if cache.age(coin_pair, unit) > cache.max_age / 2:
+                    self.get_historical_data(coin_pair, period, unit)
+
+    def reader_cache(self):
+        """
+        The shared candle cache of a reader. The trader may start after the reader, or restart and create new
+        segments, so every reattachInterval seconds (default 10) a missing or outdated cache is attached again
+
+        :return: The cache, None when no trader has created it
+        :rtype: src.shared_candles.SharedCandleCache
+        """
+        if time.time() - self.cache_checked_at >= self.shared_params.get("reattachInterval", 10):
+            from src.shared_candles import reattach
+            self.cache_checked_at = time.time()
+            self.CandleCache = reattach(self.CandleCache, self.shared_params)
+        return self.CandleCache
+
+    def update_trade_gauges(self):
+        """
+        Publish the number of tracked, paused and open trades to the metrics registry
+        """
+        metrics.tracked_coin_pairs.set(len(self.Database.app_data["coinPairs"]))
+        metrics.paused_coin_pairs.set(len(self.Database.app_data["pausedTrackedCoinPairs"]))
+        metrics.open_trades.set(len(self.Database.trades["trackedCoinPairs"]))
 
     def buy_strategy(self, coin_pair):
         """
@@ -60,28 +175,34 @@ class Trader(object):
 
         :param coin_pair: Coin pair market to check (ex: BTC-ETH, BTC-FCT)
         :type coin_pair: str
+
+        :return: True when the buy conditions have been met, the buy being queued for place_buys
+        :rtype: bool
         """
-        if (len(self.Database.trades["trackedCoinPairs"]) >= self.trade_params["buy"]["maxOpenTrades"] or
+        open_trades = len(self.Database.trades["trackedCoinPairs"]) + len(self.buy_candidates)
+        if (open_trades >= self.trade_params["buy"]["maxOpenTrades"] or
                 coin_pair in self.Database.trades["trackedCoinPairs"]):
-            return
-        rsi = self.calculate_rsi(coin_pair=coin_pair, period=14, unit=self.trade_params["tickerInterval"])
-        day_volume = self.get_current_24hr_volume(coin_pair)
-        current_buy_price = self.get_current_price(coin_pair, "ask")
-
-        if rsi is None:
-            return
-
-        if self.check_buy_parameters(rsi, day_volume, current_buy_price):
+            return False
+        with span("strategy", side="buy", coin_pair=coin_pair):
+            rsi = self.calculate_rsi(coin_pair=coin_pair, period=14, unit=self.trade_params["tickerInterval"])
+            day_volume = self.get_current_24hr_volume(coin_pair)
+            current_buy_price = self.get_current_price(coin_pair, "ask")
+            if rsi is None:
+                return False
+            should_buy = self.check_buy_parameters(rsi, day_volume, current_buy_price)
+
+        if should_buy:
             buy_stats = {
                 "rsi": rsi,
                 "24HrVolume": day_volume
             }
-            self.buy(coin_pair, self.trade_params["buy"]["btcAmount"], current_buy_price, buy_stats)
+            self.buy_candidates.append((coin_pair, current_buy_price, buy_stats))
         elif "buy" in self.pause_params and rsi >= self.pause_params["buy"]["rsiThreshold"] > 0:
             self.Messenger.print_pause(coin_pair, [rsi, day_volume], self.pause_params["buy"]["pauseTime"], "buy")
             self.Database.pause_buy(coin_pair)
         else:
             self.Messenger.print_no_buy(coin_pair, rsi, day_volume, current_buy_price)
+        return bool(should_buy)
 
     def sell_strategy(self, coin_pair):
         """
@@ -93,14 +214,15 @@ class Trader(object):
         if (coin_pair in self.Database.app_data["pausedTrackedCoinPairs"] or
                 coin_pair not in self.Database.trades["trackedCoinPairs"]):
             return
-        rsi = self.calculate_rsi(coin_pair=coin_pair, period=14, unit=self.trade_params["tickerInterval"])
-        current_sell_price = self.get_current_price(coin_pair, "bid")
-        profit_margin = self.Database.get_profit_margin(coin_pair, current_sell_price)
-
-        if rsi is None:
-            return
-
-        if self.check_sell_parameters(rsi, profit_margin):
+        with span("strategy", side="sell", coin_pair=coin_pair):
+            rsi = self.calculate_rsi(coin_pair=coin_pair, period=14, unit=self.trade_params["tickerInterval"])
+            current_sell_price = self.get_current_price(coin_pair, "bid")
+            profit_margin = self.Database.get_profit_margin(coin_pair, current_sell_price)
+            if rsi is None:
+                return
+            should_sell = self.check_sell_parameters(rsi, profit_margin)
+
+        if should_sell:
             sell_stats = {
                 "rsi": rsi,
                 "profitMargin": profit_margin
@@ -112,6 +234,106 @@ class Trader(object):
         else:
             self.Messenger.print_no_sell(coin_pair, rsi, profit_margin, current_sell_price)
 
+    def committee_strategy(self, coin_pair, features):
+        """
+        Applies the Naive Bayes committee on a new candle of the coin pair. The committee is loaded from the
+        model registry at startup and keeps its state per coin pair.
+        This is an API for callers holding workbook rows: the run loop does not call it, as the workbook
+        indicators and labels (IBOVESPA beta, the decisor labels, ...) are not computed from exchange candles
+
+        :param coin_pair: Market of the candle
+        :type coin_pair: str
+        :param features: The candle's indicators by dataset column name (see src.bayes.features), with its Data
+        :type features: dict
+
+        :return: Action (0-HODL, 1-BUY, 2-SELL) and share of the money or position to trade
+        :rtype: int, float
+        """
+        if coin_pair not in self.committees:
+            from src.committee import Committee
+            self.committees[coin_pair] = Committee(
+                self.committee_record,
+                stop_loss=self.committee_params.get("stopLoss", 0),
+                sell_by_stoploss=self.committee_params.get("sellByStopLoss", 0.9),
+                wait_time=self.committee_params.get("waitTime", 3)
+            )
+        with span("strategy", side="committee", coin_pair=coin_pair):
+            action, perc = self.committees[coin_pair].step(features)
+        if action != 0:
+            logger.info("Committee decision for {}: {} {:.2%}".format(coin_pair, "buy" if action == 1 else "sell", perc))
+        return action, perc
+
+    def position_sizes(self, coin_pairs):
+        """
+        BTC to spend on each coin pair of a cycle's buy signals according to the risk engine, the pairs being sized
+        together (so the caps split between them) given the trades already open
+
+        :param coin_pairs: Coin pair markets to size (ex: BTC-ETH, BTC-FCT)
+        :type coin_pairs: list
+
+        :return: BTC amounts in the order of coin_pairs, 0 where the caps leave no room
+        :rtype: np.ndarray
+        """
+        window = self.RiskEngine.window
+        volatility = np.array([
+            rolling_volatility(closing_prices[-(window + 1):], window)[-1]
+            for closing_prices in (self.get_closing_prices(coin_pair, window + 1, self.trade_params["tickerInterval"])[0]
+                                   for coin_pair in coin_pairs)
+        ])
+
+        # Trades between their initial buy and its fill have no price yet, they hold no exposure so far
+        open_trades = [self.Database.get_open_trade(pair) for pair in self.Database.trades["trackedCoinPairs"]]
+        held = np.array([trade["buy"]["price"] for trade in open_trades
+                         if trade is not None and "price" in trade.get("buy", {})])
+        exposure = np.append(held, np.zeros(len(coin_pairs))) / self.RiskEngine.capital
+        signals = np.append(np.zeros(len(held), dtype=bool), np.ones(len(coin_pairs), dtype=bool))
+        volatility = np.append(np.full(len(held), np.nan), volatility)
+        sizes = self.RiskEngine.allocate(signals, volatility, exposure=exposure)
+        return np.round(sizes[len(held):], 8)
+
+    def check_buy_parameters(self, rsi, day_volume, current_buy_price):
+        """
+        Used to check if the buy conditions have been met.
+        Works element-wise on arrays too, which is how src.backtest evaluates whole histories
+
+        :param rsi: The coin pair's current RSI
+        :type rsi: float
+        :param day_volume: The coin pair's current 24 hour volume
+        :type day_volume: float
+        :param current_buy_price: The coin pair's current price
+        :type current_buy_price: float
+
+        :return: Boolean indicating if the buy conditions have been met
+        :rtype: bool
+        """
+        rsi_check = np.less_equal(rsi, self.trade_params["buy"]["rsiThreshold"])
+        day_volume_check = np.greater_equal(day_volume, self.trade_params["buy"]["24HourVolumeThreshold"])
+        current_buy_price_check = np.greater_equal(current_buy_price, self.trade_params["buy"]["minimumUnitPrice"])
+
+        return rsi_check & day_volume_check & current_buy_price_check
+
+    def check_sell_parameters(self, rsi, profit_margin):
+        """
+        Used to check if the sell conditions have been met.
+        Works element-wise on arrays too, which is how src.backtest evaluates whole histories
+
+        :param rsi: The coin pair's current RSI
+        :type rsi: float
+        :param profit_margin: The coin pair's current profit margin
+        :type profit_margin: float
+
+        :return: Boolean indicating if the sell conditions have been met
+        :rtype: bool
+        """
+        rsi_check = np.greater_equal(rsi, self.trade_params["sell"]["rsiThreshold"])
+        lower_profit_check = np.greater_equal(profit_margin, self.trade_params["sell"]["minProfitMarginThreshold"])
+        upper_profit_check = np.greater_equal(profit_margin, self.trade_params["sell"]["profitMarginThreshold"])
+        loss_check = np.zeros_like(upper_profit_check)
+        if 0 > self.trade_params["sell"].get("lossMarginThreshold", 0):
+            loss_check = np.less_equal(profit_margin, self.trade_params["sell"]["lossMarginThreshold"])
+
+        return (rsi_check & lower_profit_check) | upper_profit_check | loss_check
+
     def buy(self, coin_pair, btc_quantity, price, stats, trade_time_limit=2):
         """
         Used to place a buy order to Bittrex. Wait until the order is completed.
@@ -128,15 +350,23 @@ class Trader(object):
         :param trade_time_limit: The time in minutes to wait fot the order before cancelling it
         :type trade_time_limit: float
         """
+        # Priced at the ask level that fills the whole quantity at once, when the book is available
+        fill_price = self.OrderBooks.fill_price(coin_pair, "buy", btc_quantity / price, price)
+        if fill_price is None:
+            logger.warning("Skipping the {} buy: filling it would slip more than {:.2%} past {}".format(
+                coin_pair, self.OrderBooks.max_slippage, price))
+            return
+        price = fill_price
         buy_quantity = round(btc_quantity / price, 8)
-        buy_data = self.operator.buy_limit(coin_pair, buy_quantity, price)
+        with span("order", side="buy", coin_pair=coin_pair):
+            buy_data = self.operator.buy_limit(coin_pair, buy_quantity, price)
         if not buy_data["success"]:
             error_str = self.Messenger.print_error("buy", [coin_pair, buy_data["message"]])
             logger.error(error_str)
             return
         self.Database.store_initial_buy(coin_pair, buy_data["result"]["uuid"])
 
-        buy_order_data = self.get_order(buy_data["result"]["uuid"], trade_time_limit * 60)
+        buy_order_data = self.get_order(coin_pair, buy_data["result"]["uuid"], trade_time_limit * 60)
         self.Database.store_buy(buy_order_data["result"], stats)
 
         self.Messenger.print_buy(coin_pair, price, stats["rsi"], stats["24HrVolume"])
@@ -159,13 +389,20 @@ class Trader(object):
         :type trade_time_limit: float
         """
         trade = self.Database.get_open_trade(coin_pair)
-        sell_data = self.operator.sell_limit(coin_pair, trade["quantity"], price)
+        fill_price = self.OrderBooks.fill_price(coin_pair, "sell", trade["quantity"], price)
+        if fill_price is None:
+            logger.warning("Skipping the {} sell: filling it would slip more than {:.2%} below {}".format(
+                coin_pair, self.OrderBooks.max_slippage, price))
+            return
+        price = fill_price
+        with span("order", side="sell", coin_pair=coin_pair):
+            sell_data = self.operator.sell_limit(coin_pair, trade["quantity"], price)
         if not sell_data["success"]:
             error_str = self.Messenger.print_error("sell", [coin_pair, sell_data["message"]])
             logger.error(error_str)
             return
 
-        sell_order_data = self.get_order(sell_data["result"]["Exchange"], sell_data["result"]["uuid"], trade_time_limit * 60)
+        sell_order_data = self.get_order(coin_pair, sell_data["result"]["uuid"], trade_time_limit * 60)
         # TODO: Handle partial/incomplete sales.
         self.Database.store_sell(sell_order_data["result"], stats)
 
@@ -174,6 +411,23 @@ class Trader(object):
         self.Messenger.send_sell_gmail(sell_order_data["result"], stats)
         self.Messenger.play_sw_theme()
 
+    def get_market_summary(self, coin_pair):
+        """
+        The coin pair's summary from the cycle's snapshot (for readers of the shared candle cache, the trader's
+        snapshot), requested on its own when it is not in one. A snapshot older than snapshotParameters.maxAge
+        seconds (orders waiting for their fill can hold a cycle for minutes) is taken again first
+        """
+        if self.candle_reader:
+            cache = self.reader_cache()
+            self.snapshot = cache.read_snapshot() if cache is not None and cache.snapshot_age() <= cache.max_age \
+                else None
+        elif self.snapshot is not None and self.snapshot.age() > self.snapshot_max_age:
+            self.refresh_snapshot()
+        if self.snapshot is not None and coin_pair in self.snapshot:
+            return self.snapshot.summary(coin_pair)
+        with span("fetch", endpoint="market_summary", coin_pair=coin_pair):
+            return self.operator.get_market_summary(coin_pair)
+
     def get_current(self, coin_pair, item):
         """
         Get current item for a coin pair. ex of response:
@@ -187,12 +441,25 @@ class Trader(object):
         'OpenBuyOrders': 7273, 'OpenSellOrders': 1447, 
         'PrevDay': 57359.66, 'Created': '2018-05-31T13:24:40.77'}]
         """
-        coin_summary = self.operator.get_market_summary(coin_pair)
+        coin_summary = self.get_market_summary(coin_pair)
         if not coin_summary["success"]:
             error_str = self.Messenger.print_error("coinMarket", [coin_pair])
             logger.error(error_str)
             return None
         return coin_summary["result"][0][item]
+
+    def get_current_24hr_volume(self, coin_pair):
+        """
+        Gets current 24 hour market volume for a coin pair
+
+        :param coin_pair: Coin pair market to check (ex: BTC-ETH, BTC-FCT)
+        :type coin_pair: str
+
+        :return: Coin pair's current 24 hour market volume
+        :rtype: float
+        """
+        return self.get_current(coin_pair, "BaseVolume")
+
     def get_current_price(self, coin_pair, price_type):
         """
         Gets current market price for a coin pair
@@ -204,7 +471,7 @@ class Trader(object):
         :return: Coin pair's current market price
         :rtype: float
         """
-        coin_summary = self.operator.get_market_summary(coin_pair)
+        coin_summary = self.get_market_summary(coin_pair)
         if not coin_summary["success"]:
             error_str = self.Messenger.print_error("coinMarket", [coin_pair])
             logger.error(error_str)
@@ -217,6 +484,28 @@ class Trader(object):
             return coin_summary["result"][0]["Bid"]
         return coin_summary["result"][0]["Last"]
     
+    def get_historical_data(self, coin_pair, period=None, unit=None):
+        """
+        Candles of a coin pair. Readers of the shared candle cache are served from it when the trader wrote
+        the series recently enough, the trader writes every candle fetch to it
+
+        :return: Adapter records (T, O, H, L, C, V), oldest first
+        :rtype: list
+        """
+        cache = self.reader_cache() if self.candle_reader else self.CandleCache
+        if self.candle_reader:
+            if cache is not None and cache.age(coin_pair, unit) <= cache.max_age:
+                historical_data = cache.get_historical_data(coin_pair, period, unit)
+                if historical_data is not None and (period is None or len(historical_data) >= period):
+                    metrics.cache.hit("candles")
+                    return historical_data
+            metrics.cache.miss("candles")
+        with span("fetch", endpoint="historical_data", coin_pair=coin_pair):
+            historical_data = self.operator.get_historical_data(coin_pair, period, unit)
+        if cache is not None and cache.create:
+            cache.write(coin_pair, unit, historical_data)
+        return historical_data
+
     def get_historical_prices(self, coin_pair, period = None, unit = None):
         """
         Returns closing prices within a specified time frame for a coin pair
@@ -236,7 +525,7 @@ class Trader(object):
         warnings.filterwarnings("ignore")
         if (period != None):
             period*=2
-        df = self.operator.get_historical_data(coin_pair, period, unit)
+        df = self.get_historical_data(coin_pair, period, unit)
         df = pd.DataFrame(df).rename(columns={
             'O':"Open", 
             "BV":"Base Volume",
@@ -255,18 +544,26 @@ class Trader(object):
         df.loc[:,'Volume'] = df[["Volume"]].astype(float)
         period_short = "EMA9"
         period_long = "EMA26"
-        df = self.get_EMA(df, period_short, period_long)
+        with span("indicators", stage="ema", coin_pair=coin_pair):
+            df = self.get_EMA(df, period_short, period_long)
         if (period != None):
             df = df[-int(period):]
         df = df.reset_index(drop=True)
         df = df.sort_values(['Datetime'])
-        df = self.get_willians_percent(self.max_14(self.min_14(df)))
-        suportes, df = self.get_supports(df)
-        resistencias, df = self.get_resistences(df)
-        hammers, df = self.get_hammers(df)
+        with span("indicators", stage="willians", coin_pair=coin_pair):
+            df = self.get_willians_percent(self.max_14(self.min_14(df)))
+        with span("indicators", stage="supports", coin_pair=coin_pair):
+            suportes, df = self.get_supports(df)
+        with span("indicators", stage="resistences", coin_pair=coin_pair):
+            resistencias, df = self.get_resistences(df)
+        with span("indicators", stage="hammers", coin_pair=coin_pair):
+            hammers, df = self.get_hammers(df)
         df = df.sort_values(['Datetime'], ascending=True)
-        df = self.get_tendencia_alta_baixa_divergencia(df)
-        return df, self.get_signals(df), hammers, suportes, resistencias
+        with span("indicators", stage="divergencia", coin_pair=coin_pair):
+            df = self.get_tendencia_alta_baixa_divergencia(df)
+        with span("indicators", stage="signals", coin_pair=coin_pair):
+            signals = self.get_signals(df)
+        return df, signals, hammers, suportes, resistencias
     def get_tendencia_alta_baixa_divergencia(self, df):
         df = df.sort_values(['Datetime'])
         df[['divergencia_alta']] = 0
@@ -289,7 +586,7 @@ class Trader(object):
         df['MIN_14'] = df['Low'].rolling(14).min()
         return df
     def get_willians_percent(self, df):
-        df[['Willians_percent']] = ((df['MAX_14'] - df['Close'])/(df['MAX_14']-df['MIN_14']))*-100
+        df['Willians_percent'] = ((df['MAX_14'] - df['Close'])/(df['MAX_14']-df['MIN_14']))*-100
         return df
     def get_hammers(self, df):
         hammers = []
@@ -422,7 +719,7 @@ class Trader(object):
         :return: Array of closing prices and dates
         :rtype: list, list
         """
-        historical_data = self.operator.get_historical_data(coin_pair, period, unit)
+        historical_data = self.get_historical_data(coin_pair, period, unit)
         #print(historical_data)
         closing_prices = []
         for i in historical_data:
@@ -438,6 +735,8 @@ class Trader(object):
         First wait until the order is completed before retrieving it.
         If the order is not completed within trade_time_limit seconds, cancel it.
 
+        :param coin_pair: String literal for the market (ex: BTC-LTC)
+        :type coin_pair: str
         :param order_uuid: The order's UUID
         :type order_uuid: str
         :param trade_time_limit: The time in seconds to wait fot the order before cancelling it
@@ -447,13 +746,11 @@ class Trader(object):
         :rtype: dict
         """
         start_time = time.time()
-        if (self.operator._get_type()=="Binance"):
-            order_data = self.operator.get_order(coin_pair, order_uuid)
-        else:
-            order_data = self.operator.get_order(order_uuid)
-        while time.time() - start_time <= trade_time_limit and order_data["result"]["IsOpen"]:
-            time.sleep(10)
-            order_data = self.operator.get_order(order_uuid)
+        with span("order", endpoint="get_order", coin_pair=coin_pair):
+            order_data = self._fetch_order(coin_pair, order_uuid)
+            while time.time() - start_time <= trade_time_limit and order_data["result"]["IsOpen"]:
+                time.sleep(10)
+                order_data = self._fetch_order(coin_pair, order_uuid)
 
         if order_data["result"]["IsOpen"]:
             error_str = self.Messenger.print_error(
@@ -465,6 +762,11 @@ class Trader(object):
 
         return order_data
 
+    def _fetch_order(self, coin_pair, order_uuid):
+        if operators.ORDER_BY_PAIR in self.capabilities:
+            return self.operator.get_order(coin_pair, order_uuid)
+        return self.operator.get_order(order_uuid)
+
     def calculate_rsi(self, coin_pair, period, unit):
         """
         Calculates the Relative Strength Index for a coin_pair
@@ -482,6 +784,19 @@ class Trader(object):
         :rtype: float
         """
         closing_prices = self.get_closing_prices(coin_pair, period * 3, unit)[0]
+        with span("indicators", stage="rsi", coin_pair=coin_pair):
+            return self._rsi(closing_prices)
+
+    def _rsi(self, closing_prices):
+        """
+        Wilder's RSI over the given closing prices, seeded with the first 14 price changes
+
+        :param closing_prices: Closing prices, oldest first
+        :type closing_prices: list
+
+        :return: RSI
+        :rtype: float
+        """
         count = 0
         change = []
         # Calculating price changes
@@ -0,0 +1,139 @@
+"""
+   Backtests a universe of tickers (B3 stocks, crypto pairs) from the candle store. Tickers are streamed through
+   worker processes, each one loading its own candles, computing its features and running the backtest, so only
+   the per-ticker results come back and memory does not grow with the size of the universe.
+
+   python -m src.universe [--strategy rsi|committee] [--jobs N] [TICKER ...]
+"""
+import numpy as np
+import pandas as pd
+
+from src import candle_store
+from src.pool import imap_bounded
+
+# IBOVESPA theoretical portfolio as of 2022, as named on Yahoo Finance (MarketData); update on rebalances
+ibovespa = [
+    'ABEV3.SA', 'ALPA4.SA', 'AMER3.SA', 'ASAI3.SA', 'AZUL4.SA', 'B3SA3.SA', 'BBAS3.SA', 'BBDC3.SA', 'BBDC4.SA',
+    'BBSE3.SA', 'BEEF3.SA', 'BPAC11.SA', 'BRAP4.SA', 'BRFS3.SA', 'BRKM5.SA', 'CCRO3.SA', 'CIEL3.SA', 'CMIG4.SA',
+    'CMIN3.SA', 'COGN3.SA', 'CPFE3.SA', 'CPLE6.SA', 'CRFB3.SA', 'CSAN3.SA', 'CSNA3.SA', 'CYRE3.SA', 'DXCO3.SA',
+    'ELET3.SA', 'ELET6.SA', 'EMBR3.SA', 'ENEV3.SA', 'ENGI11.SA', 'EQTL3.SA', 'EZTC3.SA', 'FLRY3.SA', 'GGBR4.SA',
+    'GOAU4.SA', 'GOLL4.SA', 'HAPV3.SA', 'HYPE3.SA', 'ITSA4.SA', 'ITUB4.SA', 'JBSS3.SA', 'KLBN11.SA', 'LREN3.SA',
+    'MGLU3.SA', 'MRFG3.SA', 'MRVE3.SA', 'MULT3.SA', 'NTCO3.SA', 'PETR3.SA', 'PETR4.SA', 'PETZ3.SA', 'PRIO3.SA',
+    'RADL3.SA', 'RAIL3.SA', 'RDOR3.SA', 'RENT3.SA', 'SANB11.SA', 'SBSP3.SA', 'SLCE3.SA', 'SUZB3.SA', 'TAEE11.SA',
+    'TIMS3.SA', 'TOTS3.SA', 'UGPA3.SA', 'USIM5.SA', 'VALE3.SA', 'VBBR3.SA', 'VIVT3.SA', 'WEGE3.SA', 'YDUQ3.SA'
+]
+
+
+def _rsi_backtest(candles, settings, options):
+    from src.backtest import Backtest
+
+    result = Backtest(settings, **options).run(candles)
+    equity = result.equity / result.initial_balance
+    return result.summary(), equity
+
+
+def _committee_backtest(candles, settings, options):
+    """
+    Committee decisions over a ticker whose candles carry the committee's feature columns (see src.bayes.features)
+    """
+    from src import bayes
+    from src.committee import Committee
+    from src.model_registry import ModelRegistry
+
+    record = ModelRegistry(options.get("registry_directory", "./database/models")).load(options.get("name", "petr4"))
+    committee = Committee(record, options.get("stop_loss", 0), options.get("sell_by_stoploss", 0.9),
+                          options.get("wait_time", 3))
+    df = candles.rename(columns={"T": "Data"}) if "Data" not in candles else candles
+    decisions = committee.decide(df)
+    summary = {"trades": len(decisions), "initial_balance": 1.0, "final_balance": 1.0, "roi": 0.0}
+    if len(decisions) == 0:
+        return summary, pd.Series(1.0, index=pd.to_datetime(df["Data"]).sort_values().values, name="equity")
+    results = bayes._apply_decisions_withperc(decisions, 1.0)
+    # Marking the position to each decision's close gives the equity curve at decision dates
+    equity = results.final_maney + results.quant_hold * results.value_fechamento
+    summary.update(final_balance=float(equity.iloc[-1]), roi=float(equity.iloc[-1] - 1.0))
+    return summary, pd.Series(equity.values, index=pd.to_datetime(results.Data).values, name="equity")
+
+
+strategies = {
+    "rsi": _rsi_backtest,
+    "committee": _committee_backtest
+}
+
+
+def run_ticker(job):
+    """
+    Loads one ticker's candles and backtests it, returning only its summary and daily equity. A ticker that fails
+    (missing candles, a strategy error on its data) comes back as an error entry, so it does not abort the universe
+    """
+    ticker, candles_directory, strategy, settings, options = job
+    try:
+        candles = candle_store.read_candles(ticker, candles_directory)
+        summary, equity = strategies[strategy](candles, settings, options)
+        daily = equity.groupby(equity.index.normalize()).last()
+    except Exception as exception:
+        return {"ticker": ticker, "error": "%s: %s" % (type(exception).__name__, exception)}, None
+    return dict(summary, ticker=ticker, candles=len(candles)), daily
+
+
+def run_universe(tickers=None, settings=None, strategy="rsi", options=None,
+                 candles_directory=candle_store.candles_directory_string, n_jobs=None):
+    """
+    Backtests every ticker and aggregates an equal weight portfolio
+
+    :param tickers: Tickers to run, defaults to every ticker in the candle store
+    :type tickers: iterable
+    :param settings: The settings.json content, used by the rsi strategy
+    :type settings: dict
+    :param strategy: 'rsi' for src.backtest.Backtest, 'committee' for the Naive Bayes committee
+    :type strategy: str
+    :param options: Keyword options of the strategy (ex: spread for rsi, name for committee)
+    :type options: dict
+    :param n_jobs: Worker processes
+    :type n_jobs: int
+
+    :return: Per ticker summaries, portfolio daily equity (starting at 1.0) and portfolio summary
+    :rtype: pd.DataFrame, pd.Series, dict
+    """
+    tickers = tickers if tickers is not None else candle_store.list_tickers(candles_directory)
+    jobs = ((ticker, candles_directory, strategy, settings, options or {}) for ticker in tickers)
+
+    summaries = []
+    equities = []
+    for summary, daily in imap_bounded(run_ticker, jobs, n_jobs):
+        summaries.append(summary)
+        if daily is not None and len(daily):
+            equities.append(daily.rename(summary["ticker"]))
+
+    summaries = pd.DataFrame(summaries)
+    if not equities:
+        return summaries, pd.Series(dtype=np.float64, name="equity"), {"tickers": len(summaries), "roi": 0.0}
+    # Each ticker gets the same capital, held in cash (1.0) before its first candle and after its last
+    curves = pd.concat(equities, axis=1).sort_index().ffill().fillna(1.0)
+    equity = curves.mean(axis=1).rename("equity")
+    portfolio = {
+        "tickers": len(summaries),
+        "traded": len(equities),
+        "roi": float(equity.iloc[-1] - 1.0),
+        "max_drawdown": float((equity / equity.cummax() - 1.0).min()),
+        "best": summaries.loc[summaries["roi"].idxmax(), "ticker"] if "roi" in summaries else None,
+        "worst": summaries.loc[summaries["roi"].idxmin(), "ticker"] if "roi" in summaries else None
+    }
+    return summaries, equity, portfolio
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from utils.utils import get_settings
+
+    parser = argparse.ArgumentParser(description="Backtest a universe of tickers from the candle store")
+    parser.add_argument("tickers", nargs="*", help="Tickers to run, defaults to the whole candle store")
+    parser.add_argument("--ibovespa", action="store_true", help="Run the IBOVESPA constituents")
+    parser.add_argument("--strategy", default="rsi", choices=list(strategies))
+    parser.add_argument("--jobs", type=int, default=None)
+    args = parser.parse_args()
+    summaries, equity, portfolio = run_universe(ibovespa if args.ibovespa else (args.tickers or None),
+                                                get_settings(), args.strategy, n_jobs=args.jobs)
+    print(summaries.to_string())
+    print(portfolio)
@@ -0,0 +1,189 @@
+"""
+   Walk-forward retraining of the GaussianNB classifiers. The train window advances by a fixed step, either
+   growing from the first date or sliding with a fixed length, and each fold is tested on the step that follows.
+   Per-class sums are updated with the rows entering and leaving the window, and the MinMaxScaler of the window
+   is applied to those sums analytically, so no fold refits a scaler or a model from scratch.
+"""
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from src import bayes
+from src.model_registry import GaussianPredictor, ScaledPredictor
+
+
+class GaussianStats(object):
+    """
+    Per-class count, sum and sum of squares of unscaled features, with rows added and removed incrementally.
+    Sums are taken around a fixed shift to keep the variance free of cancellation
+    """
+
+    def __init__(self, classes, shift):
+        """
+        :param classes: Every class the labels can take
+        :type classes: np.ndarray
+        :param shift: Value subtracted from each feature before summing, typically the first row
+        :type shift: np.ndarray
+        """
+        self.classes = np.asarray(classes)
+        self.shift = np.asarray(shift, dtype=np.float64)
+        self.count = np.zeros(len(self.classes))
+        self.sum = np.zeros((len(self.classes), len(self.shift)))
+        self.square_sum = np.zeros((len(self.classes), len(self.shift)))
+
+    def _update(self, X, y, sign):
+        X = np.asarray(X, dtype=np.float64) - self.shift
+        for k, label in enumerate(self.classes):
+            rows = X[y == label]
+            self.count[k] += sign * len(rows)
+            self.sum[k] += sign * rows.sum(axis=0)
+            self.square_sum[k] += sign * (rows ** 2).sum(axis=0)
+
+    def add(self, X, y):
+        self._update(X, y, 1)
+
+    def remove(self, X, y):
+        self._update(X, y, -1)
+
+    def copy(self):
+        stats = GaussianStats(self.classes, self.shift)
+        stats.count = self.count.copy()
+        stats.sum = self.sum.copy()
+        stats.square_sum = self.square_sum.copy()
+        return stats
+
+    def predictor(self, data_min, data_max, features, var_smoothing=1e-9):
+        """
+        The GaussianNB that fitting on the window scaled by MinMaxScaler(data_min, data_max) would give
+
+        :rtype: src.model_registry.ScaledPredictor
+        """
+        data_range = data_max - data_min
+        data_range[data_range < 10 * np.finfo(data_range.dtype).eps] = 1.0
+        scale = 1.0 / data_range
+        offset = -data_min * scale
+
+        seen = self.count > 0
+        count = self.count[seen][:, None]
+        mean = self.sum[seen] / count
+        var = np.maximum(self.square_sum[seen] / count - mean ** 2, 0.0)
+        total = count.sum()
+        total_mean = self.sum[seen].sum(axis=0) / total
+        total_var = np.maximum(self.square_sum[seen].sum(axis=0) / total - total_mean ** 2, 0.0)
+
+        # Moving the statistics to the scaled space: x' = x·s + o
+        theta = (mean + self.shift - data_min) * scale
+        var = var * scale ** 2
+        var += var_smoothing * np.max(total_var * scale ** 2)
+        predictor = GaussianPredictor(self.classes[seen], self.count[seen] / total, theta, var)
+        return ScaledPredictor(features, scale, offset, predictor)
+
+
+def fold_dates(dates, first_cutoff, step):
+    """
+    Cutoff dates of each fold: from first_cutoff until the last date, every step
+
+    :rtype: list
+    """
+    cutoffs = []
+    cutoff = pd.Timestamp(first_cutoff)
+    while cutoff <= dates[-1]:
+        cutoffs.append(cutoff)
+        cutoff += pd.Timedelta(step)
+    return cutoffs
+
+
+def _position(dates, date):
+    return int(np.searchsorted(dates, pd.Timestamp(date).to_datetime64()))
+
+
+def all_in_roi(decisions, closes):
+    """
+    Return of buying everything on each BUY and selling everything on each SELL, closing the position at the end,
+    as _apply_decisions does with the model decisions
+    """
+    money = 1.0
+    quantity = 0.0
+    for decision, close in zip(decisions, closes):
+        if decision == 1 and quantity == 0:
+            quantity = money / close
+            money = 0.0
+        elif decision == 2 and quantity > 0:
+            money = quantity * close
+            quantity = 0.0
+    if quantity > 0:
+        money = quantity * closes[-1]
+    return money - 1.0
+
+
+def evaluate_fold(job):
+    """
+    Accuracy and ROI of one fold's model on its test rows
+    """
+    stats, data_min, data_max, features, X_test, y_test, closes, info = job
+    if len(y_test) == 0 or stats.count.sum() == 0:
+        return dict(info, accuracy=np.nan, roi=np.nan)
+    predicted = stats.predictor(data_min, data_max, features).predict(X_test)
+    return dict(info, accuracy=float(np.mean(predicted == y_test)), roi=all_in_roi(predicted, closes))
+
+
+def walk_forward(df, labels=None, features=None, first_cutoff=None, step="90D", window=None, n_jobs=None):
+    """
+    Trains every label's GaussianNB on each walk-forward window and tests it on the following step, in one pass
+
+    :param df: Dataset returned by bayes.load_dataset
+    :type df: pd.DataFrame
+    :param labels: Encoded labels to model, defaults to the Gaussian classifiers of the committee
+    :type labels: list
+    :param features: Feature columns per label, defaults to bayes.features
+    :type features: dict
+    :param first_cutoff: End of the first train window, defaults to one year after the first date
+    :param step: How much the window advances per fold (ex: '90D')
+    :type step: str
+    :param window: Length of a sliding train window (ex: '730D'), None for a window growing from the first date
+    :type window: str
+    :param n_jobs: Worker processes evaluating the folds, 1 to evaluate in this process
+    :type n_jobs: int
+
+    :return: One row per fold and label with the window dates, row counts, accuracy and ROI
+    :rtype: pd.DataFrame
+    """
+    labels = labels or [label for label in bayes.classifiers if label != 'divergency_decisor']
+    features = features or bayes.features
+    df = df.sort_values('Data', ascending=True).reset_index(drop=True)
+    dates = pd.to_datetime(df['Data']).to_numpy()
+    if first_cutoff is None:
+        first_cutoff = pd.Timestamp(dates[0]) + pd.Timedelta("365D")
+    cutoffs = fold_dates(pd.to_datetime(dates), first_cutoff, step)
+    closes = df['Fechamento'].to_numpy(dtype=np.float64)
+
+    jobs = []
+    for label in labels:
+        X = df[features[label]].to_numpy(dtype=np.float64)
+        y = df[label].to_numpy()
+        stats = GaussianStats(np.arange(3), X[0])
+        start = end = 0
+        for fold, cutoff in enumerate(cutoffs):
+            new_start = 0 if window is None else _position(dates, cutoff - pd.Timedelta(window))
+            new_end = _position(dates, cutoff)
+            test_end = _position(dates, cutoff + pd.Timedelta(step))
+            stats.add(X[end:new_end], y[end:new_end])
+            stats.remove(X[start:new_start], y[start:new_start])
+            start, end = new_start, new_end
+            info = {
+                'fold': fold, 'label': label, 'train_start': pd.Timestamp(dates[start]) if end > start else pd.NaT,
+                'train_end': cutoff, 'test_end': cutoff + pd.Timedelta(step),
+                'train_rows': end - start, 'test_rows': test_end - end
+            }
+            data_min = X[start:end].min(axis=0) if end > start else np.zeros(X.shape[1])
+            data_max = X[start:end].max(axis=0) if end > start else np.ones(X.shape[1])
+            jobs.append((stats.copy(), data_min, data_max, features[label], X[end:test_end], y[end:test_end],
+                         closes[end:test_end], info))
+
+    if n_jobs == 1:
+        results = [evaluate_fold(job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+            results = list(executor.map(evaluate_fold, jobs))
+    return pd.DataFrame(results)
@@ -0,0 +1,23 @@
+"""
+   Shared fixtures. The Database singleton is swapped for in-memory trades and app data so that tests never
+   read or write ./database
+"""
+import pytest
+
+from src.database import Database
+
+
+@pytest.fixture
+def database(monkeypatch):
+    """
+    The Database singleton tracking BTC-LTC with no trade, its saves discarded
+    """
+    db = Database()
+    monkeypatch.setattr(db, "trades", {"trackedCoinPairs": [], "trades": []})
+    monkeypatch.setattr(db, "app_data", {
+        "coinPairs": ["BTC-LTC"], "pausedTrackedCoinPairs": [],
+        "pauseTime": {"buy": None, "sell": None, "balance": None},
+        "previousBalance": None
+    })
+    monkeypatch.setattr(db, "save", lambda file_string, content: None)
+    return db
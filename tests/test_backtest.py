@@ -0,0 +1,117 @@
+import copy
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.fixtures import ReplayOperator, settings, synthetic_candles
+from src.backtest import Backtest
+
+# Closes the live strategy fetches for its RSI, rolling_rsi is NaN before that many candles
+RSI_WINDOW = 42
+SPREAD = 0.002
+
+
+def _settings(buy_rsi=30, sell_rsi=70, loss=-5, min_profit=0.5, profit=5):
+    trade_settings = copy.deepcopy(settings)
+    trade_settings["tradeParameters"]["buy"]["rsiThreshold"] = buy_rsi
+    trade_settings["tradeParameters"]["sell"].update(rsiThreshold=sell_rsi, lossMarginThreshold=loss,
+                                                     minProfitMarginThreshold=min_profit,
+                                                     profitMarginThreshold=profit)
+    return trade_settings
+
+
+# Sells and buys on the same candle every few candles, and a regular RSI strategy
+scenarios = {
+    "churn": _settings(buy_rsi=100, loss=-0.1, min_profit=0.1, profit=0.1),
+    "rsi": _settings(buy_rsi=45, sell_rsi=55, loss=-0.5, min_profit=0.1, profit=0.5)
+}
+
+
+class SteppingOperator(ReplayOperator):
+    """
+    Exchange as seen on candle `now`: the candles up to it, its close as the summary with the bid and ask
+    Backtest models and the 24 hour volume, and limit orders filled at once at their rate
+    """
+    capabilities = frozenset(["historical_data", "market_summary", "limit_buy", "limit_sell"])
+
+    def __init__(self, candles, spread=SPREAD):
+        super().__init__(candles)
+        self.spread = spread
+        self.now = 0
+        self.orders = {}
+        self.fills = []
+        times = pd.to_datetime([candle["T"] for candle in candles])
+        self.day_volume = pd.Series([candle["BV"] for candle in candles], index=times).rolling("24h").sum().values
+
+    def get_historical_data(self, coin_pair, period=None, unit=None):
+        return super().get_historical_data(coin_pair, period, unit) if period is None else \
+            self.candles[max(self.now + 1 - period, 0):self.now + 1]
+
+    def get_market_summary(self, coin_pair):
+        close = self.candles[self.now]["C"]
+        return {"success": True, "message": "", "result": [{
+            "MarketName": coin_pair, "Last": close, "BaseVolume": self.day_volume[self.now],
+            "Bid": close * (1 - self.spread / 2), "Ask": close * (1 + self.spread / 2)
+        }]}
+
+    def _order(self, side, market, quantity, rate):
+        uuid = str(len(self.orders))
+        self.orders[uuid] = {
+            "OrderUuid": uuid, "Exchange": market, "Type": "LIMIT_" + side.upper(), "IsOpen": False,
+            "Quantity": quantity, "QuantityRemaining": 0.0, "Price": quantity * rate, "PricePerUnit": rate,
+            "CommissionPaid": 0.0, "Opened": str(self.candles[self.now]["T"]), "Closed": str(self.candles[self.now]["T"])
+        }
+        self.fills.append((side, self.now, quantity, rate))
+        return {"success": True, "message": "", "result": {"uuid": uuid}}
+
+    def buy_limit(self, market, quantity, rate):
+        return self._order("buy", market, quantity, rate)
+
+    def sell_limit(self, market, quantity, rate):
+        return self._order("sell", market, quantity, rate)
+
+    def get_order(self, uuid):
+        return {"success": True, "message": "", "result": self.orders[uuid]}
+
+
+def _live_fills(candles, trade_settings):
+    from main import run_cycle
+    from src.trader import Trader
+
+    operator = SteppingOperator(candles)
+    trader = Trader({}, trade_settings, lambda secrets: operator)
+    for now in range(RSI_WINDOW - 1, len(candles)):
+        operator.now = now
+        run_cycle(trader)
+    return operator.fills
+
+
+def _backtest_fills(candles, trade_settings):
+    result = Backtest(trade_settings, spread=SPREAD).run(pd.DataFrame(candles))
+    fills = []
+    for trade in result.trades_array:
+        fills.append(("buy", trade["buy_index"], trade["quantity"], trade["buy_price"]))
+        if trade["sell_index"] >= 0:
+            fills.append(("sell", trade["sell_index"], trade["quantity"], trade["sell_price"]))
+    return fills
+
+
+@pytest.mark.parametrize("scenario", sorted(scenarios))
+def test_backtest_matches_live_strategy(database, capsys, scenario):
+    candles = synthetic_candles(600, step=timedelta(minutes=5))
+    live = _live_fills(candles, scenarios[scenario])
+    replayed = _backtest_fills(candles, scenarios[scenario])
+    capsys.readouterr()
+    assert len(live) > 10
+    assert [(side, int(index)) for side, index, _, _ in replayed] == [(side, index) for side, index, _, _ in live]
+    np.testing.assert_array_equal([fill[2:] for fill in replayed], [fill[2:] for fill in live])
+
+
+def test_more_trades_than_half_the_candles():
+    result = Backtest(scenarios["churn"]).run(pd.DataFrame(synthetic_candles(500)))
+    trades = result.trades_array
+    assert len(trades) > 500 // 2 + 1
+    assert np.all(trades["buy_index"][1:] >= trades["sell_index"][:-1])
+    assert np.all(trades["sell_index"][:-1] > trades["buy_index"][:-1])
@@ -0,0 +1,189 @@
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from benchmarks.fixtures import ReplayOperator, settings, synthetic_candles
+from utils.bot import Botche, Outbox, TelegramAPI
+
+
+class FakeBotAPI(object):
+    """
+    Local stand-in of the Telegram Bot API: serves the queued updates to getUpdates, records sendMessage calls and
+    answers the first sendMessage of each chat with a flood error
+    """
+
+    def __init__(self, updates):
+        self.updates = list(updates)
+        self.sent = []
+        self.flooded = set()
+        self.lock = threading.Lock()
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                params = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                method = self.path.rsplit("/", 1)[-1]
+                self._reply(api.answer(method, params))
+
+            def _reply(self, content):
+                body = json.dumps(content).encode("utf-8")
+                self.send_response(429 if content.get("error_code") == 429 else 200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = "http://127.0.0.1:{}".format(self.server.server_address[1])
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def answer(self, method, params):
+        with self.lock:
+            if method == "getUpdates":
+                offset = params.get("offset") or 0
+                updates = [update for update in self.updates if update["update_id"] >= offset]
+                if not updates:
+                    time.sleep(0.01)
+                return {"ok": True, "result": updates}
+            if method == "sendMessage":
+                if params["chat_id"] not in self.flooded:
+                    self.flooded.add(params["chat_id"])
+                    return {"ok": False, "error_code": 429, "description": "Too Many Requests: retry after 0",
+                            "parameters": {"retry_after": 0}}
+                self.sent.append((params["chat_id"], params["text"]))
+                return {"ok": True, "result": {"message_id": len(self.sent)}}
+        return {"ok": False, "error_code": 404, "description": "Not Found"}
+
+    def replies(self, chat_id):
+        with self.lock:
+            return [text for chat, text in self.sent if chat == chat_id]
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class MemoryAPI(object):
+    """
+    Bot API double keeping the sent messages in memory
+    """
+
+    def __init__(self):
+        self.sent = []
+
+    async def send_message(self, chat_id, text, reply_markup=None):
+        self.sent.append((chat_id, text))
+
+
+def _updates(chats, option):
+    texts = ("/start", "BTC-LTC", option)
+    return [{"update_id": n * len(texts) + k, "message": {"chat": {"id": chat_id}, "text": text}}
+            for n, chat_id in enumerate(chats) for k, text in enumerate(texts)]
+
+
+@pytest.fixture
+def trader(database):
+    from src.trader import Trader
+    return Trader({}, settings, lambda secrets: ReplayOperator(synthetic_candles(100)))
+
+
+def _run(bot, done, timeout=20):
+    async def main():
+        polling = asyncio.ensure_future(bot.run())
+        try:
+            deadline = time.monotonic() + timeout
+            while not done() and time.monotonic() < deadline:
+                await asyncio.sleep(0.02)
+        finally:
+            polling.cancel()
+            await asyncio.gather(polling, return_exceptions=True)
+        await bot.drain()
+    asyncio.run(main())
+
+
+@pytest.mark.parametrize("option", ["Últimos \n5 min", "Apenas o \nPreço/volume"])
+def test_conversations_against_a_local_bot_api(trader, capsys, option):
+    chats = [101, 102, 103]
+    fake = FakeBotAPI(_updates(chats, option))
+    try:
+        bot = Botche(trader, TelegramAPI("token", fake.url, poll_timeout=1))
+        bot.outbox = Outbox(bot.api, chat_rate=1e6, global_rate=1e6)
+        _run(bot, lambda: all(len(fake.replies(chat_id)) == 3 for chat_id in chats))
+    finally:
+        fake.close()
+    capsys.readouterr()
+    for chat_id in chats:
+        replies = fake.replies(chat_id)
+        # The flooded first message was sent again after the delay Telegram asked for
+        assert len(replies) == 3 and replies[0].startswith("Olá")
+        assert replies[2].endswith("- END -")
+        assert ("MACD: $" in replies[2]) == ("5 min" in option)
+    assert bot.chats == {} and bot.workers == {}
+
+
+def test_analyses_never_share_the_trader(trader, capsys):
+    active = []
+    overlaps = []
+    get_closing_prices = trader.get_closing_prices
+
+    def guarded(*args):
+        active.append(1)
+        overlaps.append(len(active))
+        time.sleep(0.02)
+        try:
+            return get_closing_prices(*args)
+        finally:
+            active.pop()
+    trader.get_closing_prices = guarded
+
+    api = MemoryAPI()
+
+    async def conversations():
+        bot = Botche(trader, api)
+        bot.outbox = Outbox(bot.api, chat_rate=1e6, global_rate=1e6)
+        for chat_id, option in enumerate(["Últimos \n5 min", "Últimos \n30 min", "Última Hora"] * 2):
+            for text in ("/start", "BTC-LTC", option):
+                bot.dispatch({"chat": {"id": chat_id}, "text": text})
+        await bot.drain()
+    asyncio.run(conversations())
+    capsys.readouterr()
+
+    assert len([text for _, text in api.sent if text.endswith("- END -")]) == 6
+    assert overlaps and max(overlaps) == 1
+
+
+def test_restarting_a_conversation_keeps_the_chat_rate(trader):
+    async def conversations():
+        bot = Botche(trader, MemoryAPI())
+        bot.outbox = Outbox(bot.api, chat_rate=10.0, chat_burst=2, global_rate=1e6)
+        start = time.monotonic()
+        for _ in range(3):
+            for text in ("/start", "/cancel"):
+                bot.dispatch({"chat": {"id": 7}, "text": text})
+        await bot.drain()
+        return time.monotonic() - start, bot
+    elapsed, bot = asyncio.run(conversations())
+    assert len(bot.api.sent) == 6
+    # Two sends from the burst, then one every 0.1 s
+    assert elapsed >= 0.35
+
+
+def test_idle_chat_buckets_expire_once_refilled():
+    async def sends():
+        outbox = Outbox(MemoryAPI(), chat_rate=100.0, chat_burst=2, global_rate=1e6, expire_interval=0)
+        await outbox.send(1, "a")
+        await outbox.send(2, "b")
+        outbox.expire()
+        assert set(outbox.chat_buckets) == {1, 2}
+        await asyncio.sleep(0.05)
+        await outbox.send(2, "c")
+        return outbox
+    outbox = asyncio.run(sends())
+    assert set(outbox.chat_buckets) == {2}
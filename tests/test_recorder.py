@@ -0,0 +1,115 @@
+import time
+
+import pandas as pd
+import pytest
+
+from benchmarks.fixtures import petr4, petr4_rows
+from src import bayes
+from src.recorder import Recorder
+
+ROWS = 250
+
+# Fixed weights, as in benchmarks.bench_decisions
+decision_weight = pd.DataFrame({
+    "classifier": bayes.classifiers,
+    "new_weight": [0.25, 0.25, 0.25, 0.25]
+})
+
+final_features = list(bayes.classifiers)
+
+
+class FrameRecorder(object):
+    """
+    The Recorder interface over the DataFrame growth by .loc that the decision loops used before src.recorder
+    """
+
+    def __init__(self, columns, capacity=64):
+        self.df = pd.DataFrame(columns=[name for name, _ in columns])
+
+    @classmethod
+    def from_frame(cls, df, columns, capacity=64):
+        recorder = cls(columns)
+        recorder.df = df.copy()
+        return recorder
+
+    def __len__(self):
+        return len(self.df)
+
+    def __getitem__(self, index):
+        return self.df.iloc[index]
+
+    def set(self, index, **values):
+        for name, value in values.items():
+            self.df.loc[index, name] = value
+
+    def append(self, **values):
+        self.set(len(self.df), **values)
+
+    def to_frame(self):
+        return self.df
+
+
+@pytest.fixture(scope="module")
+def committee():
+    df = petr4()
+    models = {}
+    scalers = {}
+    for label in bayes.classifiers:
+        apply = bayes._apply_complementNB if label == "divergency_decisor" else bayes._apply_gaussianNB
+        models[label], scalers[label] = apply(df, bayes.features[label], label, silent=True)
+    df = bayes._final_encode(df.copy(), final_features, "final_decision")
+    final_model, final_scaler = bayes._apply_multinomialNB(df, final_features, "final_decision", silent=True)
+    return models, scalers, final_model, final_scaler
+
+
+@pytest.fixture(scope="module")
+def rows():
+    return bayes._final_encode(petr4_rows(ROWS), final_features, "final_decision")
+
+
+def assert_same_as_frame_growth(monkeypatch, target):
+    recorded = target()
+    with monkeypatch.context() as patch:
+        patch.setattr(bayes, "Recorder", FrameRecorder)
+        grown = target()
+    assert len(recorded) > 0
+    assert list(recorded.columns) == list(grown.columns)
+    pd.testing.assert_frame_equal(recorded, grown.astype(recorded.dtypes).reset_index(drop=True))
+
+
+def test_get_model_decisions(monkeypatch, committee, rows):
+    models, scalers, _, _ = committee
+    assert_same_as_frame_growth(monkeypatch, lambda: bayes._get_model_decisions(
+        rows, bayes.classifiers, scalers, models, bayes.features, decision_weight))
+
+
+def test_get_final_decisions(monkeypatch, committee, rows):
+    models, scalers, final_model, final_scaler = committee
+    assert_same_as_frame_growth(monkeypatch, lambda: bayes._get_final_decisions(
+        rows, 0, 0.9, 3, final_scaler, final_model, bayes.classifiers, scalers, models, bayes.features,
+        final_features, decision_weight))
+
+
+def test_apply_decisions_withperc(monkeypatch, rows):
+    decisions = pd.DataFrame({
+        "Data": rows["Data"],
+        "real_decision": [1 + i % 2 for i in range(len(rows))],
+        "value_fechamento": rows["Fechamento"],
+        "perc_aplicado": 0.5
+    })
+    assert_same_as_frame_growth(monkeypatch, lambda: bayes._apply_decisions_withperc(decisions, 10000.0))
+
+
+def test_append_scales_linearly():
+    def build(size):
+        start = time.perf_counter()
+        results = Recorder(bayes.result_columns)
+        for i in range(size):
+            results.append(Data=pd.Timestamp(2018, 1, 1), initial_maney=1.0, final_maney=float(i), quant_hold=0.0,
+                           value_fechamento=10.0, perc_usado=0.5, action='compra')
+        results.to_frame()
+        return time.perf_counter() - start
+
+    build(1000)
+    # Ten times the rows: about 10x the time when appends are amortized O(1), about 100x when each one copies
+    assert build(100000) < 30 * build(10000)
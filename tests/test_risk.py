@@ -0,0 +1,36 @@
+import numpy as np
+import pandas as pd
+
+from src.risk import rolling_volatility
+
+
+def _closes(size, markets, seed=0):
+    rng = np.random.default_rng(seed)
+    return 100 * np.exp(np.cumsum(rng.normal(0, 0.002, (size, markets)), axis=0))
+
+
+def test_rolling_volatility_matches_pandas_on_long_series():
+    closes = _closes(200000, 3)
+    volatility = rolling_volatility(closes, 14)
+    expected = pd.DataFrame(closes).pct_change().rolling(14).std().to_numpy()
+    assert np.isnan(volatility[:14]).all()
+    assert not np.isnan(volatility[14:]).any()
+    np.testing.assert_allclose(volatility[14:], expected[14:], rtol=1e-9)
+
+
+def test_calm_market_after_a_volatile_history():
+    rng = np.random.default_rng(1)
+    changes = np.concatenate([rng.normal(0, 0.05, 100000), rng.normal(0, 1e-6, 1000)])
+    closes = 100 * np.cumprod(1 + changes)[:, None]
+    volatility = rolling_volatility(closes, 14)[-1000:, 0]
+    returns = closes[1:, 0] / closes[:-1, 0] - 1
+    expected = [returns[end - 14:end].std(ddof=1) for end in range(len(returns) - 999, len(returns) + 1)]
+    np.testing.assert_allclose(volatility, expected, rtol=1e-6)
+
+
+def test_flat_windows_have_no_volatility():
+    closes = _closes(5000, 2)
+    closes[3000:3100] = closes[2999]
+    volatility = rolling_volatility(closes, 14)
+    assert (volatility[14:] >= 0).all()
+    assert (volatility[3014:3100] == 0).all()
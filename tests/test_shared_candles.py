@@ -0,0 +1,64 @@
+import os
+from datetime import datetime, timedelta
+
+import pytest
+
+from benchmarks.fixtures import ReplayOperator, settings, synthetic_candles
+from src.shared_candles import SharedCandleCache, reattach
+
+
+@pytest.fixture
+def shared_params():
+    params = {"name": "test_candles_{}".format(os.getpid()), "slots": 4, "capacity": 100, "summarySlots": 4,
+              "reattachInterval": 0}
+    yield params
+    # A writer left open by a failing test
+    try:
+        SharedCandleCache(params["name"], create=True, slots=4, capacity=100, summary_slots=4).close()
+    except FileNotFoundError:
+        pass
+
+
+def _writer(params, candles):
+    cache = SharedCandleCache(params["name"], create=True, slots=params["slots"], capacity=params["capacity"],
+                              summary_slots=params["summarySlots"])
+    cache.write("BTC-LTC", "fiveMin", candles)
+    return cache
+
+
+def test_reattach_follows_the_writer(shared_params):
+    assert reattach(None, shared_params) is None
+
+    writer = _writer(shared_params, synthetic_candles(10, seed=1))
+    reader = reattach(None, shared_params)
+    assert reader is not None and reattach(reader, shared_params) is reader
+    first = reader.read("BTC-LTC", "fiveMin")
+
+    writer.close()
+    writer = _writer(shared_params, synthetic_candles(10, seed=2))
+    assert not reader.attached()
+    reader = reattach(reader, shared_params)
+    assert reader.attached()
+    assert reader.read("BTC-LTC", "fiveMin")[-1, 4] != first[-1, 4]
+    reader.close()
+    writer.close()
+
+
+def test_reader_trader_attaches_to_a_later_writer(database, shared_params):
+    from src.trader import Trader
+
+    exchange = synthetic_candles(10, seed=3)
+    reader = Trader({}, dict(settings, sharedCandles=shared_params), lambda secrets: ReplayOperator(exchange),
+                    candle_writer=False)
+    assert reader.CandleCache is None
+    assert reader.get_historical_data("BTC-LTC", 10, "fiveMin")[-1]["C"] == exchange[-1]["C"]
+
+    # Recent candles, so that the reader trusts them
+    start = datetime.now() - timedelta(minutes=50)
+    for seed in (4, 5):
+        writer = _writer(shared_params, synthetic_candles(10, seed=seed, start=start, step=timedelta(minutes=5)))
+        cached = reader.get_historical_data("BTC-LTC", 10, "fiveMin")
+        assert cached[-1]["C"] == synthetic_candles(10, seed=seed)[-1]["C"]
+        # The trader restarts: its segments are created again
+        writer.close()
+    reader.CandleCache.close()
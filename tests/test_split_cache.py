@@ -0,0 +1,34 @@
+import os
+
+import numpy as np
+
+from benchmarks.fixtures import petr4_rows
+from src import bayes
+from src.split_cache import SplitCache, split_cache
+
+LABEL = "signalMACD_decisor"
+
+
+def test_module_cache_persists_in_the_repository():
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    assert split_cache.directory == os.path.join(root, "database", "splits")
+
+
+def test_callers_get_their_own_y_and_scaler(tmp_path):
+    df = petr4_rows(1000)
+    features = bayes.features[LABEL]
+    cache = SplitCache(directory=str(tmp_path))
+    first = cache.get(df, features, LABEL, bayes.train_cutoff, bayes._split_and_scale)
+    first[1].iloc[0] = 99
+    first[4].data_min_[0] = -5
+
+    # Once from memory, once from disk
+    for _ in range(2):
+        split = cache.get(df, features, LABEL, bayes.train_cutoff, bayes._split_and_scale)
+        fresh = bayes._split_and_scale(df, features, LABEL)
+        assert split[1].equals(fresh[1]) and split[3].equals(fresh[3])
+        np.testing.assert_array_equal(split[0], fresh[0])
+        np.testing.assert_allclose(split[4].transform(df[features].iloc[:5]), fresh[4].transform(df[features].iloc[:5]))
+        assert not split[0].flags.writeable
+        cache.clear()
+    assert len(os.listdir(tmp_path)) == 1
@@ -1,218 +1,411 @@
-from src.logger import logger
-from src.directory_utilities import get_json_from_file
-from src.database import Database
-from src.bittrex import Bittrex
-from src.trader import Trader
-import utils.utils
-from datetime import datetime, timedelta
-
-import plotly.graph_objects as go
-
-from plotly.subplots import make_subplots
-
-import logging
-import pandas as pd
-import numpy as np
-
-from telegram import ReplyKeyboardMarkup, ReplyKeyboardRemove, Update
-from telegram.ext import (
-    Updater,
-    CommandHandler,
-    MessageHandler,
-    Filters,
-    ConversationHandler,
-    CallbackContext,
-)
-class Botche(object):
-    def __init__(self, bittrex):
-        self.bittrex = bittrex
-        
-
-    def get_markets(self, main_market_filter=None):
-        """
-        Gets all the Bittrex markets and filters them based on the main market filter
-
-        :param main_market_filter: Main market to filter on (ex: BTC, ETH, USDT)
-        :type main_market_filter: str
-
-        :return: All Bittrex markets (with filter applied, if any)
-        :rtype: list
-        """
-        markets = self.bittrex.get_markets()
-        if not markets["success"]:
-            error_str = print("market", True)
-            logger.error(error_str)
-            exit()
-
-        markets = markets["result"]
-        #return markets
-        markets = list(map(lambda item: (item['MarketName']), markets))
-        if main_market_filter is not None:
-            market_check = main_market_filter + "-"
-            markets = list(filter(lambda market: market_check in market, markets))
-        return markets
-    def analyze_just_price():
-        _prev_day = _trader.get_current(_crypto, 'PrevDay')
-        _last = _trader.get_current(_crypto, 'Last')
-        _volume = _trader.get_current(_crypto, 'Volume')
-        _high = _trader.get_current(_crypto, 'High')
-        _low = _trader.get_current(_crypto, 'Low')
-        _ask_venda = _trader.get_current(_crypto, 'Ask')
-        _bid_compra = _trader.get_current(_crypto, 'Bid')
-        _percent_ = round((1 - (_prev_day / _last)) * 100,2)
-        return ("High: $"+str(_high)
-                +"\nLow: $" + str(_low) 
-                +"\nLast: $" + str(_last) 
-                +"\nVolume: " + str(_volume) 
-                +"\nDia Anterior: $" + str(_prev_day)
-                +"\nPercentual: " + str(_percent_) + "%")
-    def analyze_5min():
-        prices, dates = _trader.get_closing_prices(_crypto, 12, 'fiveMin')
-        _12_avg = sum(prices) / len(prices)
-
-        prices, dates = _trader.get_closing_prices(_crypto, 26, 'fiveMin')
-        _26_avg = sum(prices) / len(prices)
+"""
+   Botche, the Telegram bot answering price and MACD questions about a coin pair.
+
+   Updates are long polled from the Bot API and every chat is served by its own asyncio task, so a chat waiting
+   for an analysis does not hold the other conversations. Analyses run one at a time on a worker thread, as the
+   Trader they share is not thread-safe, and identical analyses in flight (same coin pair and period) are shared:
+   ten chats asking about BTC at once cost one fetch. Conversation state is kept per chat. Replies are
+   rendered whole, split at the message size limit and sent through a rate limited outbox that waits out
+   Telegram's flood replies.
+
+   python -m utils.bot [--operator Bittrex] [--api-url https://api.telegram.org]
+"""
+import asyncio
+import json
+from concurrent.futures import ThreadPoolExecutor
 
-        _26subt12 = _26_avg - _12_avg
+from src.logger import logger
 
-        df = pd.DataFrame([prices, dates], index=["Price",'Date']).transpose()
-        df.Date = pd.to_datetime(df.Date)
+CRYPTO, TYPE, END = range(3)
+
+keyboard_labels = [['Apenas o \nPreço/volume', 'Últimos \n5 min', 'Últimos \n30 min', 'Última Hora']]
+
+price_option = 'Apenas o Preço/volume'
+
+# Candle interval of each MACD option
+analysis_units = {
+    'Últimos 5 min': 'fiveMin',
+    'Últimos 30 min': 'thirtyMin',
+    'Última Hora': 'hour'
+}
+
+# Telegram's limit on the length of a message text
+message_limit = 4096
+
+# Times a message is sent again after Telegram asked to retry later
+send_retries = 3
+
+
+def _option(text):
+    """
+    Keyboard option of a message, whatever line breaks the client kept
+    """
+    return " ".join(text.split())
+
+
+def format_rows(rows):
+    """
+    One line per (price, date) row, as the bot used to send one message each
+    """
+    return "\n".join("Data/Hora: " + date + " | Preço (Fech): $" + str(price) for price, date in rows)
+
+
+def chunk_text(text, limit=message_limit):
+    """
+    Splits a text into messages of at most limit characters, on line breaks when possible
+
+    :rtype: list
+    """
+    chunks = []
+    current = ""
+    for line in text.split("\n"):
+        while len(line) > limit:
+            if current:
+                chunks.append(current)
+                current = ""
+            chunks.append(line[:limit])
+            line = line[limit:]
+        candidate = line if not current else current + "\n" + line
+        if len(candidate) > limit:
+            chunks.append(current)
+            candidate = line
+        current = candidate
+    if current or not chunks:
+        chunks.append(current)
+    return chunks
+
+
+class RetryAfter(ConnectionError):
+    """
+    Telegram refused a call for flooding (HTTP 429) and asked to wait delay seconds
+    """
+
+    def __init__(self, message, delay):
+        super(RetryAfter, self).__init__(message)
+        self.delay = delay
+
+
+class TokenBucket(object):
+    """
+    Allows rate sends per second on average, in bursts of up to burst sends
+    """
+
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated_at = None
+        self.lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self.lock:
+            now = asyncio.get_running_loop().time()
+            if self.updated_at is not None:
+                self.tokens = min(self.burst, self.tokens + (now - self.updated_at) * self.rate)
+            self.updated_at = now
+            if self.tokens < 1:
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+                self.tokens = 1
+                self.updated_at = asyncio.get_running_loop().time()
+            self.tokens -= 1
+
+    def refilled(self, now):
+        """
+        Whether the bucket is full again at loop time now, so that a new bucket would allow the same sends
+        """
+        return self.updated_at is None or (now - self.updated_at) * self.rate >= self.burst
 
-        return ("Média 12: $"+str(_12_avg)
-                +"\nMédia 26: $"+str(_26_avg)
-                +"\nMACD: $"+str(_26subt12)), df
-    def analyze_30min():
-        prices, dates = _trader.get_closing_prices(_crypto, 12, 'thirtyMin')
-        _12_avg = sum(prices) / len(prices)
 
-        prices, dates = _trader.get_closing_prices(_crypto, 26, 'thirtyMin')
-        _26_avg = sum(prices) / len(prices)
+class Outbox(object):
+    """
+    Sends the bot's messages within Telegram's flood limits: about one message per second per chat (with a small
+    burst) and thirty per second overall. A message Telegram still refuses is sent again after the delay it asks.
+    A chat's bucket outlives its conversations and is only dropped once idle long enough to be full again
+    """
 
-        _26subt12 = _26_avg - _12_avg
+    def __init__(self, api, chat_rate=1.0, chat_burst=3, global_rate=30.0, expire_interval=60.0):
+        """
+        :param expire_interval: Seconds between two sweeps of the idle chat buckets
+        :type expire_interval: float
+        """
+        self.api = api
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.global_bucket = TokenBucket(global_rate, int(global_rate))
+        self.chat_buckets = {}
+        self.expire_interval = expire_interval
+        self.expired_at = None
+
+    def expire(self):
+        """
+        Drops the buckets of the chats idle for long enough to be full again, forgetting them changes nothing
+        """
+        now = asyncio.get_running_loop().time()
+        self.expired_at = now
+        for chat_id, bucket in list(self.chat_buckets.items()):
+            if not bucket.lock.locked() and bucket.refilled(now):
+                del self.chat_buckets[chat_id]
+
+    async def _acquire(self, chat_id):
+        if self.expired_at is None or asyncio.get_running_loop().time() - self.expired_at >= self.expire_interval:
+            self.expire()
+        bucket = self.chat_buckets.get(chat_id)
+        if bucket is None:
+            bucket = self.chat_buckets[chat_id] = TokenBucket(self.chat_rate, self.chat_burst)
+        await bucket.acquire()
+        await self.global_bucket.acquire()
+
+    async def send(self, chat_id, text, reply_markup=None):
+        """
+        Sends a text of any length, split at the message size limit, the markup going with the last part
+        """
+        chunks = chunk_text(text)
+        for n, chunk in enumerate(chunks):
+            for attempt in range(send_retries + 1):
+                await self._acquire(chat_id)
+                try:
+                    await self.api.send_message(chat_id, chunk, reply_markup if n == len(chunks) - 1 else None)
+                    break
+                except RetryAfter as exception:
+                    if attempt == send_retries:
+                        raise
+                    logger.warning("Telegram asked to wait {} s before writing to chat {}".format(
+                        exception.delay, chat_id))
+                    await asyncio.sleep(exception.delay)
+
+
+class TelegramAPI(object):
+    """
+    Minimal asynchronous client of the Telegram Bot API. The HTTP calls run in worker threads, and api_url can
+    point at a local fake of the API
+    """
+
+    def __init__(self, token, api_url="https://api.telegram.org", poll_timeout=30):
+        self.base_url = "{}/bot{}/".format(api_url.rstrip("/"), token)
+        self.poll_timeout = poll_timeout
+
+    def _post(self, method, params):
+        import requests
+
+        response = requests.post(self.base_url + method, json=params, timeout=self.poll_timeout + 10)
+        content = response.json()
+        if content.get("error_code") == 429:
+            raise RetryAfter("Telegram {} failed: {}".format(method, content.get("description")),
+                             content.get("parameters", {}).get("retry_after", 1))
+        if not content.get("ok"):
+            raise ConnectionError("Telegram {} failed: {}".format(method, content.get("description")))
+        return content["result"]
+
+    async def call(self, method, **params):
+        return await asyncio.to_thread(self._post, method, params)
+
+    async def get_updates(self, offset=None):
+        return await self.call("getUpdates", offset=offset, timeout=self.poll_timeout, allowed_updates=["message"])
+
+    async def send_message(self, chat_id, text, reply_markup=None):
+        params = {"chat_id": chat_id, "text": text}
+        if reply_markup is not None:
+            params["reply_markup"] = json.dumps(reply_markup)
+        return await self.call("sendMessage", **params)
 
-        df = pd.DataFrame([prices, dates], index=["Price",'Date']).transpose()
-        df.Date = pd.to_datetime(df.Date)
 
-        return ("Média 12: $"+str(_12_avg)
-                +"\nMédia 26: $"+str(_26_avg)
-                +"\nMACD: $"+str(_26subt12)), df
-    def analyze_hour():
-        prices, dates = _trader.get_closing_prices(_crypto, 12, 'hour')
-        _12_avg = sum(prices) / len(prices)
+class Botche(object):
+    """
+    Conversation: /start, then the coin pair (ex: BTC-LTC), then the period to analyse. /cancel ends it
+    """
 
-        prices, dates = _trader.get_closing_prices(_crypto, 26, 'hour')
+    def __init__(self, trader, api):
+        """
+        :param trader: Trader used for the market data, ideally a reader of the shared candle cache
+        :type trader: src.trader.Trader
+        :param api: Bot API client
+        :type api: TelegramAPI
+        """
+        self.trader = trader
+        self.api = api
+        self.outbox = Outbox(api)
+        self.chats = {}
+        self.queues = {}
+        self.workers = {}
+        self.in_flight = {}
+        # The trader's snapshot, order books, candle cache and operator session are shared by every analysis
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="analysis")
+
+    def analyze_just_price(self, crypto):
+        _prev_day = self.trader.get_current(crypto, 'PrevDay')
+        _last = self.trader.get_current(crypto, 'Last')
+        _volume = self.trader.get_current(crypto, 'Volume')
+        _high = self.trader.get_current(crypto, 'High')
+        _low = self.trader.get_current(crypto, 'Low')
+        _percent_ = round((1 - (_prev_day / _last)) * 100, 2)
+        return ("High: $" + str(_high)
+                + "\nLow: $" + str(_low)
+                + "\nLast: $" + str(_last)
+                + "\nVolume: " + str(_volume)
+                + "\nDia Anterior: $" + str(_prev_day)
+                + "\nPercentual: " + str(_percent_) + "%"), None
+
+    def analyze_macd(self, crypto, unit):
+        """
+        Averages of the last 12 and 26 closes of the interval and their difference, with the 26 closes
+        """
+        prices, dates = self.trader.get_closing_prices(crypto, 26, unit)
+        _12_avg = sum(prices[-12:]) / len(prices[-12:])
         _26_avg = sum(prices) / len(prices)
-
         _26subt12 = _26_avg - _12_avg
+        rows = [(price, str(date)) for price, date in zip(prices, dates)]
+        return ("Média 12: $" + str(_12_avg)
+                + "\nMédia 26: $" + str(_26_avg)
+                + "\nMACD: $" + str(_26subt12)), rows
 
-        df = pd.DataFrame([prices, dates], index=["Price",'Date']).transpose()
-        df.Date = pd.to_datetime(df.Date)
-
-        return ("Média 12: $"+str(_12_avg)
-                +"\nMédia 26: $"+str(_26_avg)
-                +"\nMACD: $"+str(_26subt12)), df
-
-    global _analyzer   
-    _analyzer = {
-        'Apenas o \nPreço/volume' : analyze_just_price,
-        'Últimos \n5 min' : analyze_5min,
-        'Últimos \n30 min' : analyze_30min,
-        'Última Hora' : analyze_hour
-    }
-
-    def _format_priceDate(Price, Date):
-        return ("Data/Hora: " + Date + " | Preço (Fech): $"+ Price)
-
-    _sygnal_marker = {
-        "Buy":"triangle-up",
-        "Sell":"triangle-down"
-    }
-    _sygnal_color = {
-        "Buy":"green",
-        "Sell":"red"
-    }
-    
-    logging.basicConfig(
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s', level=logging.INFO
-    )
-
-    logger = logging.getLogger(__name__)
-
-    CRYPTO, TYPE,END = range(3)
-
-    def start(update: Update, _: CallbackContext) -> int:
-        update.message.reply_text(
-            'Olá, que moeda vamos analisar agora? (formato: $coin-$pair)',
-            reply_markup=ReplyKeyboardRemove(),
-        )
+    def _run_analysis(self, crypto, option):
+        if option == price_option:
+            return self.analyze_just_price(crypto)
+        return self.analyze_macd(crypto, analysis_units[option])
 
+    async def analyse(self, crypto, option):
+        """
+        Runs an analysis on the analysis thread, after the ones queued before it. Chats asking for the same one
+        meanwhile wait on the same run
+
+        :return: Reply text and the (price, date) rows, if any
+        :rtype: str, list
+        """
+        key = (crypto, option)
+        if key not in self.in_flight:
+            task = asyncio.ensure_future(
+                asyncio.get_running_loop().run_in_executor(self.executor, self._run_analysis, crypto, option))
+            self.in_flight[key] = task
+            task.add_done_callback(lambda _: self.in_flight.pop(key, None))
+        return await asyncio.shield(self.in_flight[key])
+
+    async def start(self, chat_id, state, text):
+        await self.outbox.send(chat_id, 'Olá, que moeda vamos analisar agora? (formato: $coin-$pair)',
+                                    {"remove_keyboard": True})
         return TYPE
 
-    def _type(update: Update, _: CallbackContext) -> int:
-        reply_keyboard = [['Apenas o \nPreço/volume', 'Últimos \n5 min','Últimos \n30 min','Última Hora']]
-        global _crypto
-        _crypto = update.message.text
-        print(_crypto)
-        user = update.message.from_user
+    async def choose_type(self, chat_id, state, text):
+        state["crypto"] = text.strip()
+        await self.outbox.send(chat_id, 'Show, e qual período? (Agora, 5min, 30min, hour)?',
+                                    {"keyboard": keyboard_labels, "one_time_keyboard": True})
+        return END
 
-        update.message.reply_text(
-            'Show, e qual período? (Agora, 5min, 30min, hour)?',
-            reply_markup=ReplyKeyboardMarkup(reply_keyboard, one_time_keyboard=True),
-        )
+    async def the_end(self, chat_id, state, text):
+        option = _option(text)
+        if option != price_option and option not in analysis_units:
+            await self.outbox.send(chat_id, 'Período desconhecido, escolha uma das opções do teclado.')
+            return END
+        logger.info("Chat {} asked {} | {}".format(chat_id, state["crypto"], option))
+        reply, rows = await self.analyse(state["crypto"], option)
+        if rows:
+            await self.outbox.send(chat_id, reply + "\n\nValores:\n" + format_rows(rows) + "\n- END -")
+        else:
+            await self.outbox.send(chat_id, reply + "\n- END -")
+        return None
 
-        return END
+    async def cancel(self, chat_id, state, text):
+        await self.outbox.send(chat_id, 'Bye! I hope we can talk again some day.', {"remove_keyboard": True})
+        return None
 
-    def the_end(update: Update, _: CallbackContext) -> int:
-        global _item
-        _item = update.message.text
-        print(_crypto + " |" + _item)
-        if (_item=='Apenas o Preço/volume'):
-            update.message.reply_text(_analyzer.get(_item)())
+    async def handle(self, message):
+        """
+        Moves one chat's conversation forward with a message
+        """
+        chat_id = message["chat"]["id"]
+        text = message.get("text", "")
+        state = self.chats.setdefault(chat_id, {"step": None})
+        if text.startswith("/start"):
+            handler = self.start
+        elif text.startswith("/cancel"):
+            handler = self.cancel
+        elif state["step"] == TYPE:
+            handler = self.choose_type
+        elif state["step"] == END:
+            handler = self.the_end
         else:
-            _str_formatada, df = _analyzer.get(_item)()
-            update.message.reply_text(_str_formatada)
-            update.message.reply_text("Valores:\n")
-            [update.message.reply_text(str) for str in [_format_priceDate("$"+str(x[1]['Price']), str(x[1]['Date'])) for x in df.iterrows()]]
-        update.message.reply_text('- END -')
-        return ConversationHandler.END
-    
-    def cancel(update: Update, _: CallbackContext) -> int:
-        user = update.message.from_user
-        logger.info("User %s canceled the conversation.", user.first_name)
-        update.message.reply_text(
-            'Bye! I hope we can talk again some day.', reply_markup=ReplyKeyboardRemove()
-        )
-
-        return ConversationHandler.END
-
-
-    def main() -> None:
-        # Create the Updater and pass it your bot's token.
-        updater = Updater(bot_token)
-
-        # Get the dispatcher to register handlers
-        dispatcher = updater.dispatcher
-
-        # Add conversation handler with the states GENDER, PHOTO, LOCATION and BIO
-        conv_handler = ConversationHandler(
-            entry_points=[CommandHandler('start', start)],
-            states={
-                TYPE: [MessageHandler(Filters.text, _type)],
-                END: [MessageHandler(Filters.text, the_end)]
-            },
-            fallbacks=[CommandHandler('cancel', cancel)],
-        )
-
-        dispatcher.add_handler(conv_handler)
-
-        # Start the Bot
-        updater.start_polling()
-
-        # Run the bot until you press Ctrl-C or the process receives SIGINT,
-        # SIGTERM or SIGABRT. This should be used most of the time, since
-        # start_polling() is non-blocking and will stop the bot gracefully.
-        updater.idle()
-
-
-    if __name__ == '__main__':
-        main()
\ No newline at end of file
+            return
+        try:
+            state["step"] = await handler(chat_id, state, text)
+        except Exception as exception:
+            logger.exception(exception)
+            state["step"] = None
+            try:
+                await self.outbox.send(chat_id, 'Não consegui analisar {}, tente novamente com /start'.format(
+                    state.get("crypto", "")))
+            except Exception as exception:
+                logger.error("Could not tell chat {} the analysis failed: {}".format(chat_id, exception))
+        if state["step"] is None:
+            self.chats.pop(chat_id, None)
+
+    async def _chat_worker(self, chat_id):
+        queue = self.queues[chat_id]
+        try:
+            while True:
+                message = await queue.get()
+                try:
+                    await self.handle(message)
+                except Exception as exception:
+                    logger.exception(exception)
+                if queue.empty():
+                    return
+        finally:
+            # Idle (or failed) chats give their worker back, the next message starts a new one
+            self.queues.pop(chat_id, None)
+            self.workers.pop(chat_id, None)
+
+    def dispatch(self, message):
+        """
+        Queues a message for its chat: the messages of a chat are handled in order, chats run concurrently
+        """
+        chat_id = message["chat"]["id"]
+        if chat_id not in self.queues:
+            self.queues[chat_id] = asyncio.Queue()
+            self.workers[chat_id] = asyncio.ensure_future(self._chat_worker(chat_id))
+        self.queues[chat_id].put_nowait(message)
+
+    async def drain(self):
+        """
+        Waits until every queued message has been handled
+        """
+        while self.workers:
+            # A worker's failure is logged by the worker, it must not stop the other chats being waited for
+            await asyncio.gather(*list(self.workers.values()), return_exceptions=True)
+
+    async def run(self):
+        """
+        Polls the Bot API for updates until cancelled
+        """
+        offset = None
+        while True:
+            try:
+                updates = await self.api.get_updates(offset)
+            except (ConnectionError, OSError) as exception:
+                logger.error("Telegram polling failed: {}".format(exception))
+                await asyncio.sleep(5)
+                continue
+            for update in updates:
+                offset = update["update_id"] + 1
+                if "message" in update:
+                    self.dispatch(update["message"])
+
+
+def main():
+    import argparse
+
+    from src.operators import get_operator, names
+    from src.trader import Trader
+    from utils.utils import get_secrets, get_settings
+
+    parser = argparse.ArgumentParser(description="Run the Botche Telegram bot")
+    parser.add_argument("--operator", default="Bittrex", choices=names())
+    parser.add_argument("--api-url", default="https://api.telegram.org", help="Bot API address")
+    args = parser.parse_args()
+
+    secrets = get_secrets()
+    trader = Trader(secrets, get_settings(), get_operator(args.operator), candle_writer=False)
+    bot = Botche(trader, TelegramAPI(secrets["telegram"]["token"], args.api_url))
+    asyncio.run(bot.run())
+
+
+if __name__ == '__main__':
+    main()
@@ -1,28 +1,6 @@
-from src.logger import logger
 from src.directory_utilities import get_json_from_file
-from src.database import Database
-from src.bittrex import Bittrex
-from src.trader import Trader
-import utils.utils
-from datetime import datetime, timedelta
 
-import plotly.graph_objects as go
 
-from plotly.subplots import make_subplots
-
-import logging
-import pandas as pd
-import numpy as np
-
-from telegram import ReplyKeyboardMarkup, ReplyKeyboardRemove, Update
-from telegram.ext import (
-    Updater,
-    CommandHandler,
-    MessageHandler,
-    Filters,
-    ConversationHandler,
-    CallbackContext,
-)
 def get_secrets():
     secrets_file_directory = "./database/secrets.json"
     secrets_template = {
@@ -96,101 +74,24 @@ def get_settings():
     return settings_content
 
 def generate_graph(df, crossovers):
-    INCREASING_COLOR = '#3D9970'
-    DECREASING_COLOR = '#FF4136'
+    """
+    Shows the candles, volume, EMAs with the crossovers and MACD of a market interactively.
+    src.charts.ChartRenderer renders the same chart as an image
+    """
+    import plotly.graph_objects as go
+    from src.charts import build_figure
 
     df.index = df.Datetime
-
-    fig = make_subplots(rows=4, cols=1)
-    fig = fig.add_trace(go.Candlestick(x=df.index,
-                                       open=df['Open'],
-                                       high=df['High'],
-                                       low=df['Low'],
-                                       close=df['Close']),
-                        row=1, col=1
-                       )
-    fig = fig.update_layout(xaxis_rangeslider_visible=False, xaxis={'visible':False, 'showticklabels':False})
-    # volume bar chart
-
-    colors = []
-
-    for i in range(len(df.Close)):
-        if i != 0:
-            if df.Close[i] > df.Close[i-1]:
-                colors.append(INCREASING_COLOR)
-            else:
-                colors.append(DECREASING_COLOR)
-        else:
-            colors.append(DECREASING_COLOR)
+    go.Figure(build_figure(df, crossovers)).show()
 
 
-    # add vol to graph
-    fig.add_trace(
-        go.Bar(x=df.index, y=df.Volume,
-               marker=dict(color=colors),#
-               name='Volume'),
-        row=2, col=1
+def generate_levels_graph(df, hammers, res_lvl, sup_lvl):
+    """
+    Shows the candles and volume with the resistance and support levels, the analysed area and the hammers
+    (res_lvl = 0.236, sup_lvl = 0.764 for the Fibonacci levels)
+    """
+    import plotly.graph_objects as go
+    from src.charts import build_levels_figure
 
-    )
-    
-    fig = fig.update_layout(xaxis={'visible':False, 'showticklabels':False}, yaxis={'visible':False, 'showticklabels':False})
-    
-    colors_macd = []
-
-    for i in range(len(df.MACD)):
-        if i != 0:
-            if df.MACD[i] > df.MACD[i-1]:
-                colors_macd.append(INCREASING_COLOR)
-            else:
-                colors_macd.append(DECREASING_COLOR)
-        else:
-            colors_macd.append(DECREASING_COLOR)
-    # add MACD to graph
-    #fig.add_trace(
-    #    go.Scatter(x=df.index, y=df.MACD,
-    #           marker=dict(color=colors_macd),#
-    #           name='MACD'),
-    #    row=3, col=1)
-    # add 12-EMA
-    fig.add_trace(
-        go.Scatter(x=df.index, y=df.EMA_Short,#
-               name='EMA_Short'),
-        row=3, col=1
-
-    )
-    # add 26-EMA
-    fig.add_trace(
-        go.Scatter(x=df.index, y=df.EMA_Long,#
-               name='EMA_Long'),
-        row=3, col=1
-
-    )
-    
-    # add buy&sell markers
-    fig.add_trace(
-        go.Scatter(mode="markers",x=crossovers.Datetime, y=crossovers.EMA_Short, 
-               marker_symbol = [(_sygnal_marker.get(x)) for x in crossovers['Signal']],
-               marker_color = [(_sygnal_color.get(x)) for x in crossovers['Signal']],
-               marker_size=15, name="Buy/Sell"
-              ),
-        row=3, col=1
-    )
-    fig = fig.update_layout(xaxis={'visible':False, 'showticklabels':False}, yaxis={'visible':False, 'showticklabels':False})
-    
-    # add MACD markers
-    fig.add_trace(
-        go.Scatter(x=df.Datetime, y=df.MACD, 
-               marker=dict(color="black"), name='MACD'
-              ),
-        row=4, col=1
-    )
-    fig.add_trace(
-        go.Scatter(x=df.Datetime, y=df.MACD_7, 
-               marker=dict(color="blue")
-              ),
-        row=4, col=1
-    )
-    fig = fig.update_layout(yaxis={'visible':False, 'showticklabels':False})
-    
-    fig.show()
-    
\ No newline at end of file
+    df.index = df.Datetime
+    go.Figure(build_levels_figure(df, hammers, res_lvl, sup_lvl)).show()